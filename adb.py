@@ -0,0 +1,169 @@
+import atexit
+import queue
+import subprocess
+import threading
+import time
+import uuid
+
+
+SHELL_TIMEOUT = 15  # Default seconds to wait for a shell command to finish
+TRANSFER_TIMEOUT = 300  # Default seconds to wait for a file pull/push
+
+
+class AdbShellError(Exception):
+    pass
+
+
+class AdbShellTimeout(AdbShellError):
+    pass
+
+
+def adb_command(device_id, *args):
+    """Build an adb command line targeted at a specific device"""
+    command = ['adb']
+    if device_id:
+        command += ['-s', device_id]
+    return command + list(args)
+
+
+class AdbShell:
+    """One long-lived `adb -s <serial> shell` per device.
+
+    Commands are written to the shell's stdin one at a time and their output
+    is read back up to a unique sentinel line, so there is no process spawn
+    per call. A command that exceeds its timeout, or a shell that died, is
+    handled by restarting the channel.
+    """
+
+    def __init__(self, device_id):
+        self.device_id = device_id
+        self.process = None
+        self.lines = None
+        self.lock = threading.Lock()
+
+    def _start(self):
+        self.process = subprocess.Popen(
+            adb_command(self.device_id, 'shell'),
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            bufsize=0
+        )
+        self.lines = queue.Queue()
+        # Reading happens on a thread so timeouts also work with Windows pipes
+        threading.Thread(target=self._read, args=(self.process, self.lines),
+                         name=f"adb-shell-{self.device_id or 'default'}", daemon=True).start()
+
+    @staticmethod
+    def _read(process, lines):
+        for line in iter(process.stdout.readline, b''):
+            lines.put(line)
+        lines.put(None)  # EOF: the shell (or the device connection) went away
+
+    def _alive(self):
+        return self.process is not None and self.process.poll() is None
+
+    def close(self):
+        if self.process is None:
+            return
+        try:
+            self.process.stdin.close()
+        except OSError:
+            pass
+        try:
+            self.process.terminate()
+            self.process.wait(timeout=5)
+        except Exception:
+            self.process.kill()
+        self.process = None
+
+    def _execute(self, command, timeout):
+        if not self._alive():
+            self._start()
+
+        sentinel = f"__ADB_DONE_{uuid.uuid4().hex}__"
+        # </dev/null stops the command from reading our command stream
+        script = f"( {command} ) </dev/null 2>&1; echo {sentinel}$?\n"
+        self.process.stdin.write(script.encode('utf-8'))
+        self.process.stdin.flush()
+
+        output = []
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                line = self.lines.get(timeout=max(0, deadline - time.monotonic()))
+            except queue.Empty:
+                self.close()
+                raise AdbShellTimeout(f"Command timed out after {timeout}s: {command}")
+            if line is None:
+                self.close()
+                raise AdbShellError("adb shell exited (device disconnected?)")
+            text = line.decode('utf-8', errors='replace')
+            if sentinel in text:
+                before, _, status = text.partition(sentinel)
+                if before:
+                    output.append(before)
+                return ''.join(output), int(status.strip() or 0)
+            output.append(text)
+
+    def run(self, command, timeout=SHELL_TIMEOUT):
+        """Run a command on the device and return (output, exit status).
+
+        A broken channel is reopened and the command retried once.
+        """
+        with self.lock:
+            try:
+                return self._execute(command, timeout)
+            except AdbShellTimeout:
+                raise
+            except (AdbShellError, OSError):
+                self.close()
+                return self._execute(command, timeout)
+
+
+shells = {}
+shells_lock = threading.Lock()
+
+
+def get_shell(device_id):
+    """Shared persistent shell for a device"""
+    with shells_lock:
+        shell = shells.get(device_id)
+        if shell is None:
+            shell = shells[device_id] = AdbShell(device_id)
+        return shell
+
+
+def close_shells():
+    with shells_lock:
+        for shell in shells.values():
+            shell.close()
+        shells.clear()
+
+
+atexit.register(close_shells)
+
+
+def adb_shell(device_id, command, timeout=SHELL_TIMEOUT):
+    """Run a shell command on the device over its persistent channel and return its output"""
+    output, _ = get_shell(device_id).run(command, timeout)
+    return output
+
+
+def adb_transfer(device_id, direction, source, destination, timeout=TRANSFER_TIMEOUT):
+    """Copy a file to ('push') or from ('pull') the device. Raises AdbShellError on failure."""
+    try:
+        result = subprocess.run(adb_command(device_id, direction, source, destination),
+                                capture_output=True, text=True, timeout=timeout)
+    except subprocess.TimeoutExpired:
+        raise AdbShellTimeout(f"adb {direction} timed out after {timeout}s: {source}")
+    if result.returncode != 0:
+        raise AdbShellError(f"adb {direction} {source} failed: {(result.stderr or result.stdout).strip()}")
+
+
+def adb_pull(device_id, remote_path, local_path, timeout=TRANSFER_TIMEOUT):
+    adb_transfer(device_id, 'pull', remote_path, local_path, timeout)
+
+
+def adb_push(device_id, local_path, remote_path, timeout=TRANSFER_TIMEOUT):
+    adb_transfer(device_id, 'push', local_path, remote_path, timeout)
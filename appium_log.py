@@ -0,0 +1,89 @@
+import collections
+import logging
+import logging.handlers
+import os
+import re
+import threading
+
+
+LOG_DIR = "logs"
+LOG_MAX_BYTES = 5 * 1024 * 1024  # Rotate Appium logs at 5 MB
+LOG_BACKUPS = 5  # Keep this many rotated Appium logs
+RING_SIZE = 2000  # Recent Appium log lines kept in memory
+
+# Log lines that mean the UiAutomator2 side is gone and the next command will fail
+CRASH_SIGNATURES = [
+    ("instrumentation", re.compile(r"instrumentation process is not running", re.I)),
+    ("instrumentation", re.compile(r"instrumentation process cannot be initialized", re.I)),
+    ("uia2-unreachable", re.compile(r"cannot be proxied to UiAutomator2 server", re.I)),
+    ("uia2-unreachable", re.compile(r"Could not proxy command to the remote server", re.I)),
+    ("uia2-crashed", re.compile(r"UiAutomator2 server .*(crashed|has quit|is not running)", re.I)),
+    ("device-lost", re.compile(r"device '?[\w.:-]+'? not found", re.I)),
+]
+
+
+class AppiumLogDrain:
+    """Continuously drains Appium's stdout so the pipe never fills up.
+
+    Lines go into a bounded in-memory ring buffer and a rotated log file.
+    Lines matching a known crash signature set recovery_needed (and call
+    on_signature, if given) so the bot can recover before its next command
+    fails.
+    """
+
+    def __init__(self, stream, name="appium", log_dir=LOG_DIR, ring_size=RING_SIZE,
+                 signatures=CRASH_SIGNATURES, on_signature=None):
+        self.stream = stream
+        self.recent = collections.deque(maxlen=ring_size)
+        self.signatures = signatures
+        self.on_signature = on_signature
+        self.recovery_needed = threading.Event()
+        self.last_signal = None
+        self.thread = None
+
+        os.makedirs(log_dir, exist_ok=True)
+        self.logger = logging.getLogger(f"reels_bot.{name}")
+        self.logger.propagate = False
+        self.logger.setLevel(logging.INFO)
+        if not self.logger.handlers:
+            handler = logging.handlers.RotatingFileHandler(
+                os.path.join(log_dir, f"{name}.log"),
+                maxBytes=LOG_MAX_BYTES,
+                backupCount=LOG_BACKUPS,
+                encoding='utf-8'
+            )
+            handler.setFormatter(logging.Formatter("%(asctime)s %(message)s"))
+            self.logger.addHandler(handler)
+
+    def start(self):
+        self.thread = threading.Thread(target=self._drain, name="appium-log", daemon=True)
+        self.thread.start()
+        return self
+
+    def _drain(self):
+        try:
+            for line in iter(self.stream.readline, ''):
+                self.feed(line.rstrip('\n'))
+        except (OSError, ValueError):
+            pass  # Pipe closed while Appium was being stopped
+
+    def feed(self, line):
+        self.recent.append(line)
+        self.logger.info(line)
+        for kind, pattern in self.signatures:
+            if pattern.search(line):
+                self.last_signal = (kind, line)
+                self.recovery_needed.set()
+                if self.on_signature:
+                    self.on_signature(kind, line)
+                break
+
+    def take_signal(self):
+        """Return and clear the pending crash signal, if any"""
+        if not self.recovery_needed.is_set():
+            return None
+        self.recovery_needed.clear()
+        return self.last_signal
+
+    def tail(self, lines=50):
+        return "\n".join(list(self.recent)[-lines:])
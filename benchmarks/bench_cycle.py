@@ -0,0 +1,139 @@
+"""
+Benchmark full bot cycles against the simulated device (fake_device.py).
+
+Needs the bot's Python dependencies (Appium-Python-Client, selenium) but no
+emulator, Appium server or Instagram. Run from the repository root:
+    python benchmarks/bench_cycle.py
+    python benchmarks/bench_cycle.py --scenario burst --time-scale 0.1 --verbose
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from bot import BotConfig, InstagramReelsBot
+from captions import CaptionLibrary
+from fake_device import FakeDevice, FakeReel
+
+
+def reels(count, prefix="R"):
+    return [FakeReel(f"{prefix}{index:03d}") for index in range(count)]
+
+
+SENDERS = [f"sender{index:02d}" for index in range(1, 20)]
+
+# Scenario name -> FakeDevice settings, plus the monitored 'senders', reels
+# sent 'later' (after an unmeasured warm-up cycle) and how many reels must be
+# 'posted' in the measured cycle. Each scenario starts with an empty store,
+# past the first cycle's full inbox scan.
+SCENARIOS = {
+    "idle": dict(reels=[], posted=0),
+    "one_reel": dict(reels=reels(1), posted=1),
+    "burst": dict(reels=reels(6), posted=6),
+    "popups": dict(reels=reels(2), popup_every=4, posted=2),
+    "no_download": dict(reels=[FakeReel("R000"), FakeReel("R001", downloadable=False)], posted=1),
+    "duplicates": dict(reels=[FakeReel("R000", content="clip"), FakeReel("R001", content="clip")], posted=1),
+    "no_deep_links": dict(reels=reels(2), deep_links=False, posted=2),
+    "slow_device": dict(reels=reels(2), default_latency=0.15, load_time=1.0, posted=2),
+    "flaky": dict(reels=reels(3), failures={'findElement': 0.05, 'tap': 0.05}, posted=3),
+    "quiet_inbox": dict(reels=[], threads={sender: [] for sender in SENDERS}, senders=["friend"] + SENDERS,
+                        posted=0),
+    "many_senders": dict(reels=[], threads={**{sender: [] for sender in SENDERS}, "sender07": reels(1, "S"),
+                                            "sender12": reels(1, "T")}, senders=["friend"] + SENDERS, posted=2),
+    "known_reels": dict(reels=reels(3), later=reels(1, "N"), posted=1),
+}
+
+
+def run_scenario(name, settings, time_scale, verbose):
+    settings = dict(settings)
+    senders = settings.pop('senders', None)
+    later = settings.pop('later', [])
+    expected = settings.pop('posted')
+    device = FakeDevice(time_scale=time_scale, **settings)
+    output = sys.stdout if verbose else io.StringIO()
+    previous_dir = os.getcwd()
+
+    with tempfile.TemporaryDirectory() as tmp, contextlib.redirect_stdout(output):
+        os.chdir(tmp)  # Keep the store, caches and logs of each run apart
+        try:
+            bot = InstagramReelsBot(BotConfig(device_id="fake", username="friend", publish_per_hour=0, metrics_port=0,
+                                                senders=senders))
+            bot.captions = CaptionLibrary(os.path.join(ROOT, "captions"))
+            bot.fingerprints = None  # Simulated videos are not decodable
+            bot.cycles = 1  # Measure a steady-state cycle, not the first one's full inbox scan
+            device.attach(bot)
+            if later:
+                bot.run_cycle()
+                for reel in later:
+                    device.send(reel)
+            device.driver.calls.clear()
+            device.shell_calls.clear()
+            posted_before = len(device.app.posts)
+
+            started = time.perf_counter()
+            errors = 0
+            try:
+                bot.run_cycle()
+            except Exception as e:
+                errors += 1
+                print(f"[ERROR] Cycle failed: {e}")
+            elapsed = time.perf_counter() - started
+            bot.processed.close()
+            bot.jobs.close()
+            bot.video_cache.close()
+            if bot.bubbles:
+                bot.bubbles.close()
+        finally:
+            os.chdir(previous_dir)
+
+    calls = device.driver.calls
+    posted = len(device.app.posts) - posted_before
+    return {
+        'scenario': name,
+        'seconds': elapsed,
+        'round_trips': sum(calls.values()),
+        'snapshots': calls['getPageSource'],
+        'finds': calls['findElement'] + calls['findElements'],
+        'shell': sum(device.shell_calls.values()),
+        'posted': posted,
+        'per_hour': posted / elapsed * 3600 if elapsed else 0,
+        'errors': errors,
+        'ok': posted == expected and not errors,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--scenario", action="append", choices=sorted(SCENARIOS),
+                        help="Run only this scenario (repeatable)")
+    parser.add_argument("--time-scale", type=float, default=1.0,
+                        help="Multiply simulated delays (latency, loading, implicit waits)")
+    parser.add_argument("--verbose", action="store_true", help="Show the bot's own output")
+    args = parser.parse_args()
+
+    print(f"{'scenario':<14} {'cycle (s)':>9} {'trips':>6} {'snaps':>6} {'finds':>6} {'shell':>6} "
+          f"{'posted':>6} {'reels/h':>8} {'errors':>6}  result")
+    failed = []
+    for name in args.scenario or SCENARIOS:
+        result = run_scenario(name, SCENARIOS[name], args.time_scale, args.verbose)
+        if not result['ok']:
+            failed.append(name)
+        print(f"{result['scenario']:<14} {result['seconds']:>9.1f} {result['round_trips']:>6} "
+              f"{result['snapshots']:>6} {result['finds']:>6} {result['shell']:>6} {result['posted']:>6} "
+              f"{result['per_hour']:>8.0f} {result['errors']:>6}  "
+              f"{'ok' if result['ok'] else 'FAIL (expected ' + str(SCENARIOS[name]['posted']) + ' posted)'}",
+              flush=True)
+    if failed:
+        print(f"\n{len(failed)} scenario(s) lost reels or failed: {', '.join(failed)}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,69 @@
+"""
+Benchmark near-duplicate fingerprint lookups against index size.
+
+Needs NumPy. Run from the repository root:
+    python benchmarks/bench_fingerprint.py
+"""
+
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fingerprint import FRAMES, FingerprintIndex, hamming
+
+
+SIZES = [1_000, 10_000, 100_000, 500_000]
+LOOKUPS = 1_000
+FLIPPED_BITS = 4  # Bits changed in near-duplicate queries
+
+
+def flip(keys, rng, bits):
+    """Copies of keys with `bits` random bits flipped in each"""
+    masks = np.zeros(len(keys), dtype=np.uint64)
+    for _ in range(bits):
+        masks |= np.uint64(1) << rng.integers(0, 64, len(keys), dtype=np.uint64)
+    return keys ^ masks
+
+
+def main():
+    rng = np.random.default_rng(0)
+    print(f"{'videos':>10} {'build (s)':>10} {'near (us)':>10} {'miss (us)':>10} {'scan (us)':>10} {'recall':>7}")
+    for size in SIZES:
+        keys = rng.integers(0, 2 ** 64, size, dtype=np.uint64)
+        frames = rng.integers(0, 2 ** 64, (size, FRAMES), dtype=np.uint64)
+
+        start = time.perf_counter()
+        index = FingerprintIndex(path=None)
+        index.extend([str(i) for i in range(size)], keys, frames)
+        index.rebuild()
+        build = time.perf_counter() - start
+
+        targets = rng.integers(0, size, LOOKUPS)
+        near = flip(keys[targets], rng, FLIPPED_BITS)
+        misses = rng.integers(0, 2 ** 64, LOOKUPS, dtype=np.uint64)
+
+        start = time.perf_counter()
+        found = sum(index.find((key, frames[target])) is not None for key, target in zip(near, targets))
+        near_us = (time.perf_counter() - start) / LOOKUPS * 1e6
+
+        start = time.perf_counter()
+        for key, target in zip(misses, targets):
+            index.find((key, frames[target]))
+        miss_us = (time.perf_counter() - start) / LOOKUPS * 1e6
+
+        # Brute-force baseline: distance to every stored key
+        scans = LOOKUPS // 10
+        start = time.perf_counter()
+        for key in near[:scans]:
+            np.flatnonzero(hamming(keys, key) <= index.key_distance)
+        scan_us = (time.perf_counter() - start) / scans * 1e6
+
+        print(f"{size:>10,} {build:>10.2f} {near_us:>10.1f} {miss_us:>10.1f} {scan_us:>10.1f} {found / LOOKUPS:>7.1%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""
+Benchmark processed-reel lookups against store size.
+
+Run from the repository root:
+    python benchmarks/bench_reel_store.py
+"""
+
+import os
+import random
+import sqlite3
+import string
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from reel_store import ReelStore
+
+
+SIZES = [1_000, 10_000, 100_000, 1_000_000]
+LOOKUPS = 10_000
+
+
+def random_id():
+    return ''.join(random.choices(string.ascii_letters + string.digits + '_-', k=11))
+
+
+def fill(path, count):
+    """Bulk-load a store directly, bypassing per-ID commits"""
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE IF NOT EXISTS processed (reel_id TEXT PRIMARY KEY, processed_at REAL NOT NULL)")
+    conn.executemany("INSERT OR IGNORE INTO processed VALUES (?, ?)", ((random_id(), 0.0) for _ in range(count)))
+    conn.commit()
+    conn.close()
+
+
+def main():
+    print(f"{'ids':>10} {'load (s)':>10} {'hit (ns)':>10} {'miss (ns)':>10}")
+    for size in SIZES:
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "reels.db")
+            fill(path, size)
+
+            start = time.perf_counter()
+            store = ReelStore(path, legacy_path=None)
+            load = time.perf_counter() - start
+
+            hits = random.sample(sorted(store.ids), min(LOOKUPS, len(store)))
+            misses = [random_id() for _ in range(LOOKUPS)]
+
+            start = time.perf_counter()
+            for reel_id in hits:
+                reel_id in store
+            hit_ns = (time.perf_counter() - start) / len(hits) * 1e9
+
+            start = time.perf_counter()
+            for reel_id in misses:
+                reel_id in store
+            miss_ns = (time.perf_counter() - start) / len(misses) * 1e9
+
+            store.close()
+            print(f"{size:>10} {load:>10.3f} {hit_ns:>10.0f} {miss_ns:>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,70 +1,266 @@
 import re
+import shlex
 import time
 import subprocess
 import os
 import platform
+import json
+import socket
+import urllib.request
+import unicodedata
+from selenium.common.exceptions import TimeoutException
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from appium import webdriver
 from appium.options.android import UiAutomator2Options
 from appium.webdriver.common.appiumby import AppiumBy
 
+from adb import AdbShellError, adb_pull, adb_push, adb_shell
+from appium_log import AppiumLogDrain
+from bubbles import BUBBLE, BubbleIndex, bubble_keys
+from captions import CaptionLibrary
+from downloads import (DOWNLOAD_DIR, DOWNLOAD_TIMEOUT, MEDIA_STORE_TIMEOUT, list_videos, remove_all_videos,
+                       remove_video, wait_for_download, wait_for_media_store)
+from fingerprint import AVAILABLE as FINGERPRINT_AVAILABLE, FingerprintError, FingerprintIndex, fingerprint_video
+from inbox import read_inbox, threads_to_open
+from job_queue import DOWNLOADED, DISCOVERED, FAILED, JobQueue
+from locator import Screen, Selector
+from memory_watch import MemoryWatchdog, cache_commands, parse_sdk
+from metrics import METRICS, METRICS_PORT, instrument_driver, timed
+from navigation import Navigator, fingerprint as screen_name
+from notifications import DmNotificationWatcher
+from popups import dismiss_popups
+from reel_store import PROCESSED_DB, ReelStore
+from selector_cache import SelectorRegistry
+from session_trace import TraceRecorder
+from recovery import RecoveryManager
+from video_cache import VideoCache
+
 
 YOUR_USERNAME = ""
+SENDERS = []  # Usernames whose reels are reposted, highest priority first (empty = just YOUR_USERNAME)
+THREAD_ID = ""  # Optional: ID of the direct thread with YOUR_USERNAME, opened by deep link when the inbox cannot be
 
-APPIUM_SERVER = "http://localhost:4723"
+APPIUM_PORT = 4723
+SYSTEM_PORT = 8200  # UiAutomator2 server port on the host; must be unique per device
 DEVICE_ID = ""
 
+UIA2_PACKAGE = "io.appium.uiautomator2.server"
+APPIUM_START_TIMEOUT = 60  # Maximum seconds to wait for a new Appium server to answer /status
+
+KEYCODE_PASTE = 279
+RETURN_SETTLE_TIME = 2  # Seconds an unrecognised screen may take to settle while returning to the thread
+TEXT_LENGTH_TOLERANCE = 3  # Characters a verified field may differ by (see text_matches)
+
 CHECK_INTERVAL = 320  # Check for new DMs every 320 seconds
+INBOX_FULL_SCAN_EVERY = 12  # Every Nth cycle (and the first), open every monitored thread even if it is not unread (0 = never)
+BATCH_LIMIT = 10  # Maximum number of new reels picked up per visit to the thread
+NOTIFICATION_TRIGGER = True  # Wake up early when a DM notification arrives (CHECK_INTERVAL stays as fallback)
+NOTIFICATION_POLL_INTERVAL = 3  # Seconds between notification list reads
+MEMORY_WATCHDOG = True  # Sample device memory and recycle Instagram/UiAutomator2 between cycles (see memory_watch.py)
+PUBLISH_PER_HOUR = 6  # Maximum reposts per hour; extra reels wait in the queue (0 = no limit)
+BUBBLE_DEDUPE = True  # Recognise reels seen before from the thread snapshot instead of opening them
+FINGERPRINTING = True  # Reject re-encoded/watermarked copies by perceptual hash (needs numpy and ffmpeg)
+TRACE_SESSIONS = False  # Record every Appium/adb call and stage screen to logs/trace-<device>.jsonl (see session_trace.py)
+
+
+class BotConfig:
+    """Settings for one bot instance (one device).
+
+    Anything not given falls back to the module-level constants above, so a
+    single-device run needs no config object at all.
+    """
+
+    def __init__(self, device_id=None, username=None, appium_port=None, system_port=None,
+                 store_path=PROCESSED_DB, thread_id=None, publish_per_hour=None, metrics_port=None,
+                 trace=None, check_interval=None, senders=None):
+        self.device_id = DEVICE_ID if device_id is None else device_id
+        self.username = YOUR_USERNAME if username is None else username
+        self.thread_id = THREAD_ID if thread_id is None else thread_id
+        self.appium_port = appium_port or APPIUM_PORT
+        self.system_port = system_port or SYSTEM_PORT
+        self.store_path = store_path
+        self.publish_per_hour = PUBLISH_PER_HOUR if publish_per_hour is None else publish_per_hour
+        self.metrics_port = METRICS_PORT if metrics_port is None else metrics_port
+        self.trace = TRACE_SESSIONS if trace is None else trace
+        self.check_interval = check_interval or CHECK_INTERVAL
+        senders = senders or SENDERS or [self.username]
+        self.senders = [sender.strip().lstrip('@') for sender in senders if sender and sender.strip()]
+
+    @property
+    def appium_server(self):
+        return f"http://localhost:{self.appium_port}"
+
+    @property
+    def name(self):
+        return self.device_id or "default"
+
 
 class InstagramReelsBot:
-    def __init__(self):
+    def __init__(self, config=None, status_queue=None):
+        self.config = config or BotConfig()
         self.driver = None
         self.appium_process = None
+        self.appium_log = None
+        self.processed = ReelStore(self.config.store_path)
+        self.jobs = JobQueue(self.config.store_path)
+        self.video_cache = VideoCache()
+        self.bubbles = BubbleIndex(self.config.store_path) if BUBBLE_DEDUPE else None
+        self.fingerprints = None
+        if FINGERPRINTING and FINGERPRINT_AVAILABLE:
+            self.fingerprints = FingerprintIndex()
+        elif FINGERPRINTING:
+            print("[INFO] numpy or ffmpeg not found, near-duplicate detection is disabled")
+        self.dm_watcher = None
+        self.memory_watch = None
+        self.sdk = None  # Device API level, read once when the caches are first cleared
+        self.status_queue = status_queue
+        self.stats = {'reposted': 0, 'skipped': 0, 'errors': 0}
+        self.cycles = 0  # Completed check cycles
+        self.metrics_server = None
+        METRICS.base_labels['device'] = self.config.name
+        METRICS.open_log(f"bot-{self.config.name}")
+        self.trace = None
+        if self.config.trace:
+            self.trace = TraceRecorder(self.config.name, username=self.config.username,
+                                       senders=self.config.senders, thread_id=self.config.thread_id,
+                                       publish_per_hour=self.config.publish_per_hour)
+            METRICS.stage_listeners.append(self.trace.stage)
+            self.shell = self.trace.wrap('shell', self.shell)
+            self.pull = self.trace.wrap('pull', self.pull)
+            self.push = self.trace.wrap('push', self.push)
+            print(f"[INFO] Tracing this session to {self.trace.path}")
+        self.timings = {}
+        self.navigator = Navigator(None, self.shell)
+        self.selectors = SelectorRegistry()
+        self.captions = CaptionLibrary()
+        for problem in self.captions.validate():
+            print(f"[WARNING] Caption template problem: {problem}")
+        self.recovery = RecoveryManager([
+            ("new_session", self.recover_new_session),
+            ("restart_uia2", self.recover_uiautomator2),
+            ("restart_appium", self.recover_appium),
+            ("restart_app", self.recover_instagram),
+        ])
+
+    def shell(self, command, timeout=15):
+        """Run a shell command on this bot's device"""
+        return adb_shell(self.config.device_id, command, timeout)
+
+    def pull(self, remote_path, local_path):
+        """Copy a file from this bot's device to the host"""
+        adb_pull(self.config.device_id, remote_path, local_path)
+
+    def push(self, local_path, remote_path):
+        """Copy a file from the host to this bot's device"""
+        adb_push(self.config.device_id, local_path, remote_path)
+
+    def report(self, state, **info):
+        """Publish this worker's state to the supervisor, if there is one"""
+        if self.status_queue is None:
+            return
+        try:
+            self.status_queue.put_nowait({
+                'device': self.config.name,
+                'state': state,
+                'time': time.time(),
+                **self.stats,
+                **info,
+            })
+        except Exception:
+            pass
+
+    def count(self, stat, **labels):
+        """Bump a stat shown to the supervisor and its Prometheus counter"""
+        self.stats[stat] += 1
+        METRICS.inc('bot_errors_total' if stat == 'errors' else f"bot_reels_{stat}_total", **labels)
+        if labels:
+            METRICS.event(stat, **labels)
 
     def load_processed_reels(self, id):
-        """Load list of already processed reels"""
-        if not os.path.exists('processed_reels.txt'):
-            # in case the file does not exist, we will create it
-            with open('processed_reels.txt', 'w') as f:
-                pass
+        """Check a reel ID against the processed reels store"""
+        if id in self.processed:
+            print(f"[INFO] Reel {id} already processed, skipping...")
+            print(f"Checking again after {self.config.check_interval} seconds...")
+            return False
+        return True
+
+    def save_processed_reels(self, id):
+        """Save reel ID to the processed reels store"""
+        self.processed.add(id)
+
+    def claim_reel(self, id):
+        """Lease a reel in the shared store so no other device reposts it"""
+        if self.processed.claim(id, self.config.name):
             return True
+        print(f"[INFO] Reel {id} is processed or claimed by another device, skipping...")
+        return False
 
-        with open('processed_reels.txt', 'r') as file:
-            content = file.read()
-            if id in content:
-                print(f"[INFO] Reel {id} already processed, skipping...")
-                print(f"Checking again after {CHECK_INTERVAL} seconds...")
-                return False
-            else:
-                return True
+    def is_appium_ready(self, timeout=2):
+        """Probe Appium's GET /status endpoint"""
+        try:
+            with urllib.request.urlopen(f"{self.config.appium_server}/status", timeout=timeout) as response:
+                status = json.loads(response.read().decode('utf-8'))
+            return bool(status.get('value', {}).get('ready', True))
+        except Exception:
+            return False
 
-    def save_processed_reels(self, id):
-        """Save list of processed reels"""
-        with open('processed_reels.txt', 'a') as file:
-            file.write(f"\n{id}")
+    def is_port_open(self, port):
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        try:
+            return sock.connect_ex(('localhost', port)) == 0
+        finally:
+            sock.close()
 
+    def wait_until(self, condition, timeout, initial_delay=0.1, max_delay=2):
+        """Poll condition() with exponential backoff; returns True once it holds"""
+        deadline = time.monotonic() + timeout
+        delay = initial_delay
+        while True:
+            if condition():
+                return True
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(min(delay, max(0, deadline - time.monotonic())))
+            delay = min(delay * 2, max_delay)
+
+    def start_appium_server(self, force_restart=False):
+        """Start Appium server in background, with OS-specific handling.
 
-    def start_appium_server(self):
-        """Start Appium server in background, with OS-specific handling."""
+        A server that already answers GET /status on our port is reused
+        unless force_restart is set. Returns True once the server is ready.
+        """
         print("[INFO] Checking if Appium is already running...")
         current_os = platform.system()
+        started = time.monotonic()
 
-        # Check if Appium is already running on port 4723 and kill it
-        try:
-            import socket
-            sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            result = sock.connect_ex(('localhost', 4723))
-            sock.close()
+        port = self.config.appium_port
 
-            if result == 0:
-                print("[INFO] Appium is already running on port 4723")
+        if not force_restart and self.is_appium_ready():
+            self.timings['appium_start'] = time.monotonic() - started
+            print(f"[SUCCESS] Reusing healthy Appium server on port {port}")
+            return True
+
+        # Something is on our port but it is unhealthy (or a restart was asked
+        # for), so kill it. Only the process owning this port is killed, other
+        # devices' servers keep running.
+        try:
+            if self.is_port_open(port):
+                print(f"[INFO] Appium is already running on port {port}")
                 print("[INFO] Killing existing Appium server to start fresh with correct environment...")
                 if current_os == "Windows":
-                    subprocess.run(['taskkill', '/F', '/IM', 'node.exe'], stderr=subprocess.DEVNULL)
+                    netstat = subprocess.run(['netstat', '-ano', '-p', 'TCP'], capture_output=True, text=True)
+                    for line in netstat.stdout.splitlines():
+                        fields = line.split()
+                        if len(fields) >= 5 and fields[1].endswith(f":{port}") and fields[3] == "LISTENING":
+                            subprocess.run(['taskkill', '/F', '/T', '/PID', fields[4]], stderr=subprocess.DEVNULL)
                 else:  # macOS and Linux
-                    subprocess.run(['pkill', '-f', 'appium'], stderr=subprocess.DEVNULL)
-                time.sleep(2)  # Wait for process to die
+                    subprocess.run(['pkill', '-f', f'appium.*--port {port}'], stderr=subprocess.DEVNULL)
+                    lsof = subprocess.run(['lsof', '-ti', f'tcp:{port}', '-sTCP:LISTEN'], capture_output=True, text=True)
+                    for pid in lsof.stdout.split():
+                        subprocess.run(['kill', pid], stderr=subprocess.DEVNULL)
+                if not self.wait_until(lambda: not self.is_port_open(port), timeout=10):
+                    print(f"[WARNING] Port {port} is still in use")
         except Exception as e:
             print(f"[WARNING] Failed to check or kill existing Appium process: {e}")
 
@@ -107,13 +303,13 @@ class InstagramReelsBot:
             executable = None
 
             if current_os == "Windows":
-                command = ['appium']
+                command = ['appium', '--port', str(port)]
                 shell = True
             else:
                 command = f'''
                 export NVM_DIR="$HOME/.nvm"
                 [ -s "$NVM_DIR/nvm.sh" ] && . "$NVM_DIR/nvm.sh"
-                appium
+                appium --port {port}
                 '''
                 shell = True
                 executable = '/bin/bash'
@@ -125,23 +321,34 @@ class InstagramReelsBot:
                 stderr=subprocess.STDOUT,
                 executable=executable,
                 text=True,
+                encoding='utf-8',
+                errors='replace',
                 env=env
             )
+            # Keep reading Appium's output, otherwise the pipe fills up and Appium blocks
+            self.appium_log = AppiumLogDrain(self.appium_process.stdout, name=f"appium-{port}").start()
 
-            # Give Appium a few seconds to start and check output
+            # Poll /status until Appium answers (or the process dies)
             print("[INFO] Waiting for Appium to start...")
-            time.sleep(5)
+            self.wait_until(lambda: self.appium_process.poll() is not None or self.is_appium_ready(timeout=1),
+                            timeout=APPIUM_START_TIMEOUT)
 
             # Check if process is still running
             if self.appium_process.poll() is not None:
                 # Process died, show the output
-                output = self.appium_process.stdout.read()
+                self.appium_log.thread.join(timeout=2)
                 print("[ERROR] Appium failed to start")
                 print("[ERROR] Output:")
-                print(output)
+                print(self.appium_log.tail())
                 return False
 
-            print("[SUCCESS] Appium server started")
+            if not self.is_appium_ready():
+                print(f"[ERROR] Appium did not become ready within {APPIUM_START_TIMEOUT} seconds")
+                print(self.appium_log.tail())
+                return False
+
+            self.timings['appium_start'] = time.monotonic() - started
+            print(f"[SUCCESS] Appium server started in {self.timings['appium_start']:.1f}s")
             return True
 
         except FileNotFoundError:
@@ -154,7 +361,7 @@ class InstagramReelsBot:
             return False
 
     def stop_appium_server(self):
-        """Stop Appium server"""
+        """Stop the Appium server this bot started (a reused server is left running)"""
         if self.appium_process:
             print("[INFO] Stopping Appium server...")
             try:
@@ -172,13 +379,15 @@ class InstagramReelsBot:
                 except Exception as kill_e:
                     print(f"[ERROR] Failed to kill Appium process: {kill_e}")
 
+    @timed("connect")
     def connect(self):
         """Connect to Instagram app via Appium"""
         print("[INFO] Connecting to device...")
 
         options = UiAutomator2Options()
         options.platform_name = "Android"
-        options.udid = DEVICE_ID
+        options.udid = self.config.device_id
+        options.system_port = self.config.system_port
         options.app_package = "com.instagram.android"
         options.app_activity = "com.instagram.android.activity.MainTabActivity"
         options.no_reset = True
@@ -190,41 +399,60 @@ class InstagramReelsBot:
         options.auto_launch = True
         options.ensure_webviews_have_pages = True
 
-        self.driver = webdriver.Remote(APPIUM_SERVER, options=options)
+        started = time.monotonic()
+        driver = webdriver.Remote(self.config.appium_server, options=options)
+        if self.trace:
+            self.trace.attach(driver)
+        self.driver = instrument_driver(driver, METRICS)
         self.driver.implicitly_wait(10)
+        self.navigator.driver = self.driver
 
         print("[SUCCESS] Connected to Instagram app!")
         print("[INFO] Launching Instagram...")
-        time.sleep(5)
 
-        # Force activate the app if it's not in foreground
-        try:
-            self.driver.activate_app("com.instagram.android")
-            time.sleep(5)
-        except:
-            pass
+        # Wait for Instagram to be in the foreground instead of sleeping blindly,
+        # and force activate the app if it does not get there on its own
+        if not self.wait_until(self.is_instagram_foreground, timeout=5):
+            try:
+                self.driver.activate_app("com.instagram.android")
+            except:
+                pass
+            if not self.wait_until(self.is_instagram_foreground, timeout=15):
+                print("[WARNING] Instagram is not in the foreground")
+
+        self.timings['session'] = time.monotonic() - started
+        self.selectors.set_context(self.config.device_id, self.instagram_version())
+        print(f"[INFO] Session ready in {self.timings['session']:.1f}s")
 
         # Handle any initial pop-ups after launch
         self.handle_popups()
 
+    def instagram_version(self):
+        """Installed Instagram versionName, used to key selector statistics"""
+        try:
+            output = self.shell("dumpsys package com.instagram.android | grep -m1 versionName")
+            return output.strip().partition('=')[2] or None
+        except Exception:
+            return None
+
+    def is_instagram_foreground(self):
+        try:
+            return self.driver.current_package == "com.instagram.android"
+        except Exception:
+            return False
+
     def is_logged_in(self):
         """Check if already logged in"""
         try:
             # Look for home screen elements
+            screen = Screen(self.driver)
             home_indicators = [
-                "//android.widget.FrameLayout[@content-desc='Home']",
-                "com.instagram.android:id/tab_bar"
+                Selector(class_name="android.widget.FrameLayout", desc="Home"),
+                Selector(resource_id="com.instagram.android:id/tab_bar"),
             ]
-            for selector in home_indicators:
-                try:
-                    if selector.startswith("//"):
-                        self.driver.find_element(AppiumBy.XPATH, selector)
-                    else:
-                        self.driver.find_element(AppiumBy.ID, selector)
-                    print("[INFO] Already logged in!")
-                    return True
-                except:
-                    continue
+            if screen.first(*home_indicators)[1] is not None:
+                print("[INFO] Already logged in!")
+                return True
         except:
             pass
         return False
@@ -239,67 +467,95 @@ class InstagramReelsBot:
             return False
         return False
 
-    def handle_popups(self):
-        """Handle common pop-ups by clicking 'Not now' or similar buttons."""
+    @timed("handle_popups")
+    def handle_popups(self, screen=None):
+        """Dismiss any known pop-ups (see popups.POPUP_RULES) in one snapshot."""
         print("[INFO] Checking for pop-ups...")
-
-
-        popup_selectors = [
-            (AppiumBy.ACCESSIBILITY_ID, "Not now"),
-            (AppiumBy.ANDROID_UIAUTOMATOR, 'new UiSelector().text("OK")'),
-            (AppiumBy.ANDROID_UIAUTOMATOR, 'new UiSelector().text("Got it")'),
-            (AppiumBy.ID, "com.instagram.android:id/appirater_cancel_button"),
-            (AppiumBy.ANDROID_UIAUTOMATOR, 'new UiSelector().text("No, thanks")')
-        ]
-
-        for by, selector in popup_selectors:
-            try:
-                element = WebDriverWait(self.driver, 2).until(EC.presence_of_element_located((by, selector)))
-                element.click()
-                print(f"[SUCCESS] Dismissed popup using: {selector}")
-                time.sleep(1)
-            except:
-                continue
-
         try:
-            if len(self.driver.find_elements(AppiumBy.ANDROID_UIAUTOMATOR,
-                                             'new UiSelector().text("Get more from your next reel")')) > 0:
-                self.driver.find_element(AppiumBy.ANDROID_UIAUTOMATOR, 'new UiSelector().text("For you")').click()
-        except:
-            pass
+            return dismiss_popups(self.driver, screen)
+        except Exception as e:
+            print(f"[WARNING] Pop-up check failed: {e}")
+            return []
 
+    @timed("navigate_to_dms")
     def navigate_to_dms(self):
         """Navigate to DM inbox"""
         print("[INFO] Opening DMs...")
-        try:
-            # Look for messenger/DM icon
-            dm_button = WebDriverWait(self.driver, 10).until(EC.presence_of_element_located((AppiumBy.ID, "com.instagram.android:id/direct_tab")))
-            dm_button.click()
-            print("[SUCCESS] Opened DMs")
-            return True
+        with self.navigator.timed():
+            try:
+                if self.navigator.go("inbox"):
+                    print("[SUCCESS] Opened DMs")
+                    return True
 
-        except Exception as e:
-            print(f"[ERROR] Failed to open DMs: {e}")
+                # Fall back to the DM icon on the home screen
+                self.go_home()
+                dm_button = WebDriverWait(self.driver, 10).until(EC.presence_of_element_located((AppiumBy.ID, "com.instagram.android:id/direct_tab")))
+                dm_button.click()
+                print("[SUCCESS] Opened DMs")
+                return True
+
+            except Exception as e:
+                print(f"[ERROR] Failed to open DMs: {e}")
+                return False
+
+    @timed("open_thread")
+    def open_thread(self, thread_id):
+        """Open a direct thread by ID with a deep link"""
+        if not thread_id:
             return False
+        with self.navigator.timed():
+            try:
+                if self.navigator.go("thread", thread_id=thread_id):
+                    print(f"[SUCCESS] Opened thread {thread_id}")
+                    return True
+            except Exception as e:
+                print(f"[WARNING] Could not open thread {thread_id} directly: {e}")
+        return False
 
-    def find_conversation(self, username):
-        """Find and open conversation with specific user"""
+    def inbox_screen(self):
+        """Snapshot of the inbox, reusing the one navigate_to_dms just took"""
+        screen = self.navigator.screen
+        if screen is not None and screen_name(screen) == "inbox":
+            return screen
+        return Screen(self.driver)
+
+    @timed("scan_inbox")
+    def scan_inbox(self, screen):
+        """Read the inbox once and pick the monitored threads to open.
+
+        Only threads with an unread mark are opened, plus those of senders
+        with downloads due for a retry or a walk that was cut short (their
+        threads are already read).
+        Every INBOX_FULL_SCAN_EVERY cycles all monitored threads are opened,
+        in case a thread was read on another device. Returns usernames,
+        highest priority first.
+        """
+        rows = read_inbox(screen)
+        retries = {job['sender'] for job in self.jobs.due(self.config.name, DISCOVERED) if job['sender']}
+        retries.update(self.jobs.unfinished_walks(self.config.name))
+        if INBOX_FULL_SCAN_EVERY and self.cycles % INBOX_FULL_SCAN_EVERY == 0:
+            retries = set(self.config.senders)
+        targets = [row.username for row in threads_to_open(rows, self.config.senders, retries)]
+
+        print(f"[INFO] Inbox: {len(rows)} thread(s), {sum(row.unread for row in rows)} unread, "
+              f"{len(targets)} to open from monitored senders")
+        visible = {row.username.lower() for row in rows}
+        for sender in retries:
+            if sender.lower() not in visible:
+                print(f"[WARNING] No conversation with @{sender} on the first inbox page")
+        return targets
+
+    @timed("find_conversation")
+    def find_conversation(self, username, screen=None):
+        """Find and open the conversation with exactly this user"""
         print(f"[INFO] Looking for conversation with @{username}...")
         try:
-            # Look for username in conversation list
-            conversation_selectors = [
-                f"new UiSelector().text('{username}')",
-                f'new UiSelector().resourceId("com.instagram.android:id/row_inbox_username")'
-            ]
-
-            for selector in conversation_selectors:
-                try:
-                    conversation = self.driver.find_element(AppiumBy.ANDROID_UIAUTOMATOR, selector)
-                    conversation.click()
+            screen = screen or self.inbox_screen()
+            for row in read_inbox(screen):
+                if row.username.lower() == username.lower():
+                    screen.tap(row.node)
                     print(f"[SUCCESS] Opened conversation with @{username}")
                     return True
-                except:
-                    continue
 
             print(f"[WARNING] No conversation found with @{username}")
             return False
@@ -307,8 +563,247 @@ class InstagramReelsBot:
             print(f"[ERROR] Failed to find conversation: {e}")
             return False
 
-    def check_for_reels(self):
+    def find_reel_bubbles(self, timeout=10):
+        """Return the reel/media message bubbles currently visible in the thread"""
+        return WebDriverWait(self.driver, timeout).until(
+            EC.presence_of_all_elements_located(
+                (AppiumBy.ID, "com.instagram.android:id/message_content_horizontal_placeholder_container"))
+        )
+
+    def wait_for_control(self, locator, timeout=5):
+        """Wait for an element, dismissing pop-ups covering it once"""
+        try:
+            return WebDriverWait(self.driver, timeout).until(EC.presence_of_element_located(locator))
+        except TimeoutException:
+            if not self.handle_popups():
+                raise
+            return WebDriverWait(self.driver, timeout).until(EC.presence_of_element_located(locator))
+
+    def past_popups(self, screen, wait):
+        """Run a snapshot wait; if it finds nothing, dismiss pop-ups on that snapshot and wait once more"""
+        found = wait()
+        if found[1] is None and self.handle_popups(screen):
+            found = wait()
+        return found
+
+    def extract_reel_id(self, reel):
+        """Open a reel bubble, copy its link and return the reel ID"""
+        reel.click()
+
+        share_button = self.wait_for_control((AppiumBy.ANDROID_UIAUTOMATOR,
+            'new UiSelector().resourceId("com.instagram.android:id/direct_share_button")'))
+        share_button.click()
+
+        reel_link = self.wait_for_control((AppiumBy.ANDROID_UIAUTOMATOR, 'new UiSelector().description("Copy link")'))
+        reel_link.click()
+        time.sleep(1)
+        unique_id = re.search(r"\/reels?\/([^\/\?#]+)", self.driver.get_clipboard_text())
+
+        if not unique_id:
+            print("Warning: Regex could not find the ID in the string.")
+            return None
+        return unique_id.group(1)
+
+    def return_to_thread(self, max_presses=3, back_first=True):
+        """Press Back until the conversation is showing again.
+
+        Each step is one snapshot rather than an element lookup, which would
+        sit out the implicit wait on every screen that is not the thread.
+        Back is pressed again straight away when another known screen is on
+        top; only an unrecognised one (loading, a dialog) gets a moment to
+        settle first. Pass back_first=False when the thread may already be
+        showing, e.g. after a reel failed to open.
+        """
+        presses = 0
+        if back_first:
+            self.driver.back()
+            presses += 1
+        settle_until = time.monotonic() + RETURN_SETTLE_TIME
+        while True:
+            name = self.navigator.current()
+            if name == "thread":
+                return True
+            if name == "unknown" and time.monotonic() < settle_until:
+                time.sleep(0.5)
+                continue
+            if presses >= max_presses:
+                return False
+            self.driver.back()
+            presses += 1
+            settle_until = time.monotonic() + RETURN_SETTLE_TIME
+
+    def queue_reel(self, reel_id, batch, position, sender=None):
+        """Claim a new reel and add it to the job queue"""
+        if not self.claim_reel(reel_id):
+            return False
+        if self.jobs.discover(reel_id, self.config.name, batch, position, sender):
+            return True
+        print(f"[INFO] Reel {reel_id} is queued on another device, skipping...")
+        return False
+
+    def cache_video(self, reel_id, name):
+        """Pull a downloaded video into the host cache and remove it from the device.
+
+        Returns (digest, duplicate_of) as VideoCache.add does.
+        """
+        remote_path = f"{DOWNLOAD_DIR}/{name}"
+        local_path = os.path.join(self.video_cache.directory, f".incoming-{os.getpid()}-{name}")
+        try:
+            self.pull(remote_path, local_path)
+            return self.video_cache.add(local_path, reel_id)
+        finally:
+            if os.path.exists(local_path):
+                os.remove(local_path)
+            remove_video(self.shell, remote_path)
+
+    def find_near_duplicate(self, reel_id, digest):
+        """Perceptual check of a newly cached video.
+
+        Returns the reel ID of an earlier video that looks the same, or None
+        (after adding this video's fingerprint to the index). The reel's own
+        fingerprint from an earlier attempt (e.g. before a crash or a
+        re-download) never counts as a match.
+        """
+        if self.fingerprints is None:
+            return None
+        try:
+            fingerprint = fingerprint_video(self.video_cache.path(digest))
+        except (FingerprintError, OSError, subprocess.SubprocessError) as e:
+            print(f"[WARNING] Could not fingerprint reel {reel_id}: {e}")
+            return None
+
+        match = self.fingerprints.find(fingerprint, exclude=reel_id)
+        if match:
+            duplicate_of, distance = match
+            print(f"[INFO] Reel {reel_id} looks like reel {duplicate_of} (distance {distance:.1f})")
+            return duplicate_of
+        self.fingerprints.add(reel_id, fingerprint)
+        return None
+
+    def skip_duplicate(self, reel_id, duplicate_of, digest=None):
+        print(f"[INFO] Reel {reel_id} is the same video as reel {duplicate_of}, skipping...")
+        self.jobs.mark_failed(reel_id, f"duplicate of {duplicate_of}")
+        if digest and self.video_cache.owner(digest) == reel_id:
+            self.video_cache.unpin(digest)
+        self.save_processed_reels(reel_id)
+        self.count('skipped', reason="duplicate")
+
+    def ingest_reel(self, reel_id):
+        """Download the open reel for a queued job and record the outcome.
+
+        The video is moved to the host cache right away; a clip whose content
+        was already seen under another reel ID is rejected as a duplicate,
+        first by exact hash and then, if enabled, by perceptual fingerprint.
+        """
+        download = self.download_reel()
+        error = "download failed"
+        if download:
+            name, size = download
+            try:
+                digest, duplicate_of = self.cache_video(reel_id, name)
+            except (AdbShellError, OSError) as e:
+                error = f"could not copy video to the cache: {e}"
+            else:
+                duplicate_of = duplicate_of or self.find_near_duplicate(reel_id, digest)
+                if duplicate_of:
+                    self.skip_duplicate(reel_id, duplicate_of, digest)
+                    return False
+                self.jobs.mark_downloaded(reel_id, name, size, digest)
+                return True
+
+        state = self.jobs.retry(reel_id, error)
+        if state == FAILED:
+            # Give up for good so neither this nor another device keeps trying
+            self.save_processed_reels(reel_id)
+            self.count('skipped', reason="download_failed")
+            print(f"[WARNING] Reel {reel_id} could not be downloaded, giving up")
+        else:
+            print(f"[INFO] Reel {reel_id} could not be downloaded, will retry later")
+        return False
+
+    def reel_state(self, reel_id):
+        """Where a reel found in the thread stands, as (done, retry_download).
+
+        done means it was processed or is queued with nothing due, so the
+        thread walk can stop there. retry_download means it is this device's
+        queued reel whose download is due for another try.
+        """
+        job = self.jobs.get(reel_id)
+        retry_download = (job is not None and job['owner'] == self.config.name
+                          and job['state'] == DISCOVERED and self.jobs.is_due(job))
+        done = not self.load_processed_reels(reel_id) or (job is not None and not retry_download)
+        return done, retry_download
+
+    def identify_reel(self, position):
+        """Open the bubble at position and return its reel ID (None if it has none).
+
+        A failed attempt, usually a pop-up over the reel, is followed by a
+        pop-up check and one more try. Raises if that fails too.
+        """
+        for attempt in range(2):
+            reels = self.find_reel_bubbles()
+            if position >= len(reels):
+                return None
+            try:
+                return self.extract_reel_id(reels[position])
+            except Exception as e:
+                if attempt:
+                    raise
+                print(f"[WARNING] Could not open reel ({e}), checking for pop-ups and retrying...")
+                self.handle_popups()
+                self.return_to_thread(back_first=False)
+
+    def remember_bubble(self, thread, keys, position, reel_id):
+        """Store which reel the bubble at position linked to, back in the thread after opening it.
+
+        The thread is read again first: if its bubbles no longer match keys
+        (a message arrived), the bubble that was opened may not be the one at
+        position, so nothing is stored and False is returned.
+        """
+        if not self.bubbles or keys[position] is None:
+            return True
+        if bubble_keys(Screen(self.driver), thread) != keys:
+            print("[INFO] The thread changed while reading it, reading this page again")
+            return False
+        self.bubbles.remember(keys[position], reel_id)
+        return True
+
+    @timed("check_for_reels")
+    def check_for_reels(self, sender=None):
+        """Walk every reel bubble newer than the last known one and download it.
+
+        Bubbles are visited newest first until a processed or already queued
+        reel is reached, scrolling up through the thread while older reels
+        may be above. Each new reel is queued before it is downloaded; a
+        queued reel whose download is due for a retry is downloaded again on
+        the way. Nothing is marked processed here, that only happens once the
+        reel has been posted.
+
+        A walk cut short by BATCH_LIMIT or by a reel that would not open is
+        resumed next cycle: handled reels are then passed over instead of
+        ending the walk, until the newest reel of the last complete walk or
+        the top of the thread. So older reels are never left behind newer
+        ones. Handled reels are also passed over while queued reels of this
+        thread are due for another download (a failed one, or one whose
+        video left the cache) and not reached yet; one that is not found
+        before the top of the thread counts as a failed attempt.
+        sender is whose thread is open. Returns the IDs of the reels that
+        were downloaded, newest first.
+        """
         print("[INFO] Checking for reels...")
+        thread = sender or self.config.username
+        watermark, resume = self.jobs.walk(self.config.name, thread)
+        if resume:
+            print(f"[INFO] Resuming the last walk through this thread, back to reel {watermark or 'the first'}")
+        # Queued reels due for another download, wherever they are in the thread
+        wanted = {job['reel_id'] for job in self.jobs.due(self.config.name, DISCOVERED)
+                  if (job['sender'] or self.config.username).lower() == thread.lower()}
+        downloaded = []
+        batch = time.time()
+        seen = set()
+        picked = 0  # Reels queued or retried in this walk
+        newest = None
+        complete = False
         try:
             # Scroll up to load more messages
             print("[INFO] Scrolling to load messages...")
@@ -318,200 +813,596 @@ class InstagramReelsBot:
                 pass
 
             # Look for message_content FrameLayouts (these contain reels/media)
-            try:
-                print("[INFO] Looking for message_content elements...")
-                # 1. Wait for all elements to be present
-                reels = WebDriverWait(self.driver, 10).until(
-                    EC.presence_of_all_elements_located(
-                        (AppiumBy.ID, "com.instagram.android:id/message_content_horizontal_placeholder_container"))
-                )
-
-                # 2. Pick the last one (highest instance)
-                reel = reels[-1]
-                reel.click()
-
-                share_button = WebDriverWait(self.driver, 5).until(EC.presence_of_element_located(
-                    (AppiumBy.ANDROID_UIAUTOMATOR, 'new UiSelector().resourceId("com.instagram.android:id/direct_share_button")')))
-                share_button.click()
-
-                reel_link = WebDriverWait(self.driver, 5).until(EC.presence_of_element_located(
-                    (AppiumBy.ANDROID_UIAUTOMATOR, 'new UiSelector().description("Copy link")')))
-                reel_link.click()
-                time.sleep(1)
-                unique_id = self.driver.get_clipboard_text()
-                unique_id = re.search(r"\/reels?\/([^\/\?#]+)", unique_id)
+            print("[INFO] Looking for message_content elements...")
+            reached_processed = False
+            failed = False
+
+            def walks_on(reel_id):
+                """Whether the walk goes on past this handled reel"""
+                # A walk that was cut short resumes down to its watermark; due retries may be further up
+                return (resume and reel_id != watermark) or bool(wanted - seen)
+
+            page_had_unseen = False
+            while not (reached_processed or failed) and picked < BATCH_LIMIT:
+                moved = False  # A message arrived mid-walk and shifted the bubbles
+                # One snapshot identifies the bubbles of reels resolved in earlier cycles
+                screen = Screen(self.driver)
+                screen.wait_for(BUBBLE, timeout=10, refresh=False)
+                keys = bubble_keys(screen, thread)
+                position = len(keys)
+
+                # Walk from the last bubble (highest instance) towards older ones
+                while position > 0 and picked < BATCH_LIMIT:
+                    position -= 1
+                    key = keys[position]
+                    unique_id = self.bubbles.lookup(key) if self.bubbles else None
+                    if unique_id in seen:
+                        continue
+                    if unique_id is not None and self.reel_state(unique_id)[0] and walks_on(unique_id):
+                        # Recognised as handled and the walk goes past it anyway; a match never ends a walk
+                        print(f"[INFO] Reel {unique_id} recognised from its message, not opening it")
+                        METRICS.inc('bot_bubbles_recognised_total')
+                        seen.add(unique_id)
+                        page_had_unseen = True
+                        newest = newest or unique_id
+                        continue
 
-                if unique_id:
-                    unique_id = unique_id.group(1)
-                else:
-                    # If it fails, unique_id stays as the full URL or you can set a fallback
-                    print("Warning: Regex could not find the ID in the string.")
+                    try:
+                        unique_id = self.identify_reel(position)
+                    except Exception as e:
+                        # Stop here rather than skip it, so the next cycle starts from this reel
+                        print(f"[ERROR] Failed to process reel, leaving it for the next cycle: {e}")
+                        self.return_to_thread(back_first=False)
+                        failed = True
+                        break
+                    if unique_id is None or unique_id in seen:
+                        self.return_to_thread()
+                        continue
 
-                if self.load_processed_reels(unique_id):
-                    # Add to processed reels and save
-                    self.save_processed_reels(unique_id)
-                else:
-                    return False
+                    seen.add(unique_id)
+                    page_had_unseen = True
+                    newest = newest or unique_id
+                    done, retry_download = self.reel_state(unique_id)
+                    if done:
+                        self.return_to_thread()
+                        moved = not self.remember_bubble(thread, keys, position, unique_id)
+                        if not walks_on(unique_id):
+                            # Everything older than this was handled in an earlier cycle
+                            reached_processed = True
+                            break
+                        if moved:
+                            break
+                        continue  # Handled, but older reels may still be new or due for a retry
+
+                    picked += 1
+                    queued = True
+                    if retry_download:
+                        print(f"[INFO] Retrying download of queued reel {unique_id}")
+                    elif self.queue_reel(unique_id, batch, picked - 1, thread):
+                        print(f"[SUCCESS] Found new reel with ID: {unique_id}")
+                    else:
+                        self.count('skipped', reason="claimed")
+                        queued = False
 
-                print(f"[SUCCESS] Found new reel with ID: {unique_id}")
-                return True
+                    if queued and self.ingest_reel(unique_id):
+                        downloaded.append(unique_id)
 
+                    self.return_to_thread()
+                    if not self.remember_bubble(thread, keys, position, unique_id):
+                        moved = True
+                        break
 
-            except Exception as e:
-                print(f"[ERROR] Failed to process reel: {e}")
-                return None
+                if moved and not (reached_processed or failed):
+                    continue  # Read this page again; reels already seen are passed over
+                if reached_processed or failed or picked >= BATCH_LIMIT:
+                    break
+                if not page_had_unseen:
+                    # Scrolling up showed nothing new: this is the start of the thread
+                    complete = True
+                    break
+
+                # Older unseen reels may be above this screen
+                self.driver.swipe(500, 500, 500, 1000, 500)
+                page_had_unseen = False
+
+            complete = complete or reached_processed
 
         except Exception as e:
             print(f"[ERROR] Failed to check for reels: {e}")
-            return None
 
+        if complete:
+            for reel_id in wanted - seen:
+                # Went up to the top of the thread without finding it (message unsent or deleted?)
+                if self.jobs.retry(reel_id, "not found in the thread") == FAILED:
+                    self.save_processed_reels(reel_id)
+                    self.count('skipped', reason="download_failed")
+                    print(f"[WARNING] Queued reel {reel_id} is no longer in the thread, giving up")
+        self.jobs.finish_walk(self.config.name, thread, complete, newest)
+        if not complete:
+            print(f"[INFO] Stopped after {picked} reel(s), older reels in this thread are checked next cycle")
+        if downloaded:
+            print(f"[SUCCESS] Downloaded {len(downloaded)} new reel(s) from this thread")
+        return downloaded
+
+    def text_matches(self, element, text):
+        """Check a field's contents after entry.
+
+        Compares the normalized text first. If that fails (Instagram may
+        rewrite whitespace or emoji sequences), a length match within a few
+        characters is accepted.
+        """
+        try:
+            actual = element.text or ""
+        except Exception:
+            return False
+        expected = unicodedata.normalize('NFC', text).strip()
+        actual = unicodedata.normalize('NFC', actual).strip()
+        if actual == expected:
+            return True
+        return abs(len(actual) - len(expected)) <= TEXT_LENGTH_TOLERANCE
+
+    def enter_text(self, element, text):
+        """Put text into a field in one step instead of typing it key by key.
+
+        Tries a clipboard paste first, then UiAutomator2's set-text action,
+        and only falls back to send_keys if neither verifies. Returns the name
+        of the method that worked, or None.
+        """
+        def paste():
+            self.driver.set_clipboard_text(text)
+            self.driver.press_keycode(KEYCODE_PASTE)
+
+        def set_text():
+            self.driver.execute_script("mobile: replaceElementValue", {"elementId": element.id, "text": text})
 
+        def type_keys():
+            element.clear()
+            element.send_keys(text)
 
+        for name, action in (("clipboard paste", paste), ("set text", set_text), ("send_keys", type_keys)):
+            try:
+                action()
+            except Exception as e:
+                print(f"[DEBUG] Text entry via {name} failed: {str(e)[:100]}")
+                continue
+            if self.text_matches(element, text):
+                return name
+            print(f"[DEBUG] Text entry via {name} did not verify, trying next method")
+            try:
+                element.clear()
+            except Exception:
+                pass
+        return None
+
+    @timed("download_reel")
     def download_reel(self):
-        """Download reel by saving it"""
+        """Download reel by saving it.
+
+        Returns (file name, size) once the file on the device has stopped
+        growing, or False if there is no Download button or it never finished.
+        """
         print("[INFO] Downloading reel...")
 
         try:
             save_button = WebDriverWait(self.driver, 5).until(EC.presence_of_element_located((AppiumBy.ANDROID_UIAUTOMATOR, 'new UiSelector().description("Download")')))
-            save_button.click()
-            time.sleep(10)
-            print("[SUCCESS] Reel saved!")
-
         except:
             print("[WARNING] Could not find Download button")
+            METRICS.inc('bot_no_download_button_total')
             return False
 
-        return True
+        before = list_videos(self.shell)
+        save_button.click()
+        started = time.monotonic()
+        download = wait_for_download(self.shell, before, timeout=DOWNLOAD_TIMEOUT)
+        if download is None:
+            print(f"[WARNING] Download did not complete within {DOWNLOAD_TIMEOUT} seconds")
+            return False
+
+        name, size = download
+        print(f"[SUCCESS] Reel saved! {name} ({size / 1024 / 1024:.1f} MB in {time.monotonic() - started:.1f}s)")
+        return download
 
+    @timed("go_home")
     def go_home(self):
         """Navigate to home screen"""
-        selector = 'new UiSelector().resourceId("com.instagram.android:id/title_text").text("For you")'
-        attempts = 0
-        max_attempts = 7
+        with self.navigator.timed():
+            if self.navigator.go("home"):
+                return
 
-        while len(self.driver.find_elements(AppiumBy.ANDROID_UIAUTOMATOR, value=selector)) == 0:
-            if attempts >= max_attempts:
-                print("[WARNING] Could not reach Home screen after multiple attempts. Restarting app...")
-                self.driver.activate_app("com.instagram.android")
-                time.sleep(2)
-                break
+            # Deep link unavailable: press Back, fingerprinting the screen in one query each time
+            attempts = 0
+            max_attempts = 7
 
-            self.driver.back()
-            time.sleep(2)
-            attempts += 1
+            while self.navigator.current() != "home":
+                if attempts >= max_attempts:
+                    print("[WARNING] Could not reach Home screen after multiple attempts. Restarting app...")
+                    self.driver.activate_app("com.instagram.android")
+                    time.sleep(2)
+                    break
+
+                self.driver.back()
+                time.sleep(1)
+                attempts += 1
 
+    @timed("clear_stored_videos")
     def clear_stored_videos(self):
-        """Deletes downloaded video files from the specific internal storage path"""
+        """Deletes downloaded video files from the specific internal storage path.
+
+        Queued videos live in the host cache, so nothing on the device needs keeping.
+        """
         print("[INFO] Clearing video files from emulator memory...")
         try:
-            target_path = "/storage/emulated/0/Movies/Instagram/*"
+            target_path = f"{DOWNLOAD_DIR}/*"
 
-            command = f"adb shell rm -f {target_path}"
-
-            subprocess.run(command.split(), stderr=subprocess.DEVNULL, stdout=subprocess.DEVNULL)
+            remove_all_videos(self.shell)
 
             print(f"[SUCCESS] Cleared files from {target_path}")
         except Exception as e:
             print(f"[WARNING] Could not clear files: {e}")
 
-    def repost_reel(self):
-        """Create new reel post from saved video"""
+    def clear_instagram_cache(self):
+        """Remove Instagram's caches and saved post copies; run with the app stopped"""
+        print("[INFO] Clearing Instagram caches...")
+        if self.sdk is None:
+            try:
+                self.sdk = parse_sdk(self.shell("getprop ro.build.version.sdk"))
+            except Exception as e:
+                print(f"[WARNING] Could not read the Android version: {e}")
+        for command in cache_commands(self.sdk):
+            try:
+                self.shell(f"{command} 2>/dev/null; true", timeout=60)
+            except Exception as e:
+                print(f"[WARNING] Could not run '{command}': {e}")
+
+    def push_video(self, job):
+        """Copy a cached video back to the device as the newest file in the gallery"""
+        remote_path = f"{DOWNLOAD_DIR}/{job['file_name']}"
+        self.push(self.video_cache.path(job['content_hash']), remote_path)
+        # adb push keeps the host modification time; make it the newest video and index it
+        self.shell(f"touch {shlex.quote(remote_path)}")
+        if not wait_for_media_store(self.shell, remote_path):
+            remove_video(self.shell, remote_path)
+            raise AdbShellError(f"{remote_path} was not indexed by MediaStore within {MEDIA_STORE_TIMEOUT}s")
+        return remote_path
+
+    @timed("publish_pending")
+    def publish_pending(self):
+        """Repost downloaded reels from the queue, oldest first, within the publish rate.
+
+        Each video is pushed from the host cache to the device just before it
+        is posted, so it is always the first item in the gallery. Reels over
+        the rate stay queued for a later cycle. A failed repost is retried
+        with backoff; after too many failures the reel is given up.
+        Returns the number of reels posted.
+        """
+        owner = self.config.name
+        # Keep the leases of queued reels alive however long they wait for the publish rate
+        for job in self.jobs.jobs(owner, DISCOVERED) + self.jobs.jobs(owner, DOWNLOADED):
+            self.processed.claim(job['reel_id'], owner)
+
+        pending = self.jobs.due(owner, DOWNLOADED)
+        if not pending:
+            return 0
+
+        posted = 0
+        for number, job in enumerate(pending, 1):
+            reel_id = job['reel_id']
+            wait = self.jobs.next_publish_in(owner, self.config.publish_per_hour)
+            if wait > 0:
+                print(f"[INFO] Publish rate of {self.config.publish_per_hour}/hour reached, "
+                      f"{len(pending) - number + 1} reel(s) queued, next post in {wait:.0f}s")
+                break
+
+            digest = job['content_hash']
+            posted_as = self.video_cache.posted_as(digest) if digest else None
+            if posted_as and posted_as != reel_id:
+                self.skip_duplicate(reel_id, posted_as)
+                continue
+            if not digest or not self.video_cache.is_cached(digest):
+                print(f"[WARNING] Video for reel {reel_id} is no longer in the cache, downloading it again")
+                self.jobs.reset(reel_id)
+                continue
+
+            # The lease must still be ours: never post a reel another device has taken over or posted
+            if not self.processed.claim(reel_id, owner):
+                print(f"[INFO] Reel {reel_id} was posted or claimed by another device, skipping...")
+                self.jobs.mark_failed(reel_id, "claimed by another device")
+                if self.video_cache.owner(digest) == reel_id:
+                    self.video_cache.unpin(digest)
+                self.count('skipped', reason="claimed")
+                continue
+            self.go_home()
+            self.handle_popups() # Handle pop-ups after download / previous repost
+
+            print(f"[INFO] Reposting reel {reel_id} ({number}/{len(pending)})")
+            self.report('reposting', reel=reel_id)
+            self.video_cache.touch(digest)
+            try:
+                remote_path = self.push_video(job)
+            except AdbShellError as e:
+                print(f"[ERROR] Could not copy reel {reel_id} to the device: {e}")
+                remote_path = None
+
+            ok = remote_path is not None and self.repost_reel(0, reel_id, job['sender'])
+            if remote_path:
+                remove_video(self.shell, remote_path)
+            if ok:
+                self.jobs.mark_posted(reel_id)
+                self.video_cache.mark_posted(digest)
+                self.save_processed_reels(reel_id)
+                posted += 1
+            elif self.jobs.retry(reel_id, "repost failed") == FAILED:
+                self.video_cache.unpin(digest)
+                self.save_processed_reels(reel_id)
+                self.count('skipped', reason="repost_failed")
+                print(f"[ERROR] Giving up on reel {reel_id} after repeated repost failures")
+
+            self.handle_popups() # Final check before next reel
+        return posted
+
+    def next_check_in(self):
+        """Seconds until the next cycle: the check interval, or sooner when a queued reel can be posted"""
+        owner = self.config.name
+        due = self.jobs.next_due_in(owner, DOWNLOADED)
+        if due is None:
+            return self.config.check_interval
+        wait = max(due, self.jobs.next_publish_in(owner, self.config.publish_per_hour), 1)
+        return min(self.config.check_interval, wait)
+
+    @timed("repost_reel")
+    def repost_reel(self, gallery_index=0, reel_id="", sender=None):
+        """Create new reel post from saved video.
+
+        gallery_index selects the video in the gallery picker, where 0 is the
+        most recently downloaded one. sender is who sent the reel, for the caption.
+        """
         print("[INFO] Reposting reel...")
+        # Rendered up front from precompiled templates, no device round trips
+        caption_text = self.captions.render(reel_id, sender or self.config.username)
         try:
-            # Click create button - try multiple strategies with the exact attributes you provided
-            create_btn = None
-            strategies = [
-                '//android.widget.LinearLayout[@resource-id="com.instagram.android:id/action_bar_buttons_container_left"]/android.widget.ImageView',
-                'new UiSelector().resourceId("com.instagram.android:id/action_bar_buttons_container_left").childSelector(new UiSelector().className("android.widget.ImageView").clickable(true))',
-                'new UiSelector().className("android.widget.ImageView").bounds(0, 63, 127, 210)',
-            ]
-            
-            for strategy in strategies:
-                try:
-                    if strategy.startswith('//'):
-                        # XPath strategy
-                        create_btn = WebDriverWait(self.driver, 3).until(
-                            EC.presence_of_element_located((AppiumBy.XPATH, strategy)))
-                    else:
-                        # UiAutomator strategy
-                        create_btn = WebDriverWait(self.driver, 3).until(
-                            EC.presence_of_element_located((AppiumBy.ANDROID_UIAUTOMATOR, strategy)))
-                    
-                    if create_btn:
-                        print(f"[SUCCESS] Found create button using: {strategy}")
-                        break
-                except Exception as find_error:
-                    print(f"[DEBUG] Strategy failed: {strategy} - {str(find_error)[:100]}")
-                    continue
-            
-            if not create_btn:
+            # Click create button - the strategy that worked last time is tried first
+            screen = Screen(self.driver)
+            strategy, create_btn = self.past_popups(
+                screen, lambda: self.selectors.wait_for(screen, "create_button", timeout=5, refresh=False))
+            if create_btn is None:
                 raise Exception("Could not find create button with any strategy. Please check if Instagram layout has changed.")
-            create_btn.click()
+            print(f"[SUCCESS] Found create button using: {strategy}")
+            screen.tap(create_btn)
 
             # Select Reel
-            select_reel = WebDriverWait(self.driver, 5).until(
-                EC.presence_of_element_located((AppiumBy.ANDROID_UIAUTOMATOR,
-                                                'new UiSelector().resourceId("com.instagram.android:id/background_color").instance(0)')))
-            select_reel.click()
+            gallery_item = Selector(resource_id="com.instagram.android:id/background_color", instance=gallery_index)
+            _, select_reel = self.past_popups(screen, lambda: screen.wait_for(gallery_item, timeout=5))
+            if select_reel is None:
+                raise Exception(f"Could not find video {gallery_index} in the gallery")
+            screen.tap(select_reel)
 
             # Click Next multiple times
-            next_btn = WebDriverWait(self.driver, 5).until(
-                EC.presence_of_element_located((AppiumBy.ID, "com.instagram.android:id/next_button_textview")))
-            next_btn.click()
+            _, next_btn = self.past_popups(screen, lambda: self.selectors.wait_for(screen, "next_button", timeout=5))
+            if next_btn is None:
+                raise Exception("Could not find Next button")
+            screen.tap(next_btn)
 
             # Second Next button
-            next_btn_2nd = WebDriverWait(self.driver, 5).until(EC.presence_of_element_located(
-                (AppiumBy.ANDROID_UIAUTOMATOR,
-                 'new UiSelector().resourceId("com.instagram.android:id/clips_right_action_button")')))
-            next_btn_2nd.click()
-
-
-            print("[INFO] Adding caption...")
-            try:
-                caption_text = (
-                    "#🇯🇵Japan is turning footsteps into electricity! "
-                    "Using piezoelectric tiles, every step you take generates a small amount of energy. "
-                    "Millions of steps together can power LED lights and displays in busy places like Shibuya Station. "
-                    "A brilliant way to create a sustainable and smart city turning m..."
-                    "兄弟，他真觉得自己在那份爱泼斯坦名单上💀 "
-                    "特朗普刚才那记总统级魅力（Rizz）直接给哥们整不会了，吹牛老爹（Diddy）还在旁边 4K 高清观看。 "
-                    "这波负面气场（Aura）简直比内塔尼亚胡在新闻发布会上还重。 "
-                    "这波到底是系统 Bug 还是代码飞升？👇 \n"
-                    ". \n"
-                    "#气场 #魅力 #特朗普 #吹牛老爹 #脑干缺失 #短视频 #流量密码 #系统漏洞 #fyp"
-                )
-
-                caption_field = WebDriverWait(self.driver, 10).until(
-                    EC.presence_of_element_located((AppiumBy.ID, "com.instagram.android:id/caption_input_text_view")))
-                caption_field.click()
-                time.sleep(1)
-                caption_field.send_keys(caption_text)
-                print("[SUCCESS] Caption added.")
-            except Exception as e:
-                print(f"[ERROR] Could not add caption: {e}")
+            _, next_btn_2nd = self.past_popups(
+                screen, lambda: self.selectors.wait_for(screen, "clips_next_button", timeout=5))
+            if next_btn_2nd is None:
+                raise Exception("Could not find second Next button")
+            screen.tap(next_btn_2nd)
+
+            if caption_text:
+                print("[INFO] Adding caption...")
+                try:
+                    caption_field = self.wait_for_control(
+                        (AppiumBy.ID, "com.instagram.android:id/caption_input_text_view"), timeout=10)
+                    caption_field.click()
+                    started = time.monotonic()
+                    method = self.enter_text(caption_field, caption_text)
+                    if method:
+                        print(f"[SUCCESS] Caption added via {method} in {time.monotonic() - started:.2f}s.")
+                    else:
+                        print("[WARNING] Caption could not be verified after entry.")
+                except Exception as e:
+                    print(f"[ERROR] Could not add caption: {e}")
 
             self.driver.hide_keyboard()
 
-            try:
-                popup_share = WebDriverWait(self.driver, 5).until(EC.presence_of_element_located((AppiumBy.ANDROID_UIAUTOMATOR, 'new UiSelector().text("Update on your original audio")')))
-                popup_share.click()
-                if self.driver.find_elements(AppiumBy.ANDROID_UIAUTOMATOR,'new UiSelector().resourceId("com.instagram.android:id/row_pending_media_status_textview").text("Done posting. Want to send it directly to friends?")'):
-                    print("[SUCCESS] Reel posted!")
-            except:
+            audio_popup = Selector(text="Update on your original audio")
+            share = Selector(text="Share")
+            done_posting = Selector(resource_id="com.instagram.android:id/row_pending_media_status_textview",
+                                    text="Done posting. Want to send it directly to friends?")
+
+            matched, button = self.past_popups(screen, lambda: screen.wait_for(audio_popup, share, timeout=5))
+            if button is None:
+                raise Exception("Could not find Share button")
+            if matched is share:
                 print("Popup share not found, continuing with normal Share button.")
-                share_btn = WebDriverWait(self.driver, 5).until(EC.presence_of_element_located((AppiumBy.ANDROID_UIAUTOMATOR, 'new UiSelector().text("Share")')))
-                share_btn.click()
-                if WebDriverWait(self.driver, 15).until(EC.presence_of_all_elements_located((AppiumBy.ANDROID_UIAUTOMATOR,'new UiSelector().resourceId("com.instagram.android:id/row_pending_media_status_textview").text("Done posting. Want to send it directly to friends?")'))):
-                    print("[SUCCESS] Reel posted!")
+            screen.tap(button)
+
+            if self.past_popups(screen, lambda: screen.wait_for(done_posting, timeout=15))[1] is not None:
+                print("[SUCCESS] Reel posted!")
+            self.count('reposted')
+            return True
 
         except Exception as e:
             print(f"[ERROR] Failed to repost: {e}")
             self.go_home()
+            return False
+        finally:
+            self.selectors.save()
+
+    def quit_driver(self):
+        if self.driver:
+            try:
+                self.driver.quit()
+            except Exception:
+                pass
+            self.driver = None
+
+    def recover_new_session(self):
+        """Tier 1: the session timed out or was dropped, open a new one"""
+        self.quit_driver()
+        self.connect()
+        return self.check_connection_health()
+
+    def recover_uiautomator2(self):
+        """Tier 2: the instrumentation on the device is stuck, kill it so the
+        next session relaunches a fresh UiAutomator2 server"""
+        self.quit_driver()
+        self.shell(f"am force-stop {UIA2_PACKAGE}.test; am force-stop {UIA2_PACKAGE}")
+        if self.memory_watch:
+            self.memory_watch.recycled('uiautomator2')
+        self.connect()
+        return self.check_connection_health()
+
+    def recover_appium(self):
+        """Tier 3: the Appium server itself is broken, restart it"""
+        self.quit_driver()
+        self.stop_appium_server()
+        if not self.start_appium_server(force_restart=True):
+            return False
+        self.connect()
+        return self.check_connection_health()
+
+    def recover_instagram(self):
+        """Tier 4: restart the Instagram app"""
+        self.shell("am force-stop com.instagram.android")
+        if self.memory_watch:
+            self.memory_watch.recycled('instagram')
+        if not self.check_connection_health():
+            self.quit_driver()
+            self.connect()
+        else:
+            self.driver.activate_app("com.instagram.android")
+        return self.check_connection_health() and self.wait_until(self.is_instagram_foreground, timeout=15)
+
+    @timed("recover_session")
+    def recover_session(self):
+        """Restore a working session, restarting only as much as needed"""
+        self.report('recovering')
+        # If Appium does not answer at all there is no point trying a new session first
+        start_tier = None if self.is_appium_ready() else "restart_appium"
+        tier = self.recovery.recover(start_tier)
+        METRICS.inc('bot_recoveries_total', tier=tier or "failed")
+        if tier:
+            return True
+
+        if self.recovery.is_open:
+            wait = self.recovery.cooldown_remaining()
+            print(f"[INFO] Waiting {wait:.0f} seconds before trying to recover again...")
+            time.sleep(wait)
+        else:
+            print("[INFO] Recovery failed, retrying in 30 seconds...")
+            time.sleep(30)
+        return False
+
+    @timed("recycle")
+    def recycle_if_bloated(self):
+        """Between cycles, restart whatever the memory watchdog found bloated.
+
+        Returns True if anything was restarted.
+        """
+        due = self.memory_watch.recycles_due() if self.memory_watch else []
+        for target, reason in due:
+            print(f"[INFO] Recycling {target} ({reason}) before the next cycle...")
+            self.report('recycling', target=target, reason=reason)
+            METRICS.inc('bot_recycles_total', target=target, reason=reason)
+            if target == 'uiautomator2':
+                recovered = self.recover_uiautomator2()
+            else:
+                self.shell("am force-stop com.instagram.android")
+                self.clear_instagram_cache()
+                recovered = self.recover_instagram()
+            self.memory_watch.recycled(target, reason)
+            if not recovered:
+                print(f"[WARNING] {target} did not come back cleanly after recycling")
+        return bool(due)
+
+    @timed("wait")
+    def wait_for_next_check(self, timeout=CHECK_INTERVAL):
+        """Sleep until the next check, waking early on a new DM notification"""
+        if self.dm_watcher is None:
+            time.sleep(timeout)
+            return
+        if self.dm_watcher.wait(timeout):
+            print("[INFO] New DM notification, checking now")
+
+    @timed("cycle")
+    def run_cycle(self):
+        """One check: find and download new reels, then publish queued ones.
+
+        Returns the number of seconds to wait before the next check, or None
+        when the cycle was cut short and should be retried straight away.
+        """
+        self.report('checking')
+        self.processed.refresh()  # Pick up reels other devices posted since the last cycle
+        self.clear_stored_videos()
+        print(f"\n[{time.strftime('%H:%M:%S')}] Checking for new reels...")
+        METRICS.inc('bot_cycles_total')
+
+        downloaded = []
+        if self.navigate_to_dms():
+            # One inbox read decides which threads are worth opening
+            screen = self.inbox_screen()
+            self.handle_popups(screen)  # Handle pop-ups after navigating
+            senders = self.scan_inbox(screen)
+            if not senders:
+                print("[INFO] No unread threads from monitored senders")
+
+            for number, sender in enumerate(senders):
+                if number:
+                    self.driver.back()  # Back to the inbox between threads
+                    if not self.navigate_to_dms():
+                        print("[WARNING] Could not get back to the inbox, leaving the rest for the next cycle")
+                        break
+                if not self.find_conversation(sender, screen if number == 0 else None):
+                    continue
+                self.handle_popups() # Handle pop-ups in conversation
+
+                # Ingest: queue and download every new reel in this thread
+                downloaded += self.check_for_reels(sender)
+
+        # Without the inbox there are no unread marks; check the configured thread directly
+        elif self.open_thread(self.config.thread_id):
+            self.handle_popups()
+            downloaded += self.check_for_reels(self.config.username)
+
+        else:
+            print("[WARNING] Could not open DMs, retrying...")
+            self.handle_popups() # Check for popups on home screen
+            return None
+
+        if not downloaded:
+            print("[INFO] No new downloadable reels found")
+
+        # Publish: repost queued reels, including ones left from earlier cycles
+        self.publish_pending()
+
+        # Go back to home
+        self.go_home()
+        self.handle_popups() # Final check on home screen
+
+        # Wait before next check
+        counts = self.jobs.counts(self.config.name)
+        wait = self.next_check_in()
+        print(f"[INFO] Navigation took {self.navigator.take_cycle_time():.1f}s this cycle")
+        print(f"[INFO] Queue: {counts.get(DOWNLOADED, 0)} to post, "
+              f"{counts.get(DISCOVERED, 0)} to download, {counts.get(FAILED, 0)} failed")
+        print(f"[INFO] Waiting {wait:.0f} seconds...")
+        self.report('waiting', queued=counts.get(DOWNLOADED, 0))
+        self.cycles += 1
+        return wait
 
     def run(self):
         """Main bot loop"""
 
         try:
+            self.report('starting')
+            if self.config.metrics_port:
+                try:
+                    self.metrics_server = METRICS.serve(self.config.metrics_port)
+                    print(f"[INFO] Metrics at http://localhost:{self.config.metrics_port}/metrics")
+                except OSError as e:
+                    print(f"[WARNING] Could not start metrics endpoint on port {self.config.metrics_port}: {e}")
             # Start Appium server
             if not self.start_appium_server():
                 print("\n[ERROR] Failed to start Appium server. Exiting...")
@@ -520,6 +1411,8 @@ class InstagramReelsBot:
 
             # Connect to device
             self.connect()
+            print(f"[INFO] Cold start: Appium {self.timings.get('appium_start', 0):.1f}s, "
+                  f"session {self.timings.get('session', 0):.1f}s")
 
             # Check if logged in
             if not self.is_logged_in():
@@ -532,140 +1425,88 @@ class InstagramReelsBot:
                     print("[ERROR] Still not logged in. Please log in and restart the bot.")
                     return
 
+            if NOTIFICATION_TRIGGER:
+                self.dm_watcher = DmNotificationWatcher.for_device(self.config.device_id, NOTIFICATION_POLL_INTERVAL)
+                self.dm_watcher.start()
+
+            if MEMORY_WATCHDOG:
+                self.memory_watch = MemoryWatchdog.for_device(self.config.device_id)
+                self.memory_watch.start()
+
             print("\n[INFO] Starting monitoring loop...")
-            print(f"[INFO] Checking every {CHECK_INTERVAL} seconds")
+            print(f"[INFO] Checking every {self.config.check_interval} seconds")
+            if self.dm_watcher:
+                print("[INFO] ...or as soon as a new DM notification arrives")
             print("[INFO] Press Ctrl+C to stop\n")
 
             while True:
                 try:
-                    # Check connection health before proceeding
-                    if not self.check_connection_health():
-                        print("[WARNING] Connection lost. Attempting to reconnect...")
-                        
-                        # Try to reconnect
-                        try:
-                            if self.driver:
-                                self.driver.quit()
-                                time.sleep(5)
-                            self.connect()
-                            print("[SUCCESS] Reconnected to device")
-                        except Exception as reconnect_error:
-                            print(f"[ERROR] Failed to reconnect: {reconnect_error}")
-                            print("[INFO] Attempting Appium server restart...")
-                            
-                            # Restart Appium server as last resort
-                            self.stop_appium_server()
-                            time.sleep(5)
-                            if not self.start_appium_server():
-                                print("[ERROR] Failed to restart Appium server. Stopping bot.")
-                                break
-                            
-                            # Try connecting again
-                            self.connect()
-                            print("[SUCCESS] Reconnected after Appium restart")
-                        
-                        # Continue to next iteration after reconnection
+                    # Appium's log reported a crash: recover now instead of failing mid-cycle
+                    signal = self.appium_log.take_signal() if self.appium_log else None
+                    if signal:
+                        kind, line = signal
+                        print(f"[ERROR] UiAutomator2 failure detected in Appium log ({kind}): {line}")
+                        self.recover_session()
                         continue
-                    
-                    self.clear_stored_videos()
-                    print(f"\n[{time.strftime('%H:%M:%S')}] Checking for new reels...")
 
-                    self.go_home()
-                    # Navigate to DMs
-                    if not self.navigate_to_dms():
-                        print("[WARNING] Could not open DMs, retrying...")
-                        self.handle_popups() # Check for popups on home screen
+                    # Check connection health before proceeding
+                    if not self.check_connection_health():
+                        print("[WARNING] Connection lost. Attempting to recover...")
+                        self.recover_session()
                         continue
 
-                    self.handle_popups()  # Handle pop-ups after navigating
-
-                    # Find conversation
-                    if not self.find_conversation(YOUR_USERNAME):
-                        print(f"[WARNING] No conversation with @{YOUR_USERNAME}, retrying...")
-                        self.handle_popups()
+                    # A safe point between cycles to restart what has bloated
+                    if self.recycle_if_bloated():
                         continue
 
-                    self.handle_popups() # Handle pop-ups in conversation
-
-                    # Check for reels
-                    if not self.check_for_reels():
-                        print(f"[INFO] No new reels found, retrying in {CHECK_INTERVAL} seconds...")
-                        time.sleep(CHECK_INTERVAL)
+                    wait = self.run_cycle()
+                    if wait is None:
                         continue
-                    # Download
-                    if not self.download_reel():
-                        print(f"[INFO] This reel doesn't have a download button, retrying in {CHECK_INTERVAL} seconds...")
-                        time.sleep(CHECK_INTERVAL)
-                        continue
-
-                    self.go_home()
-
-                    self.handle_popups() # Handle pop-ups after download
-
-                    # Repost
-                    self.repost_reel()
-
-                    self.handle_popups() # Final check before next reel
-
-                    # Go back to home
-                    self.go_home()
-                    self.handle_popups() # Final check on home screen
-
-                    # Wait before next check
-                    print(f"[INFO] Waiting {CHECK_INTERVAL} seconds...")
-                    time.sleep(CHECK_INTERVAL)
+                    self.wait_for_next_check(wait)
 
                 except KeyboardInterrupt:
                     raise
                 except Exception as e:
                     print(f"[ERROR] Error in loop: {e}")
+                    self.count('errors')
+                    self.report('recovering', error=str(e)[:200])
                     
-                    # Handle UiAutomator2 instrumentation crashes
-                    if "instrumentation process is not running" in str(e) or "UiAutomator2" in str(e):
-                        print("[ERROR] Appium UiAutomator2 server crashed. Attempting recovery...")
-                        
-                        # Try to restart Appium server
-                        print("[INFO] Restarting Appium server...")
-                        self.stop_appium_server()
-                        time.sleep(5)
-                        
-                        if not self.start_appium_server():
-                            print("[ERROR] Failed to restart Appium server. Stopping bot.")
-                            break
-                        
-                        # Reconnect to device
-                        print("[INFO] Reconnecting to device...")
-                        try:
-                            if self.driver:
-                                self.driver.quit()
-                                time.sleep(3)
-                            self.connect()
-                            print("[SUCCESS] Reconnected to device")
-                        except Exception as reconnect_error:
-                            print(f"[ERROR] Failed to reconnect: {reconnect_error}")
-                            print("[INFO] Will retry full restart in 60 seconds...")
-                            time.sleep(60)
-                            continue
-                    
+                    # Handle UiAutomator2 instrumentation crashes and lost sessions
+                    if "instrumentation process is not running" in str(e) or "UiAutomator2" in str(e) \
+                            or not self.check_connection_health():
+                        print("[ERROR] Appium UiAutomator2 session failed. Attempting recovery...")
+                        self.recover_session()
                     else:
-                        # Log specific error details for debugging
-                        if "cannot be proxied to UiAutomator2 server" in str(e):
-                            print("[ERROR] UiAutomator2 server communication failed. This usually means:")
-                            print("        - Appium server crashed")
-                            print("        - Android instrumentation process died")
-                            print("        - Device connection was lost")
-                            print("[INFO] Recovery procedures will be attempted on next iteration")
-                        
                         print("[INFO] Retrying in 30 seconds...")
                         time.sleep(30)
 
         except KeyboardInterrupt:
             print("\n\n[INFO] Stopping bot...")
         finally:
+            if self.dm_watcher:
+                self.dm_watcher.stop()
+            if self.memory_watch:
+                self.memory_watch.stop()
             if self.driver:
                 self.driver.quit()
             # Stop Appium server
             self.stop_appium_server()
+            self.selectors.save()
+            if any(stat['attempts'] for stat in self.recovery.stats.values()):
+                print("[INFO] Recovery summary:")
+                print(self.recovery.report())
+            self.processed.close()
+            self.jobs.close()
+            self.video_cache.close()
+            if self.bubbles:
+                self.bubbles.close()
+            if self.fingerprints:
+                self.fingerprints.close()
+            if self.metrics_server:
+                self.metrics_server.shutdown()
+            if self.trace:
+                self.trace.close()
+            self.report('stopped')
             print("[INFO] Bot stopped. Goodbye!")
 
 if __name__ == "__main__":
@@ -0,0 +1,125 @@
+import hashlib
+import re
+import sqlite3
+import time
+
+from inbox import normalize
+from locator import Selector
+from reel_store import PROCESSED_DB
+
+
+ID = "com.instagram.android:id/"
+
+BUBBLE = Selector(resource_id=ID + "message_content_horizontal_placeholder_container")
+TEXT = Selector(class_name="android.widget.TextView")
+
+# Timestamp separators between messages, e.g. "10:42 AM", "Yesterday 9:15 PM", "Mon 14:02", "Jan 5, 2026"
+TIMESTAMP_RE = re.compile(
+    r"^(?:(?:today|yesterday|mon|tue|wed|thu|fri|sat|sun)\w*\s+)?\d{1,2}:\d{2}(?:\s*[ap]\.?m\.?)?$"
+    r"|^[a-z]{3,9}\.? \d{1,2}(?:, \d{4})?(?:,? \d{1,2}:\d{2}(?:\s*[ap]\.?m\.?)?)?$",
+    re.I,
+)
+KEEP_DAYS = 90  # Forget bubble keys not seen for this long
+
+
+def nearest_timestamp(screen, bubble):
+    """(text, bottom) of the closest timestamp separator above a bubble, or ('', None)"""
+    top = bubble.bounds[1] if bubble.bounds else None
+    if top is None:
+        return "", None
+    best, best_bottom = "", None
+    for node in screen.find_all(TEXT):
+        text = node.text.strip()
+        bounds = node.bounds
+        if not bounds or bounds[3] > top or not TIMESTAMP_RE.match(text):
+            continue
+        if best_bottom is None or bounds[3] > best_bottom:
+            best, best_bottom = text, bounds[3]
+    return best, best_bottom
+
+
+def bubble_key(screen, bubble, thread, bubbles=None):
+    """Fingerprint of a reel bubble from what the thread shows without opening it.
+
+    Combines the thread, the bubble's content-desc, the text and descriptions
+    inside it (author, caption, time) and the nearest timestamp separator
+    above it with the bubble's place among the bubbles below that separator,
+    so look-alike reels in one time block differ. Returns None for a bubble
+    with nothing identifying or nothing dating it: no separator on screen
+    above it and no time of its own.
+    """
+    parts = [part.strip() for element in bubble.element.iter()
+             for part in (element.get('content-desc', ''), element.get('text', ''))]
+    parts = [part for part in parts if part]
+    if not parts:
+        return None
+    stamp, stamp_bottom = nearest_timestamp(screen, bubble)
+    if stamp_bottom is None:
+        if not any(TIMESTAMP_RE.match(part) for part in parts):
+            return None
+        place = ""
+    else:
+        bubbles = screen.find_all(BUBBLE) if bubbles is None else bubbles
+        place = str(sum(1 for other in bubbles
+                        if other.bounds and stamp_bottom <= other.bounds[1] < bubble.bounds[1]))
+    parts = [normalize(thread or ""), stamp, place] + parts
+    return hashlib.sha1("\x1f".join(parts).encode('utf-8')).hexdigest()
+
+
+def bubble_keys(screen, thread):
+    """A key for every reel bubble in a thread snapshot, top to bottom.
+
+    Bubbles that look exactly alike on the same screen can't be told apart
+    by their position alone once the thread scrolls, so they get None.
+    """
+    bubbles = screen.find_all(BUBBLE)
+    keys = [bubble_key(screen, bubble, thread, bubbles) for bubble in bubbles]
+    return [None if key is not None and keys.count(key) > 1 else key for key in keys]
+
+
+class BubbleIndex:
+    """Maps bubble keys to the reel IDs they turned out to link to.
+
+    A reel ID is only learned by opening the bubble and copying its link.
+    Once it is known, the same bubble can be recognised in later cycles from
+    the thread snapshot alone, but only to pass over it: a match is never
+    trusted to end a thread walk. A key that was ever seen with two
+    different reel IDs is ambiguous and always opened.
+
+    Keys live in the same SQLite database as the processed reels store.
+    """
+
+    def __init__(self, path=PROCESSED_DB):
+        self.path = path
+        self.conn = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=FULL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS bubbles ("
+            " bubble_key TEXT NOT NULL,"
+            " reel_id TEXT NOT NULL,"
+            " seen_at REAL NOT NULL,"
+            " PRIMARY KEY (bubble_key, reel_id))"
+        )
+        self.conn.execute("DELETE FROM bubbles WHERE seen_at < ?", (time.time() - KEEP_DAYS * 86400,))
+
+    def lookup(self, key):
+        """The reel ID behind a bubble key, or None if unknown or ambiguous"""
+        if key is None:
+            return None
+        rows = self.conn.execute("SELECT reel_id FROM bubbles WHERE bubble_key = ? LIMIT 2", (key,)).fetchall()
+        if len(rows) != 1:
+            return None
+        self.conn.execute("UPDATE bubbles SET seen_at = ? WHERE bubble_key = ?", (time.time(), key))
+        return rows[0][0]
+
+    def remember(self, key, reel_id):
+        if key is None or reel_id is None:
+            return
+        self.conn.execute(
+            "INSERT OR REPLACE INTO bubbles (bubble_key, reel_id, seen_at) VALUES (?, ?, ?)",
+            (key, reel_id, time.time())
+        )
+
+    def close(self):
+        self.conn.close()
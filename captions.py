@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+Caption templates for reposted reels.
+
+Every *.txt file in the captions directory (except hashtags.txt) is a
+template. Templates use $name / ${name} placeholders:
+
+    $reel_id    ID of the reel being reposted
+    $sender     Instagram username the reel was received from
+    $date       date of the repost (YYYY-MM-DD)
+    $timestamp  date and time of the repost (YYYY-MM-DD HH:MM)
+    $hashtags   one line from hashtags.txt, rotated per reel
+
+Run `python3 captions.py` to validate all templates offline.
+"""
+
+import os
+import re
+import string
+import sys
+import time
+import zlib
+
+
+CAPTIONS_DIR = "captions"
+HASHTAGS_FILE = "hashtags.txt"
+MAX_CAPTION_LENGTH = 2200  # Instagram's caption limit
+MAX_HASHTAGS = 30  # Instagram's hashtag limit per post
+CACHE_SIZE = 256  # Rendered captions kept in memory
+
+VARIABLES = {'reel_id', 'sender', 'date', 'timestamp', 'hashtags'}
+HASHTAG_RE = re.compile(r"(?<!\w)#\w+")
+
+
+class CaptionError(Exception):
+    pass
+
+
+class CompiledTemplate:
+    """A template parsed once into literal and variable parts"""
+
+    def __init__(self, name, source):
+        self.name = name
+        self.source = source
+        self.parts = []  # (is_variable, text)
+        self.variables = set()
+
+        position = 0
+        for match in string.Template.pattern.finditer(source):
+            start, end = match.span()
+            if start > position:
+                self.parts.append((False, source[position:start]))
+            if match.group('escaped') is not None:
+                self.parts.append((False, '$'))
+            elif match.group('invalid') is not None:
+                line = source.count('\n', 0, start) + 1
+                raise CaptionError(f"{name}: invalid placeholder on line {line}")
+            else:
+                variable = match.group('named') or match.group('braced')
+                self.parts.append((True, variable))
+                self.variables.add(variable)
+            position = end
+        if position < len(source):
+            self.parts.append((False, source[position:]))
+
+        unknown = self.variables - VARIABLES
+        if unknown:
+            raise CaptionError(f"{name}: unknown variable(s) {', '.join(sorted(unknown))}")
+
+    def render(self, values):
+        return ''.join(values[text] if is_variable else text for is_variable, text in self.parts)
+
+
+def validate_caption(caption):
+    """Return a list of problems with a rendered caption (empty when valid)"""
+    problems = []
+    if len(caption) > MAX_CAPTION_LENGTH:
+        problems.append(f"{len(caption)} characters (limit {MAX_CAPTION_LENGTH})")
+    hashtags = HASHTAG_RE.findall(caption)
+    if len(hashtags) > MAX_HASHTAGS:
+        problems.append(f"{len(hashtags)} hashtags (limit {MAX_HASHTAGS})")
+    return problems
+
+
+class CaptionLibrary:
+    """Loads and compiles caption templates once, then renders them per reel.
+
+    The template and hashtag set for a reel are picked by a stable hash of
+    its ID, so the same reel always gets the same caption. Rendered
+    captions are cached by template and variables.
+    """
+
+    def __init__(self, directory=CAPTIONS_DIR):
+        self.directory = directory
+        self.templates = []
+        self.hashtag_sets = [""]
+        self.cache = {}
+        self.load()
+
+    def load(self):
+        hashtags_path = os.path.join(self.directory, HASHTAGS_FILE)
+        if os.path.exists(hashtags_path):
+            with open(hashtags_path, 'r', encoding='utf-8') as file:
+                self.hashtag_sets = [line.strip() for line in file if line.strip()] or [""]
+
+        templates = []
+        names = sorted(os.listdir(self.directory)) if os.path.isdir(self.directory) else []
+        for name in names:
+            if not name.endswith('.txt') or name == HASHTAGS_FILE:
+                continue
+            with open(os.path.join(self.directory, name), 'r', encoding='utf-8') as file:
+                source = file.read()
+            if source.endswith('\n'):
+                source = source[:-1]
+            try:
+                templates.append(CompiledTemplate(name, source))
+            except CaptionError as e:
+                print(f"[WARNING] Skipping caption template {e}")
+
+        self.templates = templates
+        self.cache.clear()
+        if not self.templates:
+            print(f"[WARNING] No caption templates found in {self.directory}/, reels will be posted without a caption")
+
+    def pick(self, key, choices):
+        return choices[zlib.crc32(key.encode('utf-8')) % len(choices)]
+
+    def render(self, reel_id="", sender="", now=None):
+        """Render the caption for one reel"""
+        if not self.templates:
+            return ""
+
+        now = time.localtime(now)
+        key = reel_id or time.strftime('%Y%m%d%H%M%S', now)
+        template = self.pick(key, self.templates)
+        values = {
+            'reel_id': reel_id,
+            'sender': sender,
+            'date': time.strftime('%Y-%m-%d', now),
+            'timestamp': time.strftime('%Y-%m-%d %H:%M', now),
+            'hashtags': self.pick(key, self.hashtag_sets),
+        }
+
+        cache_key = (template.name,) + tuple(values[name] for name in sorted(template.variables))
+        caption = self.cache.get(cache_key)
+        if caption is None:
+            caption = template.render(values)
+            if len(self.cache) >= CACHE_SIZE:
+                self.cache.pop(next(iter(self.cache)))
+            self.cache[cache_key] = caption
+        return caption
+
+    def validate(self):
+        """Check every template against every hashtag set. Returns a list of problems."""
+        problems = []
+        sample = {
+            'reel_id': 'C' + 'x' * 10,
+            'sender': 'x' * 30,  # Longest allowed Instagram username
+            'date': '2000-01-01',
+            'timestamp': '2000-01-01 00:00',
+        }
+        for template in self.templates:
+            for hashtags in self.hashtag_sets:
+                caption = template.render({**sample, 'hashtags': hashtags})
+                for problem in validate_caption(caption):
+                    problems.append(f"{template.name} with hashtags '{hashtags[:30]}...': {problem}")
+        return problems
+
+
+def main():
+    library = CaptionLibrary(sys.argv[1] if len(sys.argv) > 1 else CAPTIONS_DIR)
+    print(f"{len(library.templates)} template(s), {len(library.hashtag_sets)} hashtag set(s)")
+    problems = library.validate()
+    for problem in problems:
+        print(f"❌ {problem}")
+    if not problems:
+        print("✅ All captions are within Instagram's limits")
+    return 1 if problems else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,99 @@
+import shlex
+import time
+
+
+DOWNLOAD_DIR = "/storage/emulated/0/Movies/Instagram"
+DOWNLOAD_TIMEOUT = 120  # Give up on a download after this many seconds
+POLL_INTERVAL = 1  # Seconds between directory listings
+STABLE_POLLS = 2  # A file is complete once its size is unchanged for this many polls
+MEDIA_STORE_VIDEOS = "content://media/external/video/media"
+MEDIA_STORE_TIMEOUT = 20  # Give up on a pushed video that MediaStore has not indexed after this many seconds
+
+
+def list_videos(shell, directory=DOWNLOAD_DIR):
+    """Return {file name: size in bytes} for the files in the download folder.
+
+    shell is a callable that runs a command on the device and returns its output.
+    """
+    output = shell(f"stat -c '%s %n' {shlex.quote(directory)}/* 2>/dev/null")
+    files = {}
+    for line in output.splitlines():
+        size, _, path = line.strip().partition(' ')
+        if not size.isdigit() or not path:
+            continue
+        name = path.rsplit('/', 1)[-1]
+        # MediaStore writes into hidden .pending-* files and renames them when done
+        if name.startswith('.'):
+            continue
+        files[name] = int(size)
+    return files
+
+
+def wait_for_download(shell, before, directory=DOWNLOAD_DIR, timeout=DOWNLOAD_TIMEOUT,
+                      poll_interval=POLL_INTERVAL, stable_polls=STABLE_POLLS):
+    """Wait for a new file to appear in the download folder and stop growing.
+
+    before is the listing taken before the download was started. Returns
+    (name, size) of the finished file, or None if nothing complete showed up
+    within the timeout, so a truncated file is never handed on.
+    """
+    deadline = time.monotonic() + timeout
+    last_sizes = {}
+    unchanged = {}
+
+    while time.monotonic() < deadline:
+        current = list_videos(shell, directory)
+        for name, size in current.items():
+            if before.get(name) == size:
+                continue  # Existed before the download and did not change
+            if size > 0 and last_sizes.get(name) == size:
+                unchanged[name] = unchanged.get(name, 0) + 1
+                if unchanged[name] >= stable_polls:
+                    return name, size
+            else:
+                unchanged[name] = 0
+        last_sizes = current
+        time.sleep(poll_interval)
+
+    return None
+
+
+def media_where(path):
+    """Shell-quoted MediaStore selection of the row for one file"""
+    return shlex.quote("_data='" + path.replace("'", "''") + "'")
+
+
+def in_media_store(shell, path):
+    """Whether MediaStore has a row for the video file at path"""
+    output = shell(f"content query --uri {MEDIA_STORE_VIDEOS} --projection _id --where {media_where(path)}")
+    return "Row:" in output
+
+
+def wait_for_media_store(shell, path, timeout=MEDIA_STORE_TIMEOUT, poll_interval=POLL_INTERVAL):
+    """Ask MediaStore to index a file pushed over adb and wait until its row appears.
+
+    Apps only see the file in the gallery once it has a row. Returns False
+    if it never showed up within the timeout.
+    """
+    shell("am broadcast -a android.intent.action.MEDIA_SCANNER_SCAN_FILE "
+          f"-d {shlex.quote('file://' + path)}")
+    deadline = time.monotonic() + timeout
+    while True:
+        if in_media_store(shell, path):
+            return True
+        if time.monotonic() >= deadline:
+            return False
+        time.sleep(poll_interval)
+
+
+def remove_video(shell, path):
+    """Delete a video file and its MediaStore row, so no stale entry is left in the gallery"""
+    shell(f"rm -f {shlex.quote(path)}")
+    shell(f"content delete --uri {MEDIA_STORE_VIDEOS} --where {media_where(path)}")
+
+
+def remove_all_videos(shell, directory=DOWNLOAD_DIR):
+    """Empty the download folder, MediaStore rows included"""
+    shell(f"rm -f {shlex.quote(directory)}/*")
+    where = shlex.quote(f"_data LIKE '{directory}/%'")
+    shell(f"content delete --uri {MEDIA_STORE_VIDEOS} --where {where}")
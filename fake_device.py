@@ -0,0 +1,649 @@
+"""
+Simulated Android device running a scripted Instagram UI.
+
+FakeDevice holds a small graph of Instagram screens (home, inbox, thread,
+reel viewer, share sheet and the create flow), the device's download
+folder and its clipboard. FakeDriver implements the subset of the Appium
+WebDriver API the bot uses on top of it, and FakeDevice.shell / pull / push
+stand in for adb. Together they let InstagramReelsBot run a full cycle
+without an emulator, Appium or Instagram.
+
+Every driver command goes through FakeDriver.execute, so per-command
+latency, injected failures and round-trip counts apply to all of them and
+metrics.instrument_driver() works unchanged.
+"""
+
+import collections
+import fnmatch
+import random
+import re
+import shlex
+import time
+import xml.etree.ElementTree as ET
+
+from selenium.common.exceptions import (NoSuchElementException, StaleElementReferenceException,
+                                        WebDriverException)
+
+from downloads import DOWNLOAD_DIR
+
+
+PACKAGE = "com.instagram.android"
+ID = "com.instagram.android:id/"
+WIDTH, HEIGHT = 1080, 2400
+BUBBLES_PER_PAGE = 4  # Reel bubbles visible in the thread at once
+INBOX_ROWS_PER_PAGE = 10  # Threads visible in the inbox at once
+POPUP_BUTTON = "Not now"
+
+UISELECTOR_RE = re.compile(r'\.(resourceId|description|text|className|instance)\(("?)(.*?)\2\)')
+
+
+class FakeReel:
+    """A reel shared into the thread.
+
+    content identifies the video: reels with equal content download to
+    identical files, like the same clip reshared under another link.
+    author is the account shown on the message bubble.
+    """
+
+    def __init__(self, reel_id, content=None, downloadable=True, author=None):
+        self.reel_id = reel_id
+        self.content = content or reel_id
+        self.downloadable = downloadable
+        self.author = author or f"creator_{self.content.lower()}"
+
+
+def node(cls, rid="", text="", desc="", bounds=(0, 0, WIDTH, HEIGHT), action=None, clickable=None, children=()):
+    """Spec for one UI element; action is called when it is tapped or clicked"""
+    return {
+        'class': cls, 'resource-id': ID + rid if rid else "", 'text': text, 'content-desc': desc,
+        'bounds': bounds, 'action': action,
+        'clickable': action is not None if clickable is None else clickable,
+        'children': list(children),
+    }
+
+
+class FakeInstagram:
+    """State of the simulated app and how its screens connect"""
+
+    def __init__(self, device, username, thread_id, reels, threads=None, deep_links=True, popup_every=0, load_time=0):
+        self.device = device
+        self.username = username
+        self.thread_id = thread_id
+        self.threads = {username: list(reels)}  # Sender -> reels, oldest first
+        for sender, sender_reels in (threads or {}).items():
+            self.threads[sender] = list(sender_reels)
+        self.inbox = sorted(self.threads, key=lambda sender: not self.threads[sender])  # Most recent thread first
+        self.unread = {sender for sender, sender_reels in self.threads.items() if sender_reels}
+        self.current = username  # Thread shown on the thread screen
+        self.deep_links = deep_links
+        self.popup_every = popup_every
+        self.load_time = load_time
+
+        self.stack = ["home"]
+        self.version = 0  # Bumped on every screen change; older element handles go stale
+        self.transitions = 0
+        self.popup = False
+        self.ready_at = 0
+        self.thread_offset = 0  # Messages hidden below the visible page (0 = scrolled to the newest)
+        self.open_reel = None
+        self.selected_file = None
+        self.caption = ""
+        self.just_posted = False
+        self.posts = []  # (video bytes, caption)
+
+    @property
+    def screen(self):
+        return self.stack[-1]
+
+    def go(self, screen, replace=False):
+        if replace:
+            self.stack = [screen]
+        elif screen != self.screen:
+            self.stack.append(screen)
+        self.changed()
+
+    def back(self):
+        if self.popup:
+            self.popup = False
+        elif len(self.stack) > 1:
+            self.stack.pop()
+        self.changed()
+
+    def changed(self):
+        self.version += 1
+        self.transitions += 1
+        if self.popup_every and self.transitions % self.popup_every == 0:
+            self.popup = True
+        self.ready_at = time.monotonic() + self.load_time * self.device.time_scale
+
+    def activity(self):
+        if self.screen in ("thread", "inbox"):
+            return ".direct.DirectActivity"
+        return ".activity.MainTabActivity"
+
+    # Screens
+
+    def nodes(self):
+        """Element specs of what is currently shown"""
+        if time.monotonic() < self.ready_at:
+            return [node("android.widget.ProgressBar", rid="loading_spinner")]
+        if self.popup:
+            return [node("android.widget.FrameLayout", rid="dialog_container", children=[
+                node("android.widget.TextView", text="Turn on notifications"),
+                node("android.widget.Button", desc=POPUP_BUTTON, bounds=(140, 1300, 940, 1420),
+                     action=self.dismiss_popup),
+            ])]
+        return getattr(self, "screen_" + self.screen)()
+
+    def tab_bar(self):
+        return [
+            node("android.widget.FrameLayout", rid="tab_bar", bounds=(0, 2250, WIDTH, 2400), children=[
+                node("android.widget.FrameLayout", desc="Home", bounds=(0, 2250, 216, 2400),
+                     action=lambda: self.go("home", replace=True)),
+            ]),
+        ]
+
+    def screen_home(self):
+        nodes = [
+            node("android.widget.LinearLayout", rid="action_bar_buttons_container_left", bounds=(0, 63, 300, 210), children=[
+                node("android.widget.ImageView", desc="Create", bounds=(0, 63, 127, 210), action=self.open_gallery),
+            ]),
+            node("android.widget.TextView", rid="title_text", text="For you", bounds=(300, 80, 780, 190)),
+            node("android.widget.ImageView", rid="direct_tab", desc="Messages", bounds=(950, 80, 1060, 190),
+                 action=lambda: self.go("inbox")),
+        ]
+        if self.just_posted:
+            nodes.append(node("android.widget.TextView", rid="row_pending_media_status_textview",
+                              text="Done posting. Want to send it directly to friends?", bounds=(0, 220, WIDTH, 320)))
+        return nodes + self.tab_bar()
+
+    @property
+    def messages(self):
+        return self.threads[self.current]
+
+    def screen_inbox(self):
+        rows = []
+        for index, sender in enumerate(self.inbox[:INBOX_ROWS_PER_PAGE]):
+            top = 300 + index * 190
+            children = [node("android.widget.TextView", rid="row_inbox_username", text=sender,
+                             bounds=(200, top + 30, 900, top + 100), action=lambda sender=sender: self.open_thread(sender))]
+            if sender in self.unread:
+                children.append(node("android.view.View", rid="thread_indicator_status_dot",
+                                     bounds=(1000, top + 70, 1040, top + 110)))
+            rows.append(node("android.widget.LinearLayout", rid="row_inbox_container", bounds=(0, top, WIDTH, top + 180),
+                             action=lambda sender=sender: self.open_thread(sender), children=children))
+        return [
+            node("androidx.recyclerview.widget.RecyclerView", rid="inbox_refreshable_thread_list_recyclerview",
+                 bounds=(0, 300, WIDTH, 2250), children=rows),
+        ] + self.tab_bar()
+
+    def visible_reels(self):
+        end = len(self.messages) - self.thread_offset
+        return self.messages[max(0, end - BUBBLES_PER_PAGE):max(0, end)]
+
+    def screen_thread(self):
+        bubbles = []
+        first = max(0, len(self.messages) - self.thread_offset - BUBBLES_PER_PAGE)
+        for index, reel in enumerate(self.visible_reels()):
+            top = 400 + index * 420
+            number = first + index  # Messages are a minute apart, so each shows its own time
+            sent = node("android.widget.TextView", text=f"{9 + number // 60}:{number % 60:02d} AM",
+                        bounds=(320, top + 340, 500, top + 390))
+            bubbles.append(node("android.widget.FrameLayout", rid="message_content_horizontal_placeholder_container",
+                                desc=f"Reel by {reel.author}", bounds=(300, top, 1000, top + 400),
+                                action=lambda reel=reel: self.view_reel(reel), children=[sent]))
+        return bubbles + [
+            node("android.widget.EditText", rid="row_thread_composer_edittext", text="Message...",
+                 bounds=(40, 2100, 900, 2220)),
+        ]
+
+    def screen_reel_viewer(self):
+        return [
+            node("androidx.viewpager.widget.ViewPager", rid="clips_viewer_view_pager"),
+            node("android.widget.ImageView", rid="direct_share_button", desc="Share", bounds=(950, 1800, 1060, 1910),
+                 action=lambda: self.go("share_sheet")),
+        ]
+
+    def screen_share_sheet(self):
+        nodes = self.screen_reel_viewer() + [
+            node("android.widget.Button", desc="Copy link", bounds=(40, 2000, 240, 2200), action=self.copy_link),
+        ]
+        if self.open_reel.downloadable:
+            nodes.append(node("android.widget.Button", desc="Download", bounds=(260, 2000, 460, 2200),
+                              action=self.download))
+        return nodes
+
+    def screen_gallery(self):
+        nodes = [node("android.widget.TextView", text="New reel", bounds=(300, 80, 780, 190))]
+        for index, name in enumerate(self.device.gallery()):
+            row, column = divmod(index, 4)
+            left, top = column * 270, 400 + row * 270
+            nodes.append(node("android.view.View", rid="background_color", bounds=(left, top, left + 270, top + 270),
+                              action=lambda name=name: self.select_video(name)))
+        return nodes
+
+    def screen_trim(self):
+        return [node("android.widget.TextView", rid="next_button_textview", text="Next", bounds=(880, 80, 1060, 190),
+                     action=lambda: self.go("clips_edit"))]
+
+    def screen_clips_edit(self):
+        return [node("android.widget.Button", rid="clips_right_action_button", desc="Next", bounds=(880, 2200, 1060, 2350),
+                     action=lambda: self.go("caption"))]
+
+    def screen_caption(self):
+        return [
+            node("android.widget.EditText", rid="caption_input_text_view", text=self.caption,
+                 bounds=(40, 300, 1040, 700), action=lambda: None),
+            node("android.widget.Button", text="Share", bounds=(40, 2200, 1040, 2350), action=self.share),
+        ]
+
+    # Actions
+
+    def open_thread(self, sender):
+        self.current = sender
+        self.unread.discard(sender)
+        self.thread_offset = 0
+        self.go("thread")
+
+    def dismiss_popup(self):
+        self.popup = False
+        self.version += 1
+
+    def view_reel(self, reel):
+        self.open_reel = reel
+        self.go("reel_viewer")
+
+    def copy_link(self):
+        self.device.clipboard = f"https://www.instagram.com/reel/{self.open_reel.reel_id}/?igsh=fake"
+
+    def download(self):
+        self.device.add_file(f"{self.open_reel.reel_id}.mp4", f"video:{self.open_reel.content}".encode('utf-8'))
+
+    def open_gallery(self):
+        self.just_posted = False
+        self.caption = ""
+        self.go("gallery")
+
+    def select_video(self, name):
+        self.selected_file = name
+        self.go("trim")
+
+    def share(self):
+        self.posts.append((self.device.files[self.selected_file][0], self.caption))
+        self.just_posted = True
+        self.go("home", replace=True)
+
+    def open_uri(self, uri):
+        if not self.deep_links:
+            return
+        if uri.startswith("instagram://mainfeed"):
+            self.go("home", replace=True)
+        elif uri.startswith("instagram://direct-inbox"):
+            self.stack = ["home"]
+            self.go("inbox")
+        elif uri.startswith("instagram://direct-thread") and self.thread_id and uri.endswith(f"id={self.thread_id}"):
+            self.stack = ["home", "inbox"]
+            self.open_thread(self.username)
+
+    def scroll(self, start_y, end_y):
+        if self.screen != "thread":
+            return
+        if end_y > start_y:  # Finger moves down: older messages come into view
+            self.thread_offset = min(max(0, len(self.messages) - BUBBLES_PER_PAGE), self.thread_offset + BUBBLES_PER_PAGE)
+        else:
+            self.thread_offset = max(0, self.thread_offset - BUBBLES_PER_PAGE)
+        self.version += 1
+
+
+class FakeElement:
+    """Handle to an element of one rendered screen"""
+
+    def __init__(self, driver, spec, version):
+        self.driver = driver
+        self.spec = spec
+        self.version = version
+        self.id = f"fake-{version}-{id(spec)}"
+
+    def click(self):
+        self.driver.execute('clickElement', {'id': self.id, 'element': self})
+
+    @property
+    def text(self):
+        return self.driver.execute('getElementText', {'id': self.id, 'element': self})
+
+    def clear(self):
+        self.driver.execute('clearElement', {'id': self.id, 'element': self})
+
+    def send_keys(self, *value):
+        self.driver.execute('sendKeysToElement', {'id': self.id, 'element': self, 'text': ''.join(value)})
+
+    def get_attribute(self, name):
+        return self.driver.execute('getElementAttribute', {'id': self.id, 'element': self, 'name': name})
+
+
+class FakeDriver:
+    """The subset of the Appium WebDriver API the bot uses, backed by FakeInstagram.
+
+    latency maps command names to seconds (default_latency for the rest);
+    failures maps command names to the probability that a call raises
+    WebDriverException. calls counts every command, i.e. device round trips.
+    """
+
+    def __init__(self, device, latency=None, default_latency=0.0, failures=None, seed=0):
+        self.device = device
+        self.latency = latency or {}
+        self.default_latency = default_latency
+        self.failures = failures or {}
+        self.random = random.Random(seed)
+        self.implicit_wait = 0
+        self.calls = collections.Counter()
+
+    @property
+    def app(self):
+        return self.device.app
+
+    def execute(self, driver_command, params=None):
+        params = params or {}
+        self.calls[driver_command] += 1
+        delay = self.latency.get(driver_command, self.default_latency)
+        if delay:
+            time.sleep(delay * self.device.time_scale)
+        if self.random.random() < self.failures.get(driver_command, 0):
+            raise WebDriverException(f"Simulated failure of {driver_command}")
+        return getattr(self, "_" + driver_command)(**params)
+
+    # WebDriver API
+
+    @property
+    def page_source(self):
+        return self.execute('getPageSource')
+
+    def find_element(self, by, value):
+        return self.execute('findElement', {'using': by, 'value': value})
+
+    def find_elements(self, by, value):
+        return self.execute('findElements', {'using': by, 'value': value})
+
+    def tap(self, positions, duration=None):
+        return self.execute('tap', {'positions': positions})
+
+    def swipe(self, start_x, start_y, end_x, end_y, duration=0):
+        return self.execute('swipe', {'start_y': start_y, 'end_y': end_y})
+
+    def back(self):
+        return self.execute('back')
+
+    def activate_app(self, app_id):
+        return self.execute('activateApp', {'app_id': app_id})
+
+    @property
+    def current_activity(self):
+        return self.execute('getCurrentActivity')
+
+    @property
+    def current_package(self):
+        return self.execute('getCurrentPackage')
+
+    def get_clipboard_text(self):
+        return self.execute('getClipboard')
+
+    def set_clipboard_text(self, text):
+        return self.execute('setClipboard', {'text': text})
+
+    def press_keycode(self, keycode):
+        return self.execute('pressKeyCode', {'keycode': keycode})
+
+    def execute_script(self, script, *args):
+        return self.execute('executeScript', {'script': script, 'args': args})
+
+    def hide_keyboard(self):
+        return self.execute('hideKeyboard')
+
+    def implicitly_wait(self, seconds):
+        return self.execute('setTimeouts', {'implicit': seconds})
+
+    def quit(self):
+        return self.execute('quit')
+
+    # Command handlers
+
+    def render(self):
+        """Current screen as (XML root, {element: spec})"""
+        specs = {}
+
+        def build(parent, spec, index):
+            x1, y1, x2, y2 = spec['bounds']
+            element = ET.SubElement(parent, spec['class'], {
+                'index': str(index), 'package': PACKAGE, 'class': spec['class'], 'text': spec['text'],
+                'resource-id': spec['resource-id'], 'content-desc': spec['content-desc'],
+                'clickable': 'true' if spec['clickable'] else 'false', 'enabled': 'true', 'displayed': 'true',
+                'bounds': f"[{x1},{y1}][{x2},{y2}]",
+            })
+            specs[element] = spec
+            for child_index, child in enumerate(spec['children']):
+                build(element, child, child_index)
+
+        root = ET.Element('hierarchy', {'index': '0', 'class': 'hierarchy', 'rotation': '0',
+                                        'width': str(WIDTH), 'height': str(HEIGHT)})
+        frame = ET.SubElement(root, 'android.widget.FrameLayout', {
+            'index': '0', 'package': PACKAGE, 'class': 'android.widget.FrameLayout', 'text': '',
+            'resource-id': '', 'content-desc': '', 'clickable': 'false', 'bounds': f"[0,0][{WIDTH},{HEIGHT}]",
+        })
+        for index, spec in enumerate(self.app.nodes()):
+            build(frame, spec, index)
+        return root, specs
+
+    def match(self, by, value):
+        root, specs = self.render()
+        if by == 'id':
+            found = [element for element in root.iter() if element.get('resource-id') == value]
+        elif by == 'accessibility id':
+            found = [element for element in root.iter() if element.get('content-desc') == value]
+        elif by == 'xpath':
+            found = root.findall('.' + value if value.startswith('//') else value)
+        elif by == '-android uiautomator':
+            attributes = {'resourceId': 'resource-id', 'description': 'content-desc', 'text': 'text', 'className': 'class'}
+            conditions = UISELECTOR_RE.findall(value)
+            instance = 0
+            found = list(root.iter())
+            for method, _, argument in conditions:
+                if method == 'instance':
+                    instance = int(argument)
+                else:
+                    found = [element for element in found if element.get(attributes[method]) == argument]
+            found = found[instance:instance + 1] if instance else found
+        else:
+            raise WebDriverException(f"Locator strategy {by!r} is not simulated")
+        return [FakeElement(self, specs[element], self.app.version) for element in found if element in specs]
+
+    def wait_implicitly(self, by, value):
+        """Poll like Appium's implicit wait does before reporting nothing found"""
+        deadline = time.monotonic() + self.implicit_wait * self.device.time_scale
+        while True:
+            found = self.match(by, value)
+            if found or time.monotonic() >= deadline:
+                return found
+            time.sleep(0.1)
+
+    def live(self, element):
+        if element.version != self.app.version:
+            raise StaleElementReferenceException("Element is no longer attached to the screen")
+        return element.spec
+
+    def _getPageSource(self):
+        root, _ = self.render()
+        return "<?xml version='1.0' encoding='UTF-8' standalone='yes' ?>" + ET.tostring(root, encoding='unicode')
+
+    def _findElement(self, using, value):
+        found = self.wait_implicitly(using, value)
+        if not found:
+            raise NoSuchElementException(f"No element found using {using}={value}")
+        return found[0]
+
+    def _findElements(self, using, value):
+        return self.wait_implicitly(using, value)
+
+    def _clickElement(self, id, element):
+        action = self.live(element)['action']
+        if action:
+            action()
+
+    def current(self, element):
+        """The element's spec as rendered now, so text reads see typed input"""
+        spec = self.live(element)
+        key = (spec['class'], spec['resource-id'], spec['content-desc'], spec['bounds'])
+        for candidate in self.render()[1].values():
+            if (candidate['class'], candidate['resource-id'], candidate['content-desc'], candidate['bounds']) == key:
+                return candidate
+        return spec
+
+    def _getElementText(self, id, element):
+        return self.current(element)['text']
+
+    def _getElementAttribute(self, id, element, name):
+        spec = self.current(element)
+        return str(spec['clickable']).lower() if name == 'clickable' else spec.get(name)
+
+    def _clearElement(self, id, element):
+        self.live(element)
+        if self.app.screen == "caption":
+            self.app.caption = ""
+
+    def _sendKeysToElement(self, id, element, text):
+        self.live(element)
+        if self.app.screen == "caption":
+            self.app.caption += text
+
+    def _tap(self, positions):
+        x, y = positions[0]
+        _, specs = self.render()
+        hit = None
+        for spec in specs.values():  # Document order, so later (topmost) elements win
+            x1, y1, x2, y2 = spec['bounds']
+            if spec['action'] and x1 <= x < x2 and y1 <= y < y2:
+                hit = spec
+        if hit:
+            hit['action']()
+
+    def _swipe(self, start_y, end_y):
+        self.app.scroll(start_y, end_y)
+
+    def _back(self):
+        self.app.back()
+
+    def _activateApp(self, app_id):
+        if app_id == PACKAGE and self.app.screen not in ("home", "inbox", "thread"):
+            self.app.go("home", replace=True)
+
+    def _getCurrentActivity(self):
+        return self.app.activity()
+
+    def _getCurrentPackage(self):
+        return PACKAGE
+
+    def _getClipboard(self):
+        return self.device.clipboard
+
+    def _setClipboard(self, text):
+        self.device.clipboard = text
+
+    def _pressKeyCode(self, keycode):
+        if keycode == 279 and self.app.screen == "caption":  # KEYCODE_PASTE
+            self.app.caption += self.device.clipboard
+
+    def _executeScript(self, script, args):
+        if script == "mobile: replaceElementValue" and self.app.screen == "caption":
+            self.app.caption = args[0]['text']
+
+    def _hideKeyboard(self):
+        pass
+
+    def _setTimeouts(self, implicit):
+        self.implicit_wait = implicit
+
+    def _quit(self):
+        pass
+
+
+class FakeDevice:
+    """A simulated device: app, driver, download folder and clipboard.
+
+    reels go to the thread with username; threads maps further senders to
+    their reels. Threads that have reels start out unread.
+    time_scale multiplies every simulated delay (command latency, loading
+    screens, implicit waits), e.g. 0.1 to run scenarios ten times faster.
+    """
+
+    def __init__(self, reels=(), username="friend", thread_id="", threads=None, deep_links=True, popup_every=0,
+                 load_time=0, latency=None, default_latency=0.0, failures=None, time_scale=1.0, seed=0):
+        self.time_scale = time_scale
+        self.clipboard = ""
+        self.files = {}  # name -> (bytes, modification counter)
+        self.clock = 0
+        self.app = FakeInstagram(self, username, thread_id, reels, threads, deep_links, popup_every, load_time)
+        self.driver = FakeDriver(self, latency, default_latency, failures, seed)
+        self.shell_calls = collections.Counter()
+
+    def add_file(self, name, data):
+        self.clock += 1
+        self.files[name] = (data, self.clock)
+
+    def gallery(self):
+        """File names, most recently modified first"""
+        return sorted(self.files, key=lambda name: -self.files[name][1])
+
+    def send(self, reel, sender=None):
+        """A new reel arrives in a thread (the main one by default)"""
+        sender = sender or self.app.username
+        self.app.threads.setdefault(sender, []).append(reel)
+        self.app.unread.add(sender)
+        self.app.inbox = [sender] + [name for name in self.app.inbox if name != sender]
+
+    def path_name(self, path):
+        directory, _, name = path.rpartition('/')
+        return name if directory == DOWNLOAD_DIR else None
+
+    def shell(self, command, timeout=15):
+        """Answer the adb shell commands the bot sends"""
+        args = shlex.split(command)
+        if not args:
+            return ""
+        self.shell_calls[args[0]] += 1
+        if args[0] == "stat":
+            return "".join(f"{len(data)} {DOWNLOAD_DIR}/{name}\n" for name, (data, _) in self.files.items())
+        if args[0] == "rm":
+            for pattern in (self.path_name(arg) for arg in args[1:] if not arg.startswith('-')):
+                for name in fnmatch.filter(list(self.files), pattern or ""):
+                    del self.files[name]
+            return ""
+        if args[0] == "touch":
+            name = self.path_name(args[1])
+            if name in self.files:
+                self.add_file(name, self.files[name][0])
+            return ""
+        if args[:2] == ["content", "query"] and "--where" in args:
+            # MediaStore indexes files as soon as they exist: "_data='<path>'"
+            name = self.path_name(args[args.index("--where") + 1].partition("'")[2].rstrip("'"))
+            return f"Row: 0 _id={self.files[name][1]}\n" if name in self.files else "No result found.\n"
+        if args[:2] == ["am", "start"] and "-d" in args:
+            self.app.open_uri(args[args.index("-d") + 1])
+            return "Status: ok\n"
+        return ""
+
+    def pull(self, remote_path, local_path):
+        with open(local_path, 'wb') as file:
+            file.write(self.files[self.path_name(remote_path)][0])
+
+    def push(self, local_path, remote_path):
+        with open(local_path, 'rb') as file:
+            self.add_file(self.path_name(remote_path), file.read())
+
+    def attach(self, bot):
+        """Point a bot at this device instead of Appium and adb"""
+        bot.driver = self.driver
+        bot.navigator.driver = self.driver
+        bot.shell = bot.navigator.shell = self.shell
+        bot.pull = self.pull
+        bot.push = self.push
+        self.driver.implicitly_wait(10)  # Same as InstagramReelsBot.connect()
+        return bot
@@ -0,0 +1,255 @@
+"""
+Perceptual fingerprints for near-duplicate reel detection.
+
+Exact content hashes (video_cache.py) miss copies of a reel that were
+re-encoded, resized or watermarked. This module samples frames from a video
+with ffmpeg and computes a DCT perceptual hash (pHash) per frame, plus one
+for the average frame that is used as the video's lookup key. Similar
+videos have keys a few bits apart, so near duplicates are found by Hamming
+distance.
+
+Optional: needs NumPy and ffmpeg/ffprobe on PATH. When either is missing,
+AVAILABLE is False and the bot skips this stage.
+"""
+
+import os
+import shutil
+import sqlite3
+import subprocess
+from itertools import combinations
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+FINGERPRINT_DB = os.path.join("video_cache", "fingerprints.db")
+
+FRAMES = 8  # Frames sampled evenly across each video
+FRAME_SIZE = 32  # Frames are scaled to FRAME_SIZE x FRAME_SIZE grayscale before hashing
+HASH_SIZE = 8  # Low-frequency DCT block used for the hash (HASH_SIZE^2 = 64 bits)
+KEY_DISTANCE = 8  # Maximum Hamming distance between video keys to consider a match
+FRAME_DISTANCE = 10  # Maximum mean Hamming distance between aligned frames to confirm it
+CHUNKS = 4  # 16-bit chunks in the multi-index
+REBUILD_EVERY = 1024  # New fingerprints scanned linearly before the tables are rebuilt
+FFMPEG_TIMEOUT = 60
+
+AVAILABLE = np is not None and shutil.which('ffmpeg') is not None and shutil.which('ffprobe') is not None
+
+
+class FingerprintError(Exception):
+    pass
+
+
+def dct_matrix(size):
+    """Orthonormal DCT-II basis, so a 2-D DCT is D @ X @ D.T"""
+    n = np.arange(size)
+    matrix = np.cos(np.pi * (2 * n[None, :] + 1) * n[:, None] / (2 * size)) * np.sqrt(2 / size)
+    matrix[0] /= np.sqrt(2)
+    return matrix
+
+
+def phash(frames):
+    """64-bit perceptual hashes for a stack of grayscale frames.
+
+    frames has shape (n, FRAME_SIZE, FRAME_SIZE); returns n uint64 values.
+    All frames are transformed in one batched matrix product.
+    """
+    basis = dct_matrix(FRAME_SIZE)
+    coefficients = basis @ frames.astype(np.float64) @ basis.T
+    low = coefficients[:, :HASH_SIZE, :HASH_SIZE].reshape(len(frames), -1)
+    # The DC term only encodes overall brightness, leave it out of the median
+    bits = low > np.median(low[:, 1:], axis=1, keepdims=True)
+    return np.packbits(bits, axis=1).view('>u8').ravel().astype(np.uint64)
+
+
+POPCOUNT = None
+
+
+def hamming(a, b):
+    """Element-wise Hamming distance between uint64 arrays"""
+    global POPCOUNT
+    if POPCOUNT is None:
+        POPCOUNT = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+    xor = np.bitwise_xor(a, b)
+    return POPCOUNT[xor.view(np.uint8)].reshape(xor.shape + (8,)).sum(axis=-1)
+
+
+def video_duration(path):
+    result = subprocess.run(
+        ['ffprobe', '-v', 'error', '-show_entries', 'format=duration', '-of', 'csv=p=0', path],
+        capture_output=True, text=True, timeout=FFMPEG_TIMEOUT
+    )
+    try:
+        return float(result.stdout.strip())
+    except ValueError:
+        raise FingerprintError(f"ffprobe could not read {path}: {result.stderr.strip()[:200]}")
+
+
+def sample_frames(path, count=FRAMES):
+    """Decode count evenly spaced frames as (count, FRAME_SIZE, FRAME_SIZE) uint8"""
+    duration = video_duration(path)
+    rate = count / max(duration, 0.1)
+    result = subprocess.run(
+        ['ffmpeg', '-v', 'error', '-i', path,
+         '-vf', f"fps={rate:.6f},scale={FRAME_SIZE}:{FRAME_SIZE}:flags=area,format=gray",
+         '-frames:v', str(count), '-f', 'rawvideo', '-'],
+        capture_output=True, timeout=FFMPEG_TIMEOUT
+    )
+    frame_bytes = FRAME_SIZE * FRAME_SIZE
+    available = len(result.stdout) // frame_bytes
+    if available == 0:
+        raise FingerprintError(f"ffmpeg decoded no frames from {path}: {result.stderr.decode(errors='replace')[:200]}")
+    frames = np.frombuffer(result.stdout[:available * frame_bytes], dtype=np.uint8)
+    frames = frames.reshape(available, FRAME_SIZE, FRAME_SIZE)
+    if available < count:
+        # Very short clips: repeat the last frame so frame lists stay aligned
+        frames = np.concatenate([frames, np.repeat(frames[-1:], count - available, axis=0)])
+    return frames
+
+
+def fingerprint_frames(frames):
+    """(key, frame hashes) for a stack of sampled frames"""
+    key = phash(frames.mean(axis=0, keepdims=True))[0]
+    return key, phash(frames)
+
+
+def fingerprint_video(path):
+    """Perceptual fingerprint of a video file: (key, frame hashes)"""
+    return fingerprint_frames(sample_frames(path))
+
+
+class FingerprintIndex:
+    """Near-neighbour lookup of video fingerprints by Hamming distance.
+
+    Keys are split into CHUNKS chunks of 16 bits, each with a sorted NumPy
+    table (multi-index hashing). Two keys within KEY_DISTANCE bits of each
+    other must agree on some chunk to within KEY_DISTANCE // CHUNKS bits, so
+    binary-searching every chunk value within that radius finds all
+    candidates without scanning the whole index. Candidates are then checked
+    with vectorized distances over their keys and aligned frame hashes.
+
+    New fingerprints are scanned linearly until REBUILD_EVERY of them have
+    accumulated, then the tables are rebuilt. Fingerprints are persisted in
+    SQLite when a path is given.
+    """
+
+    def __init__(self, path=FINGERPRINT_DB, key_distance=KEY_DISTANCE, frame_distance=FRAME_DISTANCE):
+        self.key_distance = key_distance
+        self.frame_distance = frame_distance
+        self.chunk_bits = 64 // CHUNKS
+        self.masks = np.array(self.probe_masks(key_distance // CHUNKS), dtype=np.uint64)
+        self.reel_ids = []
+        self.keys = np.zeros(1024, dtype=np.uint64)
+        self.frames = np.zeros((1024, FRAMES), dtype=np.uint64)
+        self.tables = []
+        self.indexed = 0  # Fingerprints covered by the tables
+
+        self.conn = None
+        if path:
+            os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+            self.conn = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS fingerprints ("
+                " reel_id TEXT PRIMARY KEY,"
+                " key BLOB NOT NULL,"
+                " frames BLOB NOT NULL)"
+            )
+            rows = self.conn.execute("SELECT reel_id, key, frames FROM fingerprints ORDER BY rowid").fetchall()
+            if rows:
+                self.extend([row[0] for row in rows],
+                            np.frombuffer(b''.join(row[1] for row in rows), dtype=np.uint64),
+                            np.frombuffer(b''.join(row[2] for row in rows), dtype=np.uint64).reshape(-1, FRAMES))
+        self.rebuild()
+
+    def probe_masks(self, radius):
+        """XOR masks for every chunk value within radius bits"""
+        masks = [0]
+        for flips in range(1, radius + 1):
+            for bits in combinations(range(self.chunk_bits), flips):
+                masks.append(sum(1 << bit for bit in bits))
+        return masks
+
+    def chunk(self, keys, index):
+        return (keys >> np.uint64(index * self.chunk_bits)) & np.uint64((1 << self.chunk_bits) - 1)
+
+    def __len__(self):
+        return len(self.reel_ids)
+
+    def extend(self, reel_ids, keys, frames):
+        """Append fingerprints in bulk, growing the arrays geometrically"""
+        start, end = len(self.reel_ids), len(self.reel_ids) + len(reel_ids)
+        if end > len(self.keys):
+            capacity = max(end, 2 * len(self.keys))
+            self.keys = np.resize(self.keys, capacity)
+            self.frames = np.resize(self.frames, (capacity, FRAMES))
+        self.keys[start:end] = keys
+        self.frames[start:end] = frames
+        self.reel_ids.extend(reel_ids)
+
+    def rebuild(self):
+        """Sort every chunk of every key into the lookup tables"""
+        count = len(self.reel_ids)
+        keys = self.keys[:count]
+        self.tables = []
+        for index in range(CHUNKS):
+            chunks = self.chunk(keys, index)
+            order = np.argsort(chunks, kind='stable')
+            self.tables.append((chunks[order], order))
+        self.indexed = count
+
+    def add(self, reel_id, fingerprint):
+        key, frames = fingerprint
+        self.extend([reel_id], np.array([key], dtype=np.uint64), np.asarray(frames, dtype=np.uint64)[None, :])
+        if len(self.reel_ids) - self.indexed >= REBUILD_EVERY:
+            self.rebuild()
+        if self.conn is not None:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO fingerprints (reel_id, key, frames) VALUES (?, ?, ?)",
+                (reel_id, np.array([key], dtype=np.uint64).tobytes(), np.asarray(frames, dtype=np.uint64).tobytes())
+            )
+
+    def candidates(self, key):
+        """Indexes of fingerprints whose key may be within key_distance of key"""
+        found = [np.arange(self.indexed, len(self.reel_ids))]
+        key = np.array([key], dtype=np.uint64)
+        for index, (values, order) in enumerate(self.tables):
+            probes = self.chunk(key, index) ^ self.masks
+            low = np.searchsorted(values, probes, side='left')
+            lengths = np.searchsorted(values, probes, side='right') - low
+            total = int(lengths.sum())
+            if not total:
+                continue
+            # Expand every [low, high) range into the positions it covers
+            offsets = np.arange(total) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+            found.append(order[np.repeat(low, lengths) + offsets])
+        return np.unique(np.concatenate(found))
+
+    def find(self, fingerprint, exclude=None):
+        """Closest stored video within the thresholds.
+
+        exclude is a reel ID whose own fingerprints are ignored, e.g. the
+        reel being checked when it was fingerprinted on an earlier attempt.
+        Returns (reel_id, mean frame distance) or None.
+        """
+        key, frames = fingerprint
+        candidates = self.candidates(key)
+        if exclude is not None:
+            candidates = np.array([index for index in candidates if self.reel_ids[index] != exclude], dtype=np.int64)
+        if not len(candidates):
+            return None
+
+        close = candidates[hamming(self.keys[candidates], np.uint64(key)) <= self.key_distance]
+        if not len(close):
+            return None
+        distances = hamming(self.frames[close], np.asarray(frames, dtype=np.uint64)[None, :]).mean(axis=1)
+        best = int(np.argmin(distances))
+        if distances[best] > self.frame_distance:
+            return None
+        return self.reel_ids[close[best]], float(distances[best])
+
+    def close(self):
+        if self.conn is not None:
+            self.conn.close()
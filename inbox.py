@@ -0,0 +1,63 @@
+import re
+
+from locator import Selector
+
+
+ID = "com.instagram.android:id/"
+
+ROW = Selector(resource_id=ID + "row_inbox_container")
+USERNAME = Selector(resource_id=ID + "row_inbox_username")
+
+# Any of these inside a row marks its thread as unread
+UNREAD_INDICATORS = [
+    Selector(resource_id=ID + "thread_indicator_status_dot"),
+    Selector(resource_id=ID + "row_inbox_unread_indicator"),
+]
+UNREAD_DESC_RE = re.compile(r"\bunread\b", re.I)  # Row descriptions such as "friend, Unread, sent a reel"
+
+
+class InboxRow:
+    """One thread in the inbox list"""
+
+    def __init__(self, username, unread, node):
+        self.username = username
+        self.unread = unread
+        self.node = node  # What to tap to open the thread
+
+    def __repr__(self):
+        return f"InboxRow({self.username!r}, unread={self.unread})"
+
+
+def normalize(username):
+    return username.strip().lstrip('@').lower()
+
+
+def read_inbox(screen):
+    """Every thread row in an inbox snapshot, top to bottom"""
+    rows = []
+    for row in screen.find_all(ROW):
+        name = row.find(USERNAME)
+        if name is None or not name.text.strip():
+            continue
+        unread = (any(row.find(selector) is not None for selector in UNREAD_INDICATORS)
+                  or bool(UNREAD_DESC_RE.search(row.desc)))
+        rows.append(InboxRow(name.text.strip().lstrip('@'), unread, row))
+    return rows
+
+
+def threads_to_open(rows, senders, also=()):
+    """Rows of monitored senders worth opening, highest priority first.
+
+    A thread qualifies when it is unread, or when its sender is in also
+    (e.g. senders with downloads waiting for a retry). Matching is by exact
+    username, case-insensitive, so a sender never matches someone else's
+    thread.
+    """
+    priority = {normalize(sender): index for index, sender in enumerate(senders)}
+    also = {normalize(sender) for sender in also}
+    chosen = {}
+    for row in rows:
+        key = normalize(row.username)
+        if key in priority and key not in chosen and (row.unread or key in also):
+            chosen[key] = row
+    return sorted(chosen.values(), key=lambda row: priority[normalize(row.username)])
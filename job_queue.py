@@ -0,0 +1,232 @@
+import sqlite3
+import time
+
+from reel_store import PROCESSED_DB
+
+
+# Job states. A reel moves discovered -> downloaded -> posted; failed is
+# terminal and only reached after MAX_ATTEMPTS tries at the current stage.
+DISCOVERED = "discovered"
+DOWNLOADED = "downloaded"
+POSTED = "posted"
+FAILED = "failed"
+
+MAX_ATTEMPTS = 3  # Tries per stage before a job is marked failed
+RETRY_DELAY = 60  # Seconds before the first retry, doubled on every further failure
+MAX_RETRY_DELAY = 3600
+
+
+class JobQueue:
+    """Durable queue of reels between detection and reposting.
+
+    Detection (finding and downloading reels in the thread) and publishing
+    (reposting them) run as separate stages. Every state change is committed
+    before returning, so after a crash or restart the bot resumes with the
+    reels that were already downloaded instead of losing them.
+
+    Jobs live in the same SQLite database as the processed reels store. A
+    job belongs to the device that discovered it and is published from
+    that device.
+    """
+
+    def __init__(self, path=PROCESSED_DB):
+        self.path = path
+        self.conn = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=FULL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            " reel_id TEXT PRIMARY KEY,"
+            " owner TEXT NOT NULL,"
+            " state TEXT NOT NULL,"
+            " batch REAL NOT NULL,"
+            " position INTEGER NOT NULL,"
+            " attempts INTEGER NOT NULL DEFAULT 0,"
+            " next_attempt_at REAL NOT NULL DEFAULT 0,"
+            " file_name TEXT,"
+            " file_size INTEGER,"
+            " content_hash TEXT,"
+            " sender TEXT,"
+            " error TEXT,"
+            " updated_at REAL NOT NULL,"
+            " posted_at REAL)"
+        )
+        columns = {row['name'] for row in self.conn.execute("PRAGMA table_info(jobs)")}
+        if 'content_hash' not in columns:
+            self.conn.execute("ALTER TABLE jobs ADD COLUMN content_hash TEXT")
+        if 'sender' not in columns:
+            self.conn.execute("ALTER TABLE jobs ADD COLUMN sender TEXT")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS jobs_owner_state ON jobs (owner, state)")
+        # Where the last walk through each thread ended (see Bot.check_for_reels)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS walks ("
+            " owner TEXT NOT NULL,"
+            " sender TEXT NOT NULL,"
+            " watermark TEXT,"
+            " resume INTEGER NOT NULL DEFAULT 0,"
+            " updated_at REAL NOT NULL,"
+            " PRIMARY KEY (owner, sender))"
+        )
+
+    def get(self, reel_id):
+        row = self.conn.execute("SELECT * FROM jobs WHERE reel_id = ?", (reel_id,)).fetchone()
+        return dict(row) if row else None
+
+    def discover(self, reel_id, owner, batch, position, sender=None):
+        """Queue a newly found reel.
+
+        batch identifies the check that found it and position its place in
+        the thread walk (0 = newest), so jobs can be published oldest first.
+        sender is the username whose thread it was found in.
+        Returns False if another device already owns the reel.
+        """
+        with self.conn:
+            self.conn.execute("BEGIN IMMEDIATE")
+            row = self.conn.execute("SELECT owner FROM jobs WHERE reel_id = ?", (reel_id,)).fetchone()
+            if row:
+                return row['owner'] == owner
+            self.conn.execute(
+                "INSERT INTO jobs (reel_id, owner, state, batch, position, sender, updated_at)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (reel_id, owner, DISCOVERED, batch, position, sender, time.time())
+            )
+        return True
+
+    def mark_downloaded(self, reel_id, file_name, file_size, content_hash=None):
+        self.conn.execute(
+            "UPDATE jobs SET state = ?, file_name = ?, file_size = ?, content_hash = ?, attempts = 0,"
+            " next_attempt_at = 0, error = NULL, updated_at = ? WHERE reel_id = ?",
+            (DOWNLOADED, file_name, file_size, content_hash, time.time(), reel_id)
+        )
+
+    def mark_posted(self, reel_id):
+        now = time.time()
+        self.conn.execute(
+            "UPDATE jobs SET state = ?, error = NULL, updated_at = ?, posted_at = ? WHERE reel_id = ?",
+            (POSTED, now, now, reel_id)
+        )
+
+    def mark_failed(self, reel_id, error):
+        """Give up on a job without further retries"""
+        self.conn.execute(
+            "UPDATE jobs SET state = ?, error = ?, updated_at = ? WHERE reel_id = ?",
+            (FAILED, str(error)[:500], time.time(), reel_id)
+        )
+
+    def reset(self, reel_id):
+        """Send a downloaded job back to be downloaded again (its video is gone)"""
+        self.conn.execute(
+            "UPDATE jobs SET state = ?, file_name = NULL, file_size = NULL, content_hash = NULL, attempts = 0,"
+            " next_attempt_at = 0, updated_at = ? WHERE reel_id = ?",
+            (DISCOVERED, time.time(), reel_id)
+        )
+
+    def retry(self, reel_id, error):
+        """Record a failed attempt and schedule the next one with exponential backoff.
+
+        Returns the job's new state: unchanged while attempts remain, FAILED
+        once MAX_ATTEMPTS is reached.
+        """
+        with self.conn:
+            self.conn.execute("BEGIN IMMEDIATE")
+            row = self.conn.execute("SELECT state, attempts FROM jobs WHERE reel_id = ?", (reel_id,)).fetchone()
+            if row is None:
+                return None
+            attempts = row['attempts'] + 1
+            state = FAILED if attempts >= MAX_ATTEMPTS else row['state']
+            delay = min(MAX_RETRY_DELAY, RETRY_DELAY * 2 ** (attempts - 1))
+            self.conn.execute(
+                "UPDATE jobs SET state = ?, attempts = ?, next_attempt_at = ?, error = ?, updated_at = ?"
+                " WHERE reel_id = ?",
+                (state, attempts, time.time() + delay, str(error)[:500], time.time(), reel_id)
+            )
+        return state
+
+    def is_due(self, job, now=None):
+        return job['next_attempt_at'] <= (time.time() if now is None else now)
+
+    def jobs(self, owner, state):
+        """Jobs of one device in a state, oldest reel first"""
+        rows = self.conn.execute(
+            "SELECT * FROM jobs WHERE owner = ? AND state = ? ORDER BY batch, position DESC",
+            (owner, state)
+        ).fetchall()
+        return [dict(row) for row in rows]
+
+    def due(self, owner, state):
+        now = time.time()
+        return [job for job in self.jobs(owner, state) if self.is_due(job, now)]
+
+    def next_due_in(self, owner, state):
+        """Seconds until the next job in a state is due, or None if there are none"""
+        row = self.conn.execute(
+            "SELECT MIN(next_attempt_at) FROM jobs WHERE owner = ? AND state = ?", (owner, state)
+        ).fetchone()
+        if row[0] is None:
+            return None
+        return max(0, row[0] - time.time())
+
+    def next_publish_in(self, owner, per_hour):
+        """Seconds until the publish rate allows another post (0 = now).
+
+        The rate is a sliding one-hour window over posts already made, so it
+        holds across restarts. per_hour of 0 or None means unlimited.
+        """
+        if not per_hour:
+            return 0
+        since = time.time() - 3600
+        rows = self.conn.execute(
+            "SELECT posted_at FROM jobs WHERE owner = ? AND posted_at > ? ORDER BY posted_at DESC LIMIT ?",
+            (owner, since, per_hour)
+        ).fetchall()
+        if len(rows) < per_hour:
+            return 0
+        return max(0, rows[-1]['posted_at'] - since)
+
+    def walk(self, owner, sender):
+        """(watermark, resume) of the last walk through a thread.
+
+        watermark is the newest reel of the last walk that went all the way
+        back to reels handled before; resume is True when a later walk was
+        cut short and older new reels may still be waiting.
+        """
+        row = self.conn.execute(
+            "SELECT watermark, resume FROM walks WHERE owner = ? AND sender = ?", (owner, sender.lower())
+        ).fetchone()
+        return (row['watermark'], bool(row['resume'])) if row else (None, False)
+
+    def finish_walk(self, owner, sender, complete, newest=None):
+        """Record how a walk through a thread ended.
+
+        A complete walk moves the watermark to newest (the first reel it
+        saw); an incomplete one keeps the old watermark and sets resume.
+        """
+        watermark, _ = self.walk(owner, sender)
+        if complete:
+            watermark = newest or watermark
+        self.conn.execute(
+            "INSERT OR REPLACE INTO walks (owner, sender, watermark, resume, updated_at) VALUES (?, ?, ?, ?, ?)",
+            (owner, sender.lower(), watermark, 0 if complete else 1, time.time())
+        )
+
+    def unfinished_walks(self, owner):
+        """Senders whose last walk was cut short"""
+        rows = self.conn.execute("SELECT sender FROM walks WHERE owner = ? AND resume = 1", (owner,)).fetchall()
+        return [row['sender'] for row in rows]
+
+    def owners(self):
+        """Devices that have jobs in the queue"""
+        return [row[0] for row in self.conn.execute("SELECT DISTINCT owner FROM jobs ORDER BY owner")]
+
+    def counts(self, owner=None):
+        """Number of jobs per state, for one device or all of them"""
+        query = "SELECT state, COUNT(*) FROM jobs"
+        params = ()
+        if owner is not None:
+            query += " WHERE owner = ?"
+            params = (owner,)
+        return dict(self.conn.execute(query + " GROUP BY state", params).fetchall())
+
+    def close(self):
+        self.conn.close()
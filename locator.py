@@ -0,0 +1,170 @@
+import re
+import time
+import xml.etree.ElementTree as ET
+
+
+BOUNDS_RE = re.compile(r"\[(-?\d+),(-?\d+)\]\[(-?\d+),(-?\d+)\]")
+
+
+class Selector:
+    """A locator resolved against a page-source snapshot instead of the device.
+
+    Supports the attributes the bot already relies on (resource-id, text,
+    content-desc) plus class name, clickable and exact bounds. A raw XPath
+    can be given instead for structural matches such as parent/child.
+    """
+
+    def __init__(self, resource_id=None, text=None, desc=None, class_name=None,
+                 clickable=None, bounds=None, instance=0, xpath=None, name=None):
+        self.resource_id = resource_id
+        self.text = text
+        self.desc = desc
+        self.class_name = class_name
+        self.clickable = clickable
+        self.bounds = bounds
+        self.instance = instance
+        self.xpath = xpath
+        self.name = name
+
+    def matches(self, element):
+        attrib = element.attrib
+        if self.resource_id is not None and attrib.get('resource-id') != self.resource_id:
+            return False
+        if self.text is not None and attrib.get('text') != self.text:
+            return False
+        if self.desc is not None and attrib.get('content-desc') != self.desc:
+            return False
+        if self.class_name is not None and attrib.get('class', element.tag) != self.class_name:
+            return False
+        if self.clickable is not None and (attrib.get('clickable') == 'true') != self.clickable:
+            return False
+        if self.bounds is not None and parse_bounds(attrib.get('bounds')) != tuple(self.bounds):
+            return False
+        return True
+
+    def __repr__(self):
+        if self.name:
+            return self.name
+        if self.xpath:
+            return self.xpath
+        parts = [f"{key}={value!r}" for key, value in (
+            ('resource_id', self.resource_id), ('text', self.text), ('desc', self.desc),
+            ('class_name', self.class_name), ('clickable', self.clickable),
+            ('bounds', self.bounds)) if value is not None]
+        if self.instance:
+            parts.append(f"instance={self.instance}")
+        return f"Selector({', '.join(parts)})"
+
+
+def parse_bounds(bounds):
+    """Turn a UiAutomator bounds string '[x1,y1][x2,y2]' into a tuple"""
+    match = BOUNDS_RE.match(bounds or "")
+    if not match:
+        return None
+    return tuple(int(value) for value in match.groups())
+
+
+class Node:
+    """An element found in a snapshot. Only tapping it touches the device."""
+
+    def __init__(self, element):
+        self.element = element
+        self.attrib = element.attrib
+
+    @property
+    def text(self):
+        return self.attrib.get('text', '')
+
+    @property
+    def desc(self):
+        return self.attrib.get('content-desc', '')
+
+    @property
+    def resource_id(self):
+        return self.attrib.get('resource-id', '')
+
+    @property
+    def bounds(self):
+        return parse_bounds(self.attrib.get('bounds'))
+
+    @property
+    def center(self):
+        x1, y1, x2, y2 = self.bounds
+        return (x1 + x2) // 2, (y1 + y2) // 2
+
+    def find_all(self, selector):
+        """Resolve a selector within this node's subtree"""
+        return resolve(self.element, selector)
+
+    def find(self, selector):
+        nodes = self.find_all(selector)
+        return nodes[0] if nodes else None
+
+
+def resolve(root, selector):
+    if selector.xpath is not None:
+        xpath = selector.xpath
+        if xpath.startswith('//'):
+            xpath = '.' + xpath
+        elements = root.findall(xpath)
+    else:
+        elements = [element for element in root.iter() if selector.matches(element)]
+    return [Node(element) for element in elements[selector.instance:]]
+
+
+class Screen:
+    """One page_source snapshot of the device screen.
+
+    A single request fetches the whole UI hierarchy; every selector is then
+    resolved locally, so checking N selectors costs one round trip instead of N.
+    """
+
+    def __init__(self, driver, source=None):
+        self.driver = driver
+        self.root = None
+        self.refresh(source)
+
+    def refresh(self, source=None):
+        """Fetch a new snapshot from the device"""
+        if source is None:
+            source = self.driver.page_source
+        self.root = ET.fromstring(source.encode('utf-8') if isinstance(source, str) else source)
+        return self
+
+    def find_all(self, selector):
+        return resolve(self.root, selector)
+
+    def find(self, selector):
+        nodes = self.find_all(selector)
+        return nodes[0] if nodes else None
+
+    def exists(self, selector):
+        return self.find(selector) is not None
+
+    def first(self, *selectors):
+        """Return (selector, node) for the first selector that matches, in order"""
+        for selector in selectors:
+            node = self.find(selector)
+            if node is not None:
+                return selector, node
+        return None, None
+
+    def wait_for(self, *selectors, timeout=5, interval=0.5, refresh=True):
+        """Re-snapshot until any selector matches, then return (selector, node).
+
+        Pass refresh=False when the current snapshot was taken on this screen
+        and can be checked before going back to the device.
+        """
+        deadline = time.monotonic() + timeout
+        if refresh:
+            self.refresh()
+        while True:
+            selector, node = self.first(*selectors)
+            if node is not None or time.monotonic() >= deadline:
+                return selector, node
+            time.sleep(interval)
+            self.refresh()
+
+    def tap(self, node):
+        """Tap an element by the centre of its bounds"""
+        self.driver.tap([node.center])
@@ -0,0 +1,239 @@
+import collections
+import re
+import threading
+import time
+
+from adb import adb_shell
+from metrics import METRICS
+
+
+INSTAGRAM_PACKAGE = "com.instagram.android"
+UIA2_PROCESS = "io.appium.uiautomator2.server"
+
+SAMPLE_INTERVAL = 60  # Seconds between samples
+TREND_WINDOW = 60  # Samples kept per process for the growth trend (an hour at the default interval)
+MIN_TREND_MINUTES = 30  # Growth is only judged over at least this much history
+
+INSTAGRAM_PSS_LIMIT_MB = 900  # Recycle Instagram above this PSS
+INSTAGRAM_GROWTH_LIMIT_MB = 150  # ...or when it keeps growing faster than this per hour
+UIA2_PSS_LIMIT_MB = 300  # Recycle the UiAutomator2 instrumentation above this PSS
+UIA2_GROWTH_LIMIT_MB = 60
+MIN_FREE_STORAGE_MB = 1024  # Clear Instagram's caches when /data has less free space than this
+RECYCLE_COOLDOWN = 1800  # Seconds before the same target is recycled again for the same reason
+
+CLEAR_CACHE_MIN_SDK = 34  # `pm clear --cache-only` exists from Android 14; older pm ignores the flag and wipes the app
+
+# Run with Instagram stopped. Beyond the downloads clear_stored_videos removes:
+# the app's external cache and the copies it saves of every post.
+# cache_commands() adds Instagram's internal cache where that can be done
+# without touching its data or any other app.
+CACHE_COMMANDS = [
+    f"rm -rf /storage/emulated/0/Android/data/{INSTAGRAM_PACKAGE}/cache/*",
+    "rm -rf /storage/emulated/0/Pictures/Instagram/*",
+]
+ROOT_CACHE_COMMAND = f"su 0 sh -c 'rm -rf /data/data/{INSTAGRAM_PACKAGE}/cache/*'"
+
+SEPARATOR = "---- memory watchdog ----"
+SAMPLE_COMMAND = (f"dumpsys meminfo {INSTAGRAM_PACKAGE}; echo '{SEPARATOR}'; "
+                  f"dumpsys meminfo {UIA2_PROCESS}; echo '{SEPARATOR}'; df -k /data")
+
+TOTAL_PSS_RE = re.compile(r"TOTAL PSS:\s+(\d+)")
+TOTAL_ROW_RE = re.compile(r"^\s*TOTAL\s+(\d+)", re.M)  # Older Android: first column of the TOTAL row
+JAVA_HEAP_RE = re.compile(r"Java Heap:\s+(\d+)")
+NATIVE_HEAP_RE = re.compile(r"Native Heap:\s+(\d+)")
+
+TARGETS = {
+    # target -> (sample field, PSS limit MB, growth limit MB/hour)
+    'instagram': ('instagram_kb', INSTAGRAM_PSS_LIMIT_MB, INSTAGRAM_GROWTH_LIMIT_MB),
+    'uiautomator2': ('uiautomator2_kb', UIA2_PSS_LIMIT_MB, UIA2_GROWTH_LIMIT_MB),
+}
+
+
+def parse_meminfo(dump):
+    """(total PSS, Java heap, native heap) in kB from `dumpsys meminfo <process>`.
+
+    Every process of that name is added up. Returns None when the process
+    is not running.
+    """
+    sections = dump.split("** MEMINFO in pid")[1:]
+    if not sections:
+        return None
+    totals = [0, 0, 0]
+    for section in sections:
+        total = TOTAL_PSS_RE.search(section) or TOTAL_ROW_RE.search(section)
+        if not total:
+            continue
+        totals[0] += int(total.group(1))
+        for index, pattern in ((1, JAVA_HEAP_RE), (2, NATIVE_HEAP_RE)):
+            match = pattern.search(section)
+            if match:
+                totals[index] += int(match.group(1))
+    return tuple(totals)
+
+
+def parse_free_bytes(df_output):
+    """Available bytes from `df -k <path>`, or None"""
+    lines = [line for line in df_output.strip().splitlines() if line.strip()]
+    if len(lines) < 2:
+        return None
+    fields = lines[-1].split()
+    # The last three columns are Available, Use% and the mount point
+    if len(fields) < 4 or not fields[-3].isdigit():
+        return None
+    return int(fields[-3]) * 1024
+
+
+def parse_sample(output, now=None):
+    """One sample from the output of SAMPLE_COMMAND"""
+    parts = output.split(SEPARATOR)
+    if len(parts) != 3:
+        raise ValueError("unexpected memory sample output")
+    instagram = parse_meminfo(parts[0])
+    uiautomator2 = parse_meminfo(parts[1])
+    return {
+        'time': time.time() if now is None else now,
+        'instagram_kb': instagram[0] if instagram else None,
+        'instagram_java_kb': instagram[1] if instagram else None,
+        'instagram_native_kb': instagram[2] if instagram else None,
+        'uiautomator2_kb': uiautomator2[0] if uiautomator2 else None,
+        'free_bytes': parse_free_bytes(parts[2]),
+    }
+
+
+def growth_per_hour(points):
+    """Least-squares slope of (time, kB) points in MB per hour"""
+    if len(points) < 2:
+        return None
+    mean_t = sum(t for t, _ in points) / len(points)
+    mean_v = sum(v for _, v in points) / len(points)
+    spread = sum((t - mean_t) ** 2 for t, _ in points)
+    if not spread:
+        return None
+    slope = sum((t - mean_t) * (v - mean_v) for t, v in points) / spread  # kB per second
+    return slope * 3600 / 1024
+
+
+def parse_sdk(output):
+    """API level from `getprop ro.build.version.sdk`, or None"""
+    output = (output or "").strip()
+    return int(output) if output.isdigit() else None
+
+
+def cache_commands(sdk):
+    """CACHE_COMMANDS plus the safe way to clear Instagram's internal cache on this API level.
+
+    Before Android 14 `pm clear` silently ignores --cache-only and clears all
+    of Instagram's data, logging the account out, so only root is tried there
+    (and whenever the API level is unknown).
+    """
+    if sdk is not None and sdk >= CLEAR_CACHE_MIN_SDK:
+        return CACHE_COMMANDS + [f"pm clear --cache-only {INSTAGRAM_PACKAGE} || {ROOT_CACHE_COMMAND}"]
+    return CACHE_COMMANDS + [ROOT_CACHE_COMMAND]
+
+
+class MemoryWatchdog:
+    """Tracks how Instagram, UiAutomator2 and device storage grow over a long run.
+
+    A background thread samples memory and free storage every interval
+    seconds (one adb shell call) and exports each sample as gauges. The bot
+    asks recycles_due() between cycles, so restarts never interrupt a
+    cycle. read_sample is any callable returning SAMPLE_COMMAND output,
+    which lets the watchdog run against a fake device.
+    """
+
+    def __init__(self, read_sample, interval=SAMPLE_INTERVAL, window=TREND_WINDOW):
+        self.read_sample = read_sample
+        self.interval = interval
+        self.trends = {target: collections.deque(maxlen=window) for target in TARGETS}
+        self.latest = None
+        self.recycled_at = {}  # (target, reason) -> time of the last recycle
+        self.lock = threading.Lock()
+        self.stopped = threading.Event()
+        self.thread = None
+
+    @classmethod
+    def for_device(cls, device_id, interval=SAMPLE_INTERVAL):
+        return cls(lambda: adb_shell(device_id, SAMPLE_COMMAND, timeout=30), interval)
+
+    def sample(self):
+        """Take and record one sample"""
+        sample = parse_sample(self.read_sample())
+        with self.lock:
+            self.latest = sample
+            for target, (field, _, _) in TARGETS.items():
+                if sample[field] is not None:
+                    self.trends[target].append((sample['time'], sample[field]))
+
+        for target, (field, _, _) in TARGETS.items():
+            if sample[field] is not None:
+                METRICS.set('device_memory_pss_bytes', sample[field] * 1024, process=target)
+            growth = self.growth(target)
+            if growth is not None:
+                METRICS.set('device_memory_growth_bytes_per_hour', growth * 1024 ** 2, process=target)
+        for heap in ('java', 'native'):
+            value = sample[f'instagram_{heap}_kb']
+            if value is not None:
+                METRICS.set('device_memory_heap_bytes', value * 1024, process='instagram', heap=heap)
+        if sample['free_bytes'] is not None:
+            METRICS.set('device_storage_free_bytes', sample['free_bytes'])
+        METRICS.event('memory_sample', **{key: value for key, value in sample.items() if key != 'time'})
+        return sample
+
+    def growth(self, target):
+        """MB per hour the target grew over the window, or None with too little history"""
+        with self.lock:
+            points = list(self.trends[target])
+        if len(points) < 2 or points[-1][0] - points[0][0] < MIN_TREND_MINUTES * 60:
+            return None
+        return growth_per_hour(points)
+
+    def recycles_due(self):
+        """[(target, reason)] to recycle now; reason is 'memory', 'growth' or 'storage'"""
+        with self.lock:
+            sample = self.latest
+        if sample is None:
+            return []
+
+        due = []
+        for target, (field, limit_mb, growth_limit_mb) in TARGETS.items():
+            growth = self.growth(target)
+            if sample[field] is not None and sample[field] > limit_mb * 1024:
+                due.append((target, 'memory'))
+            elif growth is not None and growth > growth_limit_mb:
+                due.append((target, 'growth'))
+        if (sample['free_bytes'] is not None and sample['free_bytes'] < MIN_FREE_STORAGE_MB * 1024 ** 2
+                and not any(target == 'instagram' for target, _ in due)):
+            due.append(('instagram', 'storage'))
+
+        now = time.time()
+        return [(target, reason) for target, reason in due
+                if now - self.recycled_at.get((target, reason), 0) >= RECYCLE_COOLDOWN]
+
+    def recycled(self, target, reason=None):
+        """Forget a target's trend after it restarted; reason starts its cooldown"""
+        with self.lock:
+            self.trends[target].clear()
+            if reason:
+                self.recycled_at[(target, reason)] = time.time()
+            if self.latest is not None:
+                self.latest = {**self.latest, TARGETS[target][0]: None}
+
+    def _loop(self):
+        while not self.stopped.is_set():
+            try:
+                self.sample()
+            except Exception as e:
+                print(f"[WARNING] Could not sample device memory: {e}")
+            self.stopped.wait(self.interval)
+
+    def start(self):
+        if self.thread and self.thread.is_alive():
+            return
+        self.stopped.clear()
+        self.thread = threading.Thread(target=self._loop, name="memory-watchdog", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stopped.set()
+        if self.thread:
+            self.thread.join(timeout=5)
@@ -0,0 +1,242 @@
+import bisect
+import contextlib
+import functools
+import http.server
+import json
+import logging
+import logging.handlers
+import os
+import threading
+import time
+
+from appium_log import LOG_BACKUPS, LOG_DIR, LOG_MAX_BYTES
+
+
+METRICS_PORT = 9464  # Prometheus endpoint: http://localhost:9464/metrics (0 = disabled)
+
+# Histogram bucket upper bounds in seconds, from single Appium commands to whole stages
+LATENCY_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+HELP = {
+    'bot_stage_seconds': "Time spent in each bot stage",
+    'appium_command_seconds': "Latency of individual Appium commands",
+    'bot_cycles_total': "Check cycles started",
+    'bot_reels_reposted_total': "Reels posted successfully",
+    'bot_reels_skipped_total': "Reels skipped, by reason",
+    'bot_no_download_button_total': "Opened reels that had no Download button",
+    'bot_recoveries_total': "Recovery attempts, by the tier that restored the session",
+    'bot_errors_total': "Errors in the main loop",
+    'bot_bubbles_recognised_total': "Thread walks stopped at a known bubble without opening it",
+    'bot_recycles_total': "Proactive restarts of Instagram or UiAutomator2, by reason",
+    'device_memory_pss_bytes': "Proportional set size of the Instagram and UiAutomator2 processes",
+    'device_memory_heap_bytes': "Instagram Java and native heap",
+    'device_memory_growth_bytes_per_hour': "Memory growth trend over the watchdog window",
+    'device_storage_free_bytes': "Free space on the device's /data partition",
+}
+
+
+class Histogram:
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # Last slot is +Inf
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.total += value
+        self.count += 1
+
+
+def escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def label_text(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{escape(value)}"' for key, value in labels) + "}"
+
+
+class Metrics:
+    """Counters, gauges, latency histograms and a structured JSON event log.
+
+    Metrics are keyed by name and labels. Every observation is cheap (a dict
+    lookup and a bisect under a lock), so timers can wrap hot paths such as
+    every Appium command. base_labels (e.g. the device) are added to every
+    metric and log line.
+    """
+
+    def __init__(self, base_labels=None):
+        self.base_labels = dict(base_labels or {})
+        self.counters = {}
+        self.gauges = {}
+        self.histograms = {}
+        self.lock = threading.Lock()
+        self.logger = None
+        self.stage_listeners = []  # Called as listener(stage, event) around every timed stage
+
+    def key(self, name, labels):
+        return name, tuple(sorted({**self.base_labels, **labels}.items()))
+
+    def inc(self, name, amount=1, **labels):
+        key = self.key(name, labels)
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + amount
+
+    def set(self, name, value, **labels):
+        key = self.key(name, labels)
+        with self.lock:
+            self.gauges[key] = value
+
+    def observe(self, name, seconds, **labels):
+        key = self.key(name, labels)
+        with self.lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram()
+            histogram.observe(seconds)
+
+    @contextlib.contextmanager
+    def timer(self, name, log=True, **labels):
+        """Time the enclosed block into histogram `name`, also on exceptions"""
+        started = time.perf_counter()
+        outcome = "ok"
+        try:
+            yield
+        except BaseException:
+            outcome = "error"
+            raise
+        finally:
+            elapsed = time.perf_counter() - started
+            self.observe(name, elapsed, **labels)
+            if log:
+                self.event(name, seconds=round(elapsed, 4), outcome=outcome, **labels)
+
+    def timed(self, stage):
+        """Decorator: time every call of a function as bot_stage_seconds{stage=...}"""
+        def decorator(function):
+            @functools.wraps(function)
+            def wrapper(*args, **kwargs):
+                self.notify_stage(stage, 'start')
+                outcome = 'error'
+                try:
+                    with self.timer('bot_stage_seconds', stage=stage):
+                        result = function(*args, **kwargs)
+                    outcome = 'ok'
+                    return result
+                finally:
+                    self.notify_stage(stage, outcome)
+            return wrapper
+        return decorator
+
+    def notify_stage(self, stage, event):
+        """Tell stage listeners a stage started ('start') or ended ('ok' or 'error')"""
+        for listener in self.stage_listeners:
+            try:
+                listener(stage, event)
+            except Exception:
+                pass  # Observers must never break the stage they observe
+
+    def open_log(self, name, log_dir=LOG_DIR):
+        """Write events as JSON lines to a rotated logs/<name>.jsonl"""
+        os.makedirs(log_dir, exist_ok=True)
+        self.logger = logging.getLogger(f"reels_bot.metrics.{name}")
+        self.logger.propagate = False
+        self.logger.setLevel(logging.INFO)
+        if not self.logger.handlers:
+            handler = logging.handlers.RotatingFileHandler(
+                os.path.join(log_dir, f"{name}.jsonl"),
+                maxBytes=LOG_MAX_BYTES,
+                backupCount=LOG_BACKUPS,
+                encoding='utf-8'
+            )
+            self.logger.addHandler(handler)
+
+    def event(self, event, **fields):
+        """Append one structured event to the JSON log (no-op until open_log)"""
+        if self.logger is None:
+            return
+        record = {'time': round(time.time(), 3), 'event': event, **self.base_labels, **fields}
+        self.logger.info(json.dumps(record, default=str))
+
+    def render(self):
+        """All metrics in the Prometheus text exposition format"""
+        with self.lock:
+            counters = sorted(self.counters.items())
+            gauges = sorted(self.gauges.items())
+            histograms = sorted((key, (list(h.counts), h.total, h.count, h.buckets))
+                                for key, h in self.histograms.items())
+
+        lines = []
+        seen = set()
+
+        def header(name, kind):
+            if name not in seen:
+                seen.add(name)
+                if name in HELP:
+                    lines.append(f"# HELP {name} {HELP[name]}")
+                lines.append(f"# TYPE {name} {kind}")
+
+        for (name, labels), value in counters:
+            header(name, "counter")
+            lines.append(f"{name}{label_text(labels)} {value}")
+
+        for (name, labels), value in gauges:
+            header(name, "gauge")
+            lines.append(f"{name}{label_text(labels)} {value}")
+
+        for (name, labels), (counts, total, count, buckets) in histograms:
+            header(name, "histogram")
+            cumulative = 0
+            for bound, bucket_count in zip(list(buckets) + ["+Inf"], counts):
+                cumulative += bucket_count
+                lines.append(f"{name}_bucket{label_text(labels + (('le', bound),))} {cumulative}")
+            lines.append(f"{name}_sum{label_text(labels)} {total:.6f}")
+            lines.append(f"{name}_count{label_text(labels)} {count}")
+        return "\n".join(lines) + "\n"
+
+    def serve(self, port=METRICS_PORT, host="127.0.0.1"):
+        """Serve /metrics over HTTP from a daemon thread. Returns the server."""
+        metrics = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?')[0] not in ('/', '/metrics'):
+                    self.send_error(404)
+                    return
+                body = metrics.render().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass  # Scrapes would otherwise flood the console
+
+        server = http.server.ThreadingHTTPServer((host, port), Handler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+        return server
+
+
+def instrument_driver(driver, metrics):
+    """Time every Appium command sent through driver.
+
+    All WebDriver calls (find_element, click, page_source, ...) go through
+    driver.execute, so wrapping it once covers every command.
+    """
+    execute = driver.execute
+
+    def timed_execute(driver_command, params=None):
+        with metrics.timer('appium_command_seconds', log=False, command=driver_command):
+            return execute(driver_command, params)
+
+    driver.execute = timed_execute
+    return driver
+
+
+# Process-wide registry. Each bot worker is its own process, so this is per device.
+METRICS = Metrics()
+timed = METRICS.timed
@@ -0,0 +1,135 @@
+import contextlib
+import shlex
+import time
+
+from locator import Screen, Selector
+
+
+INSTAGRAM_PACKAGE = "com.instagram.android"
+ID = "com.instagram.android:id/"
+
+# Screen fingerprints, checked in order against one snapshot. The first
+# screen with any matching selector wins, so more specific screens come first.
+SCREEN_FINGERPRINTS = [
+    ("create", [
+        Selector(resource_id=ID + "caption_input_text_view"),
+        Selector(resource_id=ID + "clips_right_action_button"),
+        Selector(resource_id=ID + "next_button_textview"),
+    ]),
+    ("reel_viewer", [
+        Selector(resource_id=ID + "direct_share_button"),
+        Selector(resource_id=ID + "clips_viewer_view_pager"),
+    ]),
+    ("thread", [
+        Selector(resource_id=ID + "row_thread_composer_edittext"),
+        Selector(resource_id=ID + "message_content_horizontal_placeholder_container"),
+    ]),
+    ("inbox", [
+        Selector(resource_id=ID + "inbox_refreshable_thread_list_recyclerview"),
+        Selector(resource_id=ID + "row_inbox_container"),
+        Selector(resource_id=ID + "row_inbox_username"),
+    ]),
+    ("home", [
+        Selector(resource_id=ID + "title_text", text="For you"),
+    ]),
+]
+
+# Deep links per target screen. {thread_id} is filled in for direct threads.
+DEEP_LINKS = {
+    "home": "instagram://mainfeed",
+    "inbox": "instagram://direct-inbox",
+    "thread": "instagram://direct-thread?id={thread_id}",
+}
+
+DEEP_LINK_TIMEOUT = 8  # Seconds to wait for a deep link to land on the target screen
+DEEP_LINK_MAX_FAILURES = 3  # Failures in a row before a deep link is disabled
+DEEP_LINK_RETRY_AFTER = 1800  # Seconds before a disabled deep link is tried again
+
+
+def fingerprint(screen):
+    """Name of the screen shown in a snapshot, or 'unknown'"""
+    for name, selectors in SCREEN_FINGERPRINTS:
+        if screen.first(*selectors)[1] is not None:
+            return name
+    return "unknown"
+
+
+class Navigator:
+    """Identifies the current screen in one query and jumps straight to a
+    target screen with `am start` deep-link intents.
+
+    A deep link that fails to reach its target DEEP_LINK_MAX_FAILURES times
+    in a row is disabled for DEEP_LINK_RETRY_AFTER seconds, so the caller's
+    key-press fallback is not preceded by a wasted intent every cycle. One
+    slow screen load does not count against it for long: a success resets
+    the count. Time spent navigating is accumulated per cycle.
+    """
+
+    def __init__(self, driver, shell, package=INSTAGRAM_PACKAGE):
+        self.driver = driver
+        self.shell = shell
+        self.package = package
+        self.link_failures = {}  # target -> failures in a row
+        self.broken_links = {}  # target -> monotonic time it may be tried again
+        self.cycle_time = 0.0
+        self.depth = 0
+        self.screen = None
+
+    def current(self):
+        """Take a snapshot and return the name of the current screen"""
+        self.screen = Screen(self.driver)
+        return fingerprint(self.screen)
+
+    def wait_for_screen(self, target, timeout):
+        deadline = time.monotonic() + timeout
+        while True:
+            if self.current() == target:
+                return True
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(0.5)
+
+    def deep_link(self, target, **params):
+        """Fire the deep link for target and wait until the screen shows up"""
+        template = DEEP_LINKS.get(target)
+        if template is None or time.monotonic() < self.broken_links.get(target, 0):
+            return False
+
+        uri = template.format(**params)
+        self.shell(f"am start -W -a android.intent.action.VIEW -d {shlex.quote(uri)} {self.package}")
+        if self.wait_for_screen(target, DEEP_LINK_TIMEOUT):
+            self.link_failures.pop(target, None)
+            return True
+
+        failures = self.link_failures[target] = self.link_failures.get(target, 0) + 1
+        if failures >= DEEP_LINK_MAX_FAILURES:
+            print(f"[WARNING] Deep link {uri} did not open the {target} screen {failures} times in a row, "
+                  f"using key presses for the next {DEEP_LINK_RETRY_AFTER // 60} minutes")
+            self.broken_links[target] = time.monotonic() + DEEP_LINK_RETRY_AFTER
+            self.link_failures[target] = 0
+        else:
+            print(f"[WARNING] Deep link {uri} did not open the {target} screen, using key presses this time")
+        return False
+
+    def go(self, target, **params):
+        """Reach target directly. Returns False when the caller has to fall back."""
+        if self.current() == target and not params:
+            return True
+        return self.deep_link(target, **params)
+
+    @contextlib.contextmanager
+    def timed(self):
+        """Count the enclosed block as navigation time (nested blocks count once)"""
+        started = time.monotonic()
+        self.depth += 1
+        try:
+            yield
+        finally:
+            self.depth -= 1
+            if self.depth == 0:
+                self.cycle_time += time.monotonic() - started
+
+    def take_cycle_time(self):
+        """Return the navigation time of the cycle that just finished and reset it"""
+        elapsed, self.cycle_time = self.cycle_time, 0.0
+        return elapsed
@@ -0,0 +1,111 @@
+import re
+import threading
+
+from adb import adb_shell
+
+
+INSTAGRAM_PACKAGE = "com.instagram.android"
+
+KEY_RE = re.compile(r"\bkey=(\S+)")
+CHANNEL_RE = re.compile(r"\bchannel=(\S+?)[\s,)]")
+# Fields of a record that change when Instagram updates a grouped notification in place
+STAMP_RES = [
+    re.compile(r"\bwhen=(\d+)"),
+    re.compile(r"\bmUpdateTimeMs=(\d+)"),
+    re.compile(r"\bandroid\.text=(.*)"),
+]
+
+
+def parse_dm_notifications(dump, package=INSTAGRAM_PACKAGE):
+    """Return the Instagram direct-message notifications in a
+    `dumpsys notification` dump as {key: stamp}.
+
+    The stamp collects the record's post time, update time and text, so a
+    notification updated under the same key (another DM from a sender
+    whose notification is still showing) gets a new stamp.
+    """
+    notifications = {}
+    key = None
+    for line in dump.splitlines():
+        if "NotificationRecord" in line:
+            key = None
+            if f"pkg={package}" not in line:
+                continue
+            match = KEY_RE.search(line)
+            if not match:
+                continue
+            channel = CHANNEL_RE.search(line)
+            channel = channel.group(1) if channel else ""
+            if "direct" in match.group(1).lower() or "direct" in channel.lower():
+                key = match.group(1)
+                notifications.setdefault(key, ())
+            continue
+        if key is None:
+            continue
+        for pattern in STAMP_RES:
+            match = pattern.search(line)
+            if match:
+                notifications[key] += (match.group(1).strip(),)
+    return notifications
+
+
+class DmNotificationWatcher:
+    """Wakes the bot when a new Instagram DM notification is posted.
+
+    A background thread reads the notification list every poll_interval
+    seconds (no UI traversal involved) and sets an event as soon as a DM
+    notification key appears that was not there before, or a known one is
+    updated with a new post time or text. read_notifications
+    is any callable returning `dumpsys notification` output, which lets the
+    watcher run against a fake adb stream.
+    """
+
+    def __init__(self, read_notifications, poll_interval=3):
+        self.read_notifications = read_notifications
+        self.poll_interval = poll_interval
+        self.new_message = threading.Event()
+        self.stopped = threading.Event()
+        self.known = None
+        self.thread = None
+
+    @classmethod
+    def for_device(cls, device_id, poll_interval=3):
+        return cls(lambda: adb_shell(device_id, "dumpsys notification --noredact"), poll_interval)
+
+    def poll_once(self):
+        """Read the notification list once; returns True if a new DM arrived"""
+        notifications = parse_dm_notifications(self.read_notifications())
+        fresh = self.known is not None and any(
+            self.known.get(key) != stamp for key, stamp in notifications.items())
+        self.known = notifications
+        if fresh:
+            self.new_message.set()
+        return fresh
+
+    def _loop(self):
+        while not self.stopped.is_set():
+            try:
+                if self.poll_once():
+                    print("[INFO] New DM notification received")
+            except Exception as e:
+                print(f"[WARNING] Could not read notifications: {e}")
+            self.stopped.wait(self.poll_interval)
+
+    def start(self):
+        if self.thread and self.thread.is_alive():
+            return
+        self.stopped.clear()
+        self.thread = threading.Thread(target=self._loop, name="dm-notifications", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stopped.set()
+        if self.thread:
+            self.thread.join(timeout=self.poll_interval + 1)
+
+    def wait(self, timeout):
+        """Block until a new DM notification or the timeout (the timed poll
+        fallback). Returns True if woken by a notification."""
+        woken = self.new_message.wait(timeout)
+        self.new_message.clear()
+        return woken
@@ -0,0 +1,71 @@
+import time
+
+from locator import Screen, Selector
+
+
+class PopupRule:
+    """A known Instagram dialog and the element that dismisses it.
+
+    trigger identifies the popup on screen; target is what gets tapped and
+    defaults to the trigger itself (e.g. a "Not now" button).
+    """
+
+    def __init__(self, name, trigger, target=None):
+        self.name = name
+        self.trigger = trigger
+        self.target = target or trigger
+
+    def __repr__(self):
+        return f"PopupRule({self.name!r})"
+
+
+POPUP_RULES = [
+    PopupRule("Not now", Selector(desc="Not now")),
+    PopupRule("OK", Selector(text="OK")),
+    PopupRule("Got it", Selector(text="Got it")),
+    PopupRule("Rate app", Selector(resource_id="com.instagram.android:id/appirater_cancel_button")),
+    PopupRule("No, thanks", Selector(text="No, thanks")),
+    PopupRule("Reels upsell", Selector(text="Get more from your next reel"), Selector(text="For you")),
+]
+
+
+def register_popup_rule(rule, first=False):
+    """Add a popup rule. Rules are all checked against the same snapshot, so
+    adding one does not slow down the common no-popup case."""
+    if first:
+        POPUP_RULES.insert(0, rule)
+    else:
+        POPUP_RULES.append(rule)
+
+
+def dismiss_popups(driver, screen=None, rules=None, max_rounds=3, settle=1):
+    """Dismiss every known popup currently on screen.
+
+    Takes one snapshot and matches all rules against it; when nothing matches
+    it returns straight away. After a dismissal the screen is re-read, since
+    dialogs can be stacked. Returns the names of the rules that fired.
+    """
+    rules = POPUP_RULES if rules is None else rules
+    screen = screen or Screen(driver)
+    dismissed = []
+
+    for _ in range(max_rounds):
+        fired = None
+        for rule in rules:
+            if not screen.exists(rule.trigger):
+                continue
+            target = screen.find(rule.target)
+            if target is not None:
+                screen.tap(target)
+                fired = rule
+                break
+
+        if fired is None:
+            break
+
+        dismissed.append(fired.name)
+        print(f"[SUCCESS] Dismissed popup using: {fired.name}")
+        time.sleep(settle)
+        screen.refresh()
+
+    return dismissed
@@ -0,0 +1,95 @@
+import time
+
+
+BREAKER_THRESHOLD = 3  # Failed full escalations in a row before the breaker opens
+BREAKER_COOLDOWN = 300  # Seconds the breaker stays open before trying again
+
+
+class RecoveryManager:
+    """Escalating crash recovery with a circuit breaker.
+
+    tiers is an ordered list of (name, action) pairs, cheapest first. Each
+    action tries to restore a working session and returns True on success.
+    recover() runs the tiers in order until one succeeds, so only the layer
+    that actually failed gets restarted. When every tier fails
+    BREAKER_THRESHOLD times in a row the breaker opens and recovery is not
+    attempted again until the cooldown has passed.
+    """
+
+    def __init__(self, tiers, threshold=BREAKER_THRESHOLD, cooldown=BREAKER_COOLDOWN):
+        self.tiers = tiers
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.consecutive_failures = 0
+        self.open_until = 0
+        self.stats = {name: {'attempts': 0, 'successes': 0, 'seconds': 0.0} for name, _ in tiers}
+        self.recoveries = []  # (tier name or None, seconds) of recent recoveries
+
+    @property
+    def is_open(self):
+        return time.monotonic() < self.open_until
+
+    def cooldown_remaining(self):
+        return max(0, self.open_until - time.monotonic())
+
+    def tier_index(self, name):
+        for index, (tier_name, _) in enumerate(self.tiers):
+            if tier_name == name:
+                return index
+        raise KeyError(name)
+
+    def recover(self, start_tier=None):
+        """Escalate through the tiers, starting at start_tier (name or index).
+
+        Returns the name of the tier that restored the session, or None.
+        """
+        if self.is_open:
+            print(f"[WARNING] Recovery circuit breaker open, "
+                  f"next attempt in {self.cooldown_remaining():.0f} seconds")
+            return None
+
+        if isinstance(start_tier, str):
+            start_tier = self.tier_index(start_tier)
+        started = time.monotonic()
+
+        for name, action in self.tiers[start_tier or 0:]:
+            print(f"[INFO] Recovery: trying '{name}'...")
+            tier_started = time.monotonic()
+            self.stats[name]['attempts'] += 1
+            try:
+                ok = action()
+            except Exception as e:
+                print(f"[WARNING] Recovery tier '{name}' failed: {e}")
+                ok = False
+            self.stats[name]['seconds'] += time.monotonic() - tier_started
+
+            if ok:
+                self.stats[name]['successes'] += 1
+                self.consecutive_failures = 0
+                elapsed = time.monotonic() - started
+                self.recoveries = (self.recoveries + [(name, elapsed)])[-50:]
+                print(f"[SUCCESS] Recovered with '{name}' in {elapsed:.1f}s")
+                return name
+
+        self.consecutive_failures += 1
+        self.recoveries = (self.recoveries + [(None, time.monotonic() - started)])[-50:]
+        if self.consecutive_failures >= self.threshold:
+            self.open_until = time.monotonic() + self.cooldown
+            print(f"[ERROR] Recovery failed {self.consecutive_failures} times in a row, "
+                  f"pausing recovery for {self.cooldown} seconds")
+        return None
+
+    def mean_time_to_recover(self):
+        times = [seconds for name, seconds in self.recoveries if name]
+        return sum(times) / len(times) if times else None
+
+    def report(self):
+        lines = [f"{'tier':<16} {'attempts':>8} {'successes':>9} {'avg (s)':>8}"]
+        for name, _ in self.tiers:
+            stat = self.stats[name]
+            average = stat['seconds'] / stat['attempts'] if stat['attempts'] else 0
+            lines.append(f"{name:<16} {stat['attempts']:>8} {stat['successes']:>9} {average:>8.1f}")
+        mttr = self.mean_time_to_recover()
+        if mttr is not None:
+            lines.append(f"mean time to recover: {mttr:.1f}s")
+        return "\n".join(lines)
@@ -0,0 +1,150 @@
+import os
+import sqlite3
+import time
+
+
+PROCESSED_DB = "processed_reels.db"
+LEGACY_FILE = "processed_reels.txt"
+
+COMPACT_EVERY = 1000  # Checkpoint/compact the database after this many writes
+LEASE_SECONDS = 900  # How long a device may hold a reel before another device can take it over
+
+
+class ReelStore:
+    """Indexed, crash-safe store of processed reel IDs.
+
+    IDs are kept in an in-memory set for O(1) lookups and persisted to a
+    SQLite database. Every write is committed before returning, so a crash
+    can never lose an ID that was reported as saved. Call refresh() to add
+    IDs saved by other processes to the set.
+
+    Several bot processes (one per device) can share the same database.
+    A device claims a reel with claim() before working on it; the lease
+    guarantees that two devices never repost the same reel.
+    """
+
+    def __init__(self, path=PROCESSED_DB, legacy_path=LEGACY_FILE):
+        self.path = path
+        self.conn = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=FULL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS processed ("
+            " reel_id TEXT PRIMARY KEY,"
+            " processed_at REAL NOT NULL)"
+        )
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS leases ("
+            " reel_id TEXT PRIMARY KEY,"
+            " owner TEXT NOT NULL,"
+            " expires_at REAL NOT NULL)"
+        )
+        self.writes = 0
+        self.migrate_legacy(legacy_path)
+        self.ids = set()
+        self.last_rowid = 0
+        self.refresh()
+
+    def refresh(self):
+        """Pick up IDs added by other processes sharing the database"""
+        rows = self.conn.execute(
+            "SELECT rowid, reel_id FROM processed WHERE rowid > ? ORDER BY rowid", (self.last_rowid,)
+        ).fetchall()
+        for rowid, reel_id in rows:
+            self.ids.add(reel_id)
+            self.last_rowid = rowid
+        return len(rows)
+
+    def migrate_legacy(self, legacy_path):
+        """One-time import of the old newline-separated processed_reels.txt"""
+        if not legacy_path or not os.path.exists(legacy_path):
+            return 0
+
+        with open(legacy_path, 'r', encoding='utf-8') as file:
+            ids = {line.strip() for line in file if line.strip()}
+        if not ids:
+            return 0  # Nothing to import; leave the (empty) file where it is
+
+        now = time.time()
+        with self.conn:
+            self.conn.execute("BEGIN IMMEDIATE")
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO processed (reel_id, processed_at) VALUES (?, ?)",
+                [(reel_id, now) for reel_id in ids]
+            )
+
+        # Keep the old file around, but make sure it is never imported twice
+        try:
+            os.replace(legacy_path, legacy_path + ".migrated")
+        except FileNotFoundError:
+            pass  # Another worker sharing the store migrated it first
+        print(f"[INFO] Migrated {len(ids)} reel IDs from {legacy_path} to {self.path}")
+        return len(ids)
+
+    def __contains__(self, reel_id):
+        return reel_id in self.ids
+
+    def __len__(self):
+        return len(self.ids)
+
+    def add(self, reel_id):
+        """Record a reel ID. Returns False if it was already known."""
+        if reel_id in self.ids:
+            return False
+
+        with self.conn:
+            self.conn.execute("BEGIN IMMEDIATE")
+            self.conn.execute(
+                "INSERT OR IGNORE INTO processed (reel_id, processed_at) VALUES (?, ?)",
+                (reel_id, time.time())
+            )
+            self.conn.execute("DELETE FROM leases WHERE reel_id = ?", (reel_id,))
+        self.ids.add(reel_id)
+
+        self.writes += 1
+        if self.writes % COMPACT_EVERY == 0:
+            self.compact()
+        return True
+
+    def claim(self, reel_id, owner, lease_seconds=LEASE_SECONDS):
+        """Take a lease on a reel for this device.
+
+        Returns False if the reel is already processed or another device holds
+        an unexpired lease on it. Re-claiming one's own lease extends it.
+        """
+        now = time.time()
+        with self.conn:
+            self.conn.execute("BEGIN IMMEDIATE")
+            if self.conn.execute("SELECT 1 FROM processed WHERE reel_id = ?", (reel_id,)).fetchone():
+                self.ids.add(reel_id)
+                return False
+            lease = self.conn.execute(
+                "SELECT owner, expires_at FROM leases WHERE reel_id = ?", (reel_id,)
+            ).fetchone()
+            if lease and lease[0] != owner and lease[1] > now:
+                return False
+            self.conn.execute(
+                "INSERT OR REPLACE INTO leases (reel_id, owner, expires_at) VALUES (?, ?, ?)",
+                (reel_id, owner, now + lease_seconds)
+            )
+        return True
+
+    def release(self, reel_id, owner):
+        """Give up a lease, e.g. when the reel could not be downloaded"""
+        self.conn.execute("DELETE FROM leases WHERE reel_id = ? AND owner = ?", (reel_id, owner))
+
+    def leases(self):
+        """Active leases as {reel_id: owner}"""
+        rows = self.conn.execute(
+            "SELECT reel_id, owner FROM leases WHERE expires_at > ?", (time.time(),)
+        ).fetchall()
+        return dict(rows)
+
+    def compact(self):
+        """Fold the write-ahead log back into the main database file"""
+        self.conn.execute("DELETE FROM leases WHERE expires_at < ?", (time.time(),))
+        self.conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+    def close(self):
+        self.compact()
+        self.conn.close()
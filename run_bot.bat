@@ -16,5 +16,5 @@ if %errorlevel% neq 0 (
 )
 
 REM Run launcher
-python run_bot.py
+python run_bot.py %*
 pause
\ No newline at end of file
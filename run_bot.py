@@ -1,53 +1,122 @@
 #!/usr/bin/env python3
 """
-Instagram Reels Bot - Simple Launcher
-Interactive launcher that prompts for configuration and runs the bot
+Instagram Reels Bot - Launcher
+Runs the bot with settings from bot_config.json, REELS_BOT_* environment
+variables or command-line flags (in increasing priority), and asks for
+anything still missing when started from a terminal.
+
+Usage:
+    python run_bot.py                                  # interactive when device/username are not configured
+    python run_bot.py run --device emulator-5554 --username friend --interval 300
+    python run_bot.py check [--refresh]                # dependency check (cached)
+    python run_bot.py status                           # queue, store and cache summary
+    python run_bot.py config                           # effective settings and where they come from
+    python run_bot.py compact                          # checkpoint the store, drop expired leases
+    python run_bot.py evict-cache [--max-mb N]         # trim the host video cache
 """
 
+import argparse
+import importlib.util
+import json
 import os
-import sys
+import shutil
 import subprocess
+import sys
+import time
+
+CONFIG_FILE = "bot_config.json"
+ENV_PREFIX = "REELS_BOT_"  # REELS_BOT_DEVICE_ID, REELS_BOT_USERNAME, REELS_BOT_CHECK_INTERVAL, ...
+PREFLIGHT_CACHE = ".preflight.json"  # Tool checks, keyed by tool path and modification time
+TOOL_TIMEOUT = 60
+
+def sender_list(value):
+    """Usernames from a JSON list or a comma-separated string"""
+    if isinstance(value, str):
+        value = value.split(',')
+    return [sender.strip().lstrip('@') for sender in value if sender.strip()]
+
+
+# Setting name -> type. Names match BotConfig arguments; unset ones fall back to bot.py.
+SETTINGS = {
+    'device_id': str,
+    'username': str,
+    'senders': sender_list,
+    'thread_id': str,
+    'check_interval': int,
+    'appium_port': int,
+    'system_port': int,
+    'metrics_port': int,
+    'publish_per_hour': int,
+}
+
+# Tool -> arguments that print its version
+TOOLS = {
+    'appium': ['--version'],
+    'adb': ['version'],
+}
+
+
+def load_preflight_cache():
+    try:
+        with open(PREFLIGHT_CACHE, encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
 
-def check_dependencies():
+
+def check_tool(name, cache, refresh=False):
+    """Version of a tool on PATH, or None. Runs it only when its binary changed."""
+    path = shutil.which(name)
+    if path is None:
+        return None
+    # npm and the SDK manager install through symlinks; an upgrade changes the target
+    target = os.path.realpath(path)
+    mtime = os.stat(target).st_mtime
+    cached = cache.get(name)
+    if not refresh and cached and cached['path'] == target and cached['mtime'] == mtime:
+        return cached['version']
+
+    try:
+        result = subprocess.run([path, *TOOLS[name]], capture_output=True, text=True, timeout=TOOL_TIMEOUT)
+    except (OSError, subprocess.TimeoutExpired):
+        return None
+    if result.returncode != 0:
+        return None
+    version = result.stdout.strip().splitlines()[0] if result.stdout.strip() else "unknown version"
+    cache[name] = {'path': target, 'mtime': mtime, 'version': version, 'checked_at': time.time()}
+    return version
+
+
+def check_dependencies(refresh=False):
     """Check if required tools are available"""
     print("Checking dependencies...")
-    
-    # Check Python packages
-    try:
-        import appium
-        import selenium
-    except ImportError:
+
+    # Check Python packages without importing them
+    missing = [name for name in ('appium', 'selenium') if importlib.util.find_spec(name) is None]
+    if missing:
         print("❌ Missing Python packages")
         print("Install with: pip install Appium-Python-Client selenium")
         return False
-    
-    # Check Appium
-    try:
-        result = subprocess.run(['appium', '--version'], capture_output=True, text=True)
-        if result.returncode == 0:
-            print(f"✅ Appium {result.stdout.strip()}")
+
+    cache = load_preflight_cache()
+    ok = True
+    for name, hint in (('appium', "Install with: npm install -g appium"),
+                       ('adb', "Make sure Android SDK is installed")):
+        version = check_tool(name, cache, refresh)
+        if version is None:
+            print(f"❌ {name} not found or not working")
+            print(hint)
+            ok = False
         else:
-            print("❌ Appium not working")
-            return False
-    except FileNotFoundError:
-        print("❌ Appium not found")
-        print("Install with: npm install -g appium")
-        return False
-    
-    # Check ADB
+            print(f"✅ {name} {version}")
+
     try:
-        result = subprocess.run(['adb', 'version'], capture_output=True, text=True)
-        if result.returncode == 0:
-            print("✅ ADB found")
-        else:
-            print("❌ ADB not working")
-            return False
-    except FileNotFoundError:
-        print("❌ ADB not found")
-        print("Make sure Android SDK is installed")
-        return False
-    
-    return True
+        with open(PREFLIGHT_CACHE, 'w', encoding='utf-8') as f:
+            json.dump(cache, f, indent=2)
+    except OSError:
+        pass
+    return ok
+
 
 def get_device_id():
     """Get device ID from user"""
@@ -57,16 +126,16 @@ def get_device_id():
         if result.returncode == 0:
             lines = result.stdout.strip().split('\n')[1:]  # Skip header
             devices = [line.split('\t')[0] for line in lines if line.strip()]
-            
+
             if not devices:
                 print("No devices found. Make sure emulator is running.")
                 return None
-            
+
             for i, device in enumerate(devices, 1):
                 print(f"{i}. {device}")
-            
+
             choice = input("Enter device number (or device ID): ").strip()
-            
+
             if choice.isdigit() and 1 <= int(choice) <= len(devices):
                 return devices[int(choice) - 1]
             elif choice in devices:
@@ -81,68 +150,97 @@ def get_device_id():
         device_id = input("Enter device ID: ").strip()
         return device_id if device_id else None
 
-def update_config(device_id, username):
-    """Update bot configuration"""
-    try:
-        with open('bot.py', 'r', encoding='utf-8') as f:
-            content = f.read()
-        
-        # Replace configuration
-        content = content.replace('YOUR_USERNAME = ""', f'YOUR_USERNAME = "{username}"')
-        content = content.replace('DEVICE_ID = ""', f'DEVICE_ID = "{device_id}"')
-        
-        with open('bot.py', 'w', encoding='utf-8') as f:
-            f.write(content)
-        
-        return True
-    except Exception as e:
-        print(f"Error updating config: {e}")
-        return False
 
-def main():
-    """Main launcher"""
-    print("🤖 Instagram Reels Bot")
-    print("=" * 25)
-    
-    # Check dependencies
-    if not check_dependencies():
-        return 1
-    
-    # Get configuration
-    print("\nBot Configuration:")
-    print("-" * 18)
-    
-    device_id = get_device_id()
-    if not device_id:
-        print("No device selected")
-        return 1
-    
-    username = input("Enter Instagram username to monitor: @").strip()
-    if not username:
-        print("No username provided")
-        return 1
-    
-    print(f"\nConfiguration:")
-    print(f"  Device: {device_id}")
-    print(f"  Monitor: @{username}")
-    
-    confirm = input("\nStart bot? (y/n): ").strip().lower()
-    if confirm != 'y':
-        print("Cancelled")
-        return 1
-    
-    # Update configuration
-    print("Updating configuration...")
-    if not update_config(device_id, username):
+def load_settings(args):
+    """Merge the config file, environment and CLI flags.
+
+    Returns (settings, sources): only settings that were given somewhere,
+    and where each one came from.
+    """
+    settings, sources = {}, {}
+    config_path = args.config or os.environ.get(ENV_PREFIX + "CONFIG") or CONFIG_FILE
+    if os.path.exists(config_path):
+        with open(config_path, encoding='utf-8') as f:
+            for name, value in json.load(f).items():
+                if name not in SETTINGS:
+                    raise ValueError(f"Unknown setting {name!r} in {config_path}")
+                settings[name], sources[name] = value, config_path
+
+    for name in SETTINGS:
+        value = os.environ.get(ENV_PREFIX + name.upper())
+        if value:
+            settings[name], sources[name] = value, ENV_PREFIX + name.upper()
+        value = getattr(args, name, None)
+        if value is not None:
+            settings[name], sources[name] = value, "command line"
+
+    for name, value in settings.items():
+        try:
+            settings[name] = SETTINGS[name](value)
+        except ValueError:
+            raise ValueError(f"Invalid {name} {value!r} ({sources[name]})")
+    if 'username' in settings:
+        settings['username'] = settings['username'].lstrip('@')
+    return settings, sources
+
+
+def save_settings(settings, path=CONFIG_FILE):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(settings, f, indent=2)
+        f.write("\n")
+
+
+def command_run(args):
+    settings, _ = load_settings(args)
+
+    if not args.skip_check and not check_dependencies():
         return 1
-    
+
+    from bot import BotConfig, InstagramReelsBot
+    defaults = BotConfig()  # Values still set in bot.py itself count as configured
+    missing = [name for name in ('device_id', 'username') if not settings.get(name) and not getattr(defaults, name)]
+    if settings.get('senders') and 'username' in missing:
+        missing.remove('username')  # The senders list is enough on its own
+    if missing and not sys.stdin.isatty():
+        print(f"❌ Missing {', '.join(missing)}: set them in {CONFIG_FILE}, "
+              f"as {ENV_PREFIX}* variables or with --device/--username")
+        return 2
+
+    if missing:
+        # Get configuration
+        print("\nBot Configuration:")
+        print("-" * 18)
+
+        if 'device_id' in missing:
+            settings['device_id'] = get_device_id()
+            if not settings['device_id']:
+                print("No device selected")
+                return 1
+
+        if 'username' in missing:
+            settings['username'] = input("Enter Instagram username to monitor: @").strip().lstrip('@')
+            if not settings['username']:
+                print("No username provided")
+                return 1
+
+        print(f"\nConfiguration:")
+        print(f"  Device: {settings.get('device_id') or defaults.device_id}")
+        print(f"  Monitor: @{settings.get('username') or defaults.username}")
+
+        confirm = input("\nStart bot? (y/n): ").strip().lower()
+        if confirm != 'y':
+            print("Cancelled")
+            return 1
+
+        if input(f"Save these settings to {CONFIG_FILE}? (y/n): ").strip().lower() == 'y':
+            save_settings(settings)
+
     # Start bot
     print("\n🚀 Starting Instagram Reels Bot...")
     print("Press Ctrl+C to stop\n")
-    
+
     try:
-        from bot import InstagramReelsBot
-        bot = InstagramReelsBot()
+        bot = InstagramReelsBot(BotConfig(**settings))
         bot.run()
     except KeyboardInterrupt:
         print("\n\n👋 Bot stopped by user")
@@ -150,6 +248,117 @@ def main():
     except Exception as e:
         print(f"\n❌ Error: {e}")
         return 1
+    return 0
+
+
+def command_check(args):
+    return 0 if check_dependencies(refresh=args.refresh) else 1
+
+
+def command_config(args):
+    settings, sources = load_settings(args)
+    for name in SETTINGS:
+        if name in settings:
+            print(f"{name:<18} {settings[name]!s:<24} ({sources[name]})")
+        else:
+            print(f"{name:<18} {'-':<24} (bot.py default)")
+    return 0
+
+
+def command_status(args):
+    from job_queue import DISCOVERED, DOWNLOADED, FAILED, POSTED, JobQueue
+    from reel_store import PROCESSED_DB, ReelStore
+    from video_cache import VideoCache
+
+    if not os.path.exists(PROCESSED_DB):
+        print(f"No {PROCESSED_DB} yet, the bot has not run here")
+        return 0
+
+    store = ReelStore(PROCESSED_DB, legacy_path=None)
+    jobs = JobQueue(PROCESSED_DB)
+    cache = VideoCache()
+    try:
+        print(f"Processed reels: {len(store)}, active leases: {len(store.leases())}")
+        print(f"{'device':<20} {'discovered':>10} {'downloaded':>10} {'posted':>8} {'failed':>7}")
+        for owner in jobs.owners():
+            counts = jobs.counts(owner)
+            print(f"{owner:<20} {counts.get(DISCOVERED, 0):>10} {counts.get(DOWNLOADED, 0):>10} "
+                  f"{counts.get(POSTED, 0):>8} {counts.get(FAILED, 0):>7}")
+        print(f"Video cache: {cache.size() / 1024 ** 2:.0f} MB of {cache.max_bytes / 1024 ** 2:.0f} MB")
+    finally:
+        store.conn.close()  # Read-only look: skip the checkpoint close() does
+        jobs.close()
+        cache.close()
+    return 0
+
+
+def command_compact(args):
+    from reel_store import PROCESSED_DB, ReelStore
+
+    store = ReelStore(PROCESSED_DB)
+    store.close()  # Closing checkpoints the WAL and drops expired leases
+    print(f"Compacted {PROCESSED_DB}")
+    return 0
+
+
+def command_evict_cache(args):
+    from video_cache import VideoCache
+
+    cache = VideoCache()
+    if args.max_mb is not None:
+        cache.max_bytes = args.max_mb * 1024 ** 2
+    try:
+        before = cache.size()
+        evicted = cache.evict()
+        print(f"Evicted {evicted} video(s), {(before - cache.size()) / 1024 ** 2:.0f} MB freed")
+    finally:
+        cache.close()
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Instagram Reels Bot launcher")
+    parser.add_argument("--config", help=f"Settings file (default: {CONFIG_FILE})")
+    commands = parser.add_subparsers(dest="command")
+
+    run_parser = commands.add_parser("run", help="Start the bot (default)")
+    run_parser.add_argument("--device", dest="device_id", help="adb device ID")
+    run_parser.add_argument("--username", help="Instagram username whose DMs are monitored")
+    run_parser.add_argument("--sender", dest="senders", action="append",
+                            help="Monitored sender, highest priority first (repeatable; default: --username)")
+    run_parser.add_argument("--thread-id", dest="thread_id", help="ID of the DM thread, for deep links")
+    run_parser.add_argument("--interval", dest="check_interval", type=int, help="Seconds between checks")
+    run_parser.add_argument("--appium-port", dest="appium_port", type=int, help="Appium server port")
+    run_parser.add_argument("--metrics-port", dest="metrics_port", type=int, help="Prometheus port (0 = off)")
+    run_parser.add_argument("--publish-per-hour", dest="publish_per_hour", type=int, help="Maximum reposts per hour")
+    run_parser.add_argument("--skip-check", action="store_true", help="Do not check dependencies first")
+
+    check_parser = commands.add_parser("check", help="Check Python packages, Appium and adb")
+    check_parser.add_argument("--refresh", action="store_true", help="Ignore cached tool checks")
+    commands.add_parser("config", help="Show the effective settings")
+    commands.add_parser("status", help="Show the queue, store and video cache")
+    commands.add_parser("compact", help="Checkpoint the processed reels store")
+    evict_parser = commands.add_parser("evict-cache", help="Trim the host video cache")
+    evict_parser.add_argument("--max-mb", type=int, help="Trim to this size instead of MAX_CACHE_BYTES")
+
+    args = parser.parse_args()
+    handlers = {
+        None: command_run,
+        'run': command_run,
+        'check': command_check,
+        'config': command_config,
+        'status': command_status,
+        'compact': command_compact,
+        'evict-cache': command_evict_cache,
+    }
+    if args.command is None:
+        args.skip_check = False
+    try:
+        return handlers[args.command](args)
+    except ValueError as e:
+        print(f"❌ {e}")
+        return 2
+
 
 if __name__ == "__main__":
-    sys.exit(main())
\ No newline at end of file
+    sys.exit(main())
@@ -13,6 +13,6 @@ if ! command -v python3 &> /dev/null; then
 fi
 
 # Run launcher
-python3 run_bot.py
+python3 run_bot.py "$@"
 
 read -p "Press Enter to exit..."
\ No newline at end of file
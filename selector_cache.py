@@ -0,0 +1,157 @@
+import json
+import os
+import time
+
+from locator import Selector
+
+
+SELECTOR_STATS_FILE = "selector_stats.json"
+ID = "com.instagram.android:id/"
+
+# Logical elements and the strategies that can find them, in default order
+ELEMENTS = {
+    "create_button": [
+        ("container_child", Selector(xpath=f'//android.widget.LinearLayout[@resource-id="{ID}action_bar_buttons_container_left"]/android.widget.ImageView')),
+        ("container_clickable", Selector(xpath=f'//*[@resource-id="{ID}action_bar_buttons_container_left"]//android.widget.ImageView[@clickable="true"]')),
+        ("create_desc", Selector(desc="Create")),
+        ("new_post_desc", Selector(desc="New post")),
+        ("fixed_bounds", Selector(class_name="android.widget.ImageView", bounds=(0, 63, 127, 210))),
+    ],
+    "next_button": [
+        ("next_textview", Selector(resource_id=ID + "next_button_textview")),
+        ("next_text", Selector(text="Next")),
+    ],
+    "clips_next_button": [
+        ("clips_right_action", Selector(resource_id=ID + "clips_right_action_button")),
+        ("next_desc", Selector(desc="Next")),
+    ],
+}
+
+
+class SelectorRegistry:
+    """Learns which locator strategy works for each fragile element.
+
+    Statistics are kept per device and Instagram version and persisted across
+    restarts. The strategy that won last time is tried first, followed by
+    the others in order of hit rate.
+    """
+
+    def __init__(self, path=SELECTOR_STATS_FILE, elements=ELEMENTS):
+        self.path = path
+        self.elements = elements
+        self.context = "default"
+        self.stats = {}
+        self.dirty = False
+        if os.path.exists(path):
+            try:
+                with open(path, 'r', encoding='utf-8') as file:
+                    self.stats = json.load(file)
+            except (OSError, ValueError) as e:
+                print(f"[WARNING] Could not read {path}, starting fresh: {e}")
+
+    def set_context(self, device_id, app_version):
+        """Select the statistics bucket for this device and app version"""
+        self.context = f"{device_id or 'default'}|{app_version or 'unknown'}"
+
+    def element_stats(self, element):
+        bucket = self.stats.setdefault(self.context, {})
+        return bucket.setdefault(element, {'last_winner': None, 'strategies': {}})
+
+    def ordered(self, element):
+        """Strategies for an element, most promising first"""
+        stats = self.element_stats(element)
+        strategies = self.elements[element]
+
+        def rank(item):
+            index, (name, _) = item
+            counts = stats['strategies'].get(name, {})
+            hits, misses = counts.get('hits', 0), counts.get('misses', 0)
+            rate = hits / (hits + misses) if hits + misses else 0.5
+            return (name != stats['last_winner'], -rate, index)
+
+        return [strategy for _, strategy in sorted(enumerate(strategies), key=rank)]
+
+    def record(self, element, tried, winner):
+        stats = self.element_stats(element)
+        for name in tried:
+            counts = stats['strategies'].setdefault(name, {'hits': 0, 'misses': 0})
+            counts['hits' if name == winner else 'misses'] += 1
+        if winner:
+            stats['last_winner'] = winner
+        self.dirty = True
+
+    def match(self, screen, element):
+        """Try the strategies in order; returns (names tried, winner, node)"""
+        tried = []
+        for name, selector in self.ordered(element):
+            tried.append(name)
+            node = screen.find(selector)
+            if node is not None:
+                return tried, name, node
+        return tried, None, None
+
+    def find(self, screen, element):
+        """Resolve an element against the current snapshot.
+
+        Returns (strategy name, node), or (None, None) if no strategy matches.
+        """
+        tried, name, node = self.match(screen, element)
+        self.record(element, tried, name)
+        return name, node
+
+    def wait_for(self, screen, element, timeout=5, interval=0.5, refresh=True):
+        """Like Screen.wait_for, but for a registered element.
+
+        Statistics are only recorded once the element is found (or the wait
+        gives up), so a screen that is still loading does not count as a miss
+        for every strategy.
+        """
+        deadline = time.monotonic() + timeout
+        if refresh:
+            screen.refresh()
+        while True:
+            tried, name, node = self.match(screen, element)
+            if node is not None or time.monotonic() >= deadline:
+                self.record(element, tried, name)
+                return name, node
+            time.sleep(interval)
+            screen.refresh()
+
+    def save(self):
+        """Write statistics atomically, if anything changed.
+
+        Only this device's bucket is replaced, so workers for other devices
+        sharing the file do not overwrite each other.
+        """
+        if not self.dirty:
+            return
+        stats = {}
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, 'r', encoding='utf-8') as file:
+                    stats = json.load(file)
+            except (OSError, ValueError):
+                pass
+        stats[self.context] = self.stats.get(self.context, {})
+        self.stats = stats
+
+        temp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as file:
+            json.dump(stats, file, indent=2, sort_keys=True)
+        os.replace(temp_path, self.path)
+        self.dirty = False
+
+    def report(self):
+        lines = []
+        for context, elements in sorted(self.stats.items()):
+            lines.append(f"{context}:")
+            for element, stats in sorted(elements.items()):
+                lines.append(f"  {element} (last winner: {stats['last_winner']})")
+                for name, counts in sorted(stats['strategies'].items(),
+                                           key=lambda item: -item[1]['hits']):
+                    lines.append(f"    {name:<22} hits {counts['hits']:>5}  misses {counts['misses']:>5}")
+        return "\n".join(lines) or "No selector statistics yet"
+
+
+if __name__ == "__main__":
+    print(SelectorRegistry().report())
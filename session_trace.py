@@ -0,0 +1,594 @@
+#!/usr/bin/env python3
+"""
+Session traces: a record of everything the bot asked the device and what it
+answered, for profiling and replaying a session offline.
+
+Recording is opt-in (TRACE_SESSIONS in bot.py). While on, every Appium
+command is logged with its parameters, latency and raw response, every adb
+shell/pull/push with its result, and every stage boundary with a compressed
+snapshot of the screen, to a rotated logs/trace-<device>.jsonl.
+
+Usage:
+    python session_trace.py profile logs/trace-emulator-5554.jsonl
+    python session_trace.py profile logs/trace-emulator-5554.jsonl --folded > session.folded
+    python session_trace.py replay logs/trace-emulator-5554.jsonl --latency-scale 0
+
+profile shows where the wall time went, nested by stage, and lists element
+lookups that waited out their whole timeout. replay runs the bot's current
+code against the recorded responses, with no device, and profiles that run.
+"""
+
+import argparse
+import base64
+import collections
+import contextlib
+import glob
+import io
+import json
+import logging
+import logging.handlers
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+import zlib
+
+from adb import AdbShellError
+from appium_log import LOG_DIR
+from metrics import METRICS
+from video_cache import hash_file
+
+
+TRACE_MAX_BYTES = 20 * 1024 * 1024  # Rotate trace files at 20 MB
+TRACE_BACKUPS = 3  # Keep this many rotated trace files
+COMPRESS_OVER = 1024  # Responses larger than this many bytes (page sources) are stored compressed
+IMPLICIT_WAIT = 10  # Implicit wait in seconds assumed until the trace records one
+TIMEOUT_MARGIN = 0.95  # A failed lookup that took this share of the implicit wait ran into it
+REPLAY_LOOKAHEAD = 50  # Recorded commands a replay may skip over to find a matching one
+LOOKUP_COMMANDS = ('findElement', 'findElements', 'findChildElement', 'findChildElements')
+
+
+def pack(record, key, value):
+    """Store value in record, compressed under key + '_z' when it is large"""
+    text = json.dumps(value, default=str)
+    if len(text) > COMPRESS_OVER:
+        record[key + '_z'] = base64.b64encode(zlib.compress(text.encode('utf-8'))).decode('ascii')
+    else:
+        record[key] = value
+
+
+def unpack(record, key):
+    if key + '_z' in record:
+        return json.loads(zlib.decompress(base64.b64decode(record[key + '_z'])))
+    return record.get(key)
+
+
+class TraceRecorder:
+    """Writes one session trace as JSON lines to a rotated log file.
+
+    attach() wraps a driver's command executor, below the WebDriver client,
+    so the trace holds exactly what went over the wire. wrap() does the same
+    for the adb helpers. stage() is a METRICS stage listener; at a stage
+    boundary it takes a page-source snapshot, but only when commands ran
+    since the last one and the last command reached Appium.
+    """
+
+    def __init__(self, name, log_dir=LOG_DIR, snapshots=True, **info):
+        os.makedirs(log_dir, exist_ok=True)
+        self.path = os.path.join(log_dir, f"trace-{name}.jsonl")
+        self.snapshots = snapshots
+        self.lock = threading.Lock()
+        self.raw_execute = None  # Untraced executor of the current driver, for snapshots
+        self.session_id = None
+        self.commands_since_snapshot = 0
+        self.healthy = False
+
+        self.logger = logging.getLogger(f"reels_bot.trace.{name}")
+        self.logger.propagate = False
+        self.logger.setLevel(logging.INFO)
+        if not self.logger.handlers:
+            handler = logging.handlers.RotatingFileHandler(
+                self.path,
+                maxBytes=TRACE_MAX_BYTES,
+                backupCount=TRACE_BACKUPS,
+                encoding='utf-8'
+            )
+            self.logger.addHandler(handler)
+        self.write('session', pid=os.getpid(), **info)
+
+    def write(self, kind, **fields):
+        self.logger.info(json.dumps({'type': kind, 't': round(time.time(), 4), **fields}, default=str))
+
+    def attach(self, driver):
+        """Trace every command the driver sends from now on"""
+        executor = driver.command_executor
+        execute = executor.execute
+
+        def traced_execute(command, params=None):
+            started = time.time()
+            clock = time.perf_counter()
+            try:
+                response = execute(command, params)
+            except Exception as e:
+                self.command(command, params, started, time.perf_counter() - clock, error=f"{type(e).__name__}: {e}")
+                raise
+            self.command(command, params, started, time.perf_counter() - clock, response=response)
+            return response
+
+        executor.execute = traced_execute
+        with self.lock:
+            self.raw_execute = execute
+            self.session_id = driver.session_id
+            self.healthy = True
+        self.write('attach', session=driver.session_id)
+        return driver
+
+    def command(self, command, params, started, seconds, response=None, error=None):
+        record = {'command': command, 't': round(started, 4), 'seconds': round(seconds, 4)}
+        params = {key: value for key, value in (params or {}).items() if key != 'sessionId'}
+        if params:
+            record['params'] = params
+        if error:
+            record['error'] = error
+        else:
+            pack(record, 'response', response)
+        with self.lock:
+            self.commands_since_snapshot += 1
+            self.healthy = error is None and command != 'quit'
+        self.write('command', **record)
+
+    def wrap(self, kind, function):
+        """Trace calls of an adb helper: kind is 'shell', 'pull' or 'push'"""
+        def traced(*args, **kwargs):
+            started = time.time()
+            clock = time.perf_counter()
+            record = {'args': list(args)}
+            try:
+                result = function(*args, **kwargs)
+            except Exception as e:
+                record['error'] = f"{type(e).__name__}: {e}"
+                raise
+            else:
+                if kind == 'pull':
+                    # Lets a replay hand the bot a file with the same identity
+                    record['size'] = os.path.getsize(args[1])
+                    record['sha256'] = hash_file(args[1])
+                elif result is not None:
+                    pack(record, 'result', result)
+                return result
+            finally:
+                self.write(kind, t=round(started, 4), seconds=round(time.perf_counter() - clock, 4), **record)
+
+        return traced
+
+    def stage(self, stage, event):
+        """METRICS stage listener: event is 'start', 'ok' or 'error'"""
+        with self.lock:
+            take = self.snapshots and self.healthy and self.commands_since_snapshot > 0
+            if take:
+                self.commands_since_snapshot = 0
+            execute, session_id = self.raw_execute, self.session_id
+
+        record = {'stage': stage, 'event': event}
+        if event != 'start':
+            record['t'] = round(time.time(), 4)  # Stage ended before the snapshot
+        if take:
+            clock = time.perf_counter()
+            try:
+                response = execute('getPageSource', {'sessionId': session_id})
+                source = response.get('value')
+                if response_error(response) is None and isinstance(source, str):
+                    record['snapshot_z'] = base64.b64encode(zlib.compress(source.encode('utf-8'))).decode('ascii')
+            except Exception:
+                pass
+            record['snapshot_seconds'] = round(time.perf_counter() - clock, 4)
+        self.write('stage', **record)
+
+    def close(self):
+        for handler in list(self.logger.handlers):
+            self.logger.removeHandler(handler)
+            handler.close()
+
+
+def trace_files(path):
+    """path and its rotated backups, oldest first"""
+    backups = [name for name in glob.glob(glob.escape(path) + '.*') if name.rpartition('.')[2].isdigit()]
+    backups.sort(key=lambda name: int(name.rpartition('.')[2]), reverse=True)
+    return backups + ([path] if os.path.exists(path) else [])
+
+
+def read_trace(paths):
+    for path in paths:
+        for name in trace_files(path):
+            with open(name, encoding='utf-8') as file:
+                for line in file:
+                    try:
+                        yield json.loads(line)
+                    except ValueError:
+                        continue  # Last line of a trace cut short by a crash
+
+
+def snapshot(record):
+    """Page source saved with a stage record, or None"""
+    if 'snapshot_z' not in record:
+        return None
+    return zlib.decompress(base64.b64decode(record['snapshot_z'])).decode('utf-8')
+
+
+def response_error(response):
+    """W3C error of a recorded response ('no such element', ...), or None"""
+    value = (response or {}).get('value')
+    if isinstance(value, str) and isinstance(response.get('status'), int) and response['status'] >= 400:
+        # Error bodies are kept as the raw JSON text the server sent
+        try:
+            value = json.loads(value).get('value')
+        except (ValueError, AttributeError):
+            return "unknown error"
+    return value.get('error') if isinstance(value, dict) else None
+
+
+def lookup_failed(record):
+    """True if a findElement(s) command came back empty"""
+    if record['command'] not in LOOKUP_COMMANDS or 'error' in record:
+        return False
+    response = unpack(record, 'response')
+    if record['command'].endswith('Elements'):
+        return (response or {}).get('value') == []
+    return response_error(response) == 'no such element'
+
+
+class Profile:
+    """Where the wall time of a trace went, nested by stage.
+
+    Time is added up per stack of stages, with commands, adb calls and
+    snapshots as leaves, which is what a flame graph is drawn from. Runs of
+    failed lookups of one locator are collected as waits; a wait is flagged
+    when a lookup ran into the implicit wait, or when polling gave up.
+    """
+
+    def __init__(self, records):
+        self.seconds = collections.Counter()  # Stack of names -> seconds
+        self.calls = collections.Counter()
+        self.waits = []
+        self.commands = 0
+        self.first = self.last = None
+
+        stack = []  # (stage, started)
+        implicit = IMPLICIT_WAIT
+        wait = None
+        for record in records:
+            kind, t = record.get('type'), record.get('t')
+            if t is None:
+                continue
+            if self.first is None:
+                self.first = t
+            self.last = max(self.last or t, t + record.get('seconds', 0))
+            path = tuple(stage for stage, _ in stack)
+
+            if kind == 'session':
+                stack = []  # A new process: whatever was open died with the old one
+            elif kind == 'stage':
+                if record.get('snapshot_seconds'):
+                    self.add(path + ('[snapshot]',), record['snapshot_seconds'])
+                if record['event'] == 'start':
+                    stack.append((record['stage'], t))
+                elif record['stage'] in path:
+                    while stack:
+                        stage, started = stack.pop()
+                        if stage == record['stage']:
+                            self.add(tuple(name for name, _ in stack) + (stage,), t - started)
+                            break
+            elif kind == 'command':
+                self.commands += 1
+                command = record['command']
+                self.add(path + (f"[{command}]",), record['seconds'])
+                params = record.get('params') or {}
+                if command == 'setTimeouts' and params.get('implicit') is not None:
+                    implicit = params['implicit'] / 1000
+
+                locator = f"{params.get('using')}={params.get('value')}"
+                if command in LOOKUP_COMMANDS and (wait is None or wait['locator'] != locator):
+                    self.end_wait(wait, found=False)
+                    wait = None
+                if lookup_failed(record):
+                    if wait is None:
+                        wait = {'t': t, 'path': path, 'command': command, 'locator': locator,
+                                'seconds': 0.0, 'lookups': 0, 'implicit': False}
+                    wait['seconds'] += record['seconds']
+                    wait['lookups'] += 1
+                    wait['implicit'] |= implicit > 0 and record['seconds'] >= implicit * TIMEOUT_MARGIN
+                elif wait is not None:
+                    self.end_wait(wait, found=command in LOOKUP_COMMANDS and 'error' not in record)
+                    wait = None
+            elif kind in ('shell', 'pull', 'push'):
+                self.add(path + (f"[adb {kind}]",), record['seconds'])
+        self.end_wait(wait, found=False)
+
+    def add(self, path, seconds):
+        self.seconds[path] += seconds
+        self.calls[path] += 1
+
+    def end_wait(self, wait, found):
+        if wait is None:
+            return
+        if wait['implicit']:
+            wait['reason'] = f"ran into the implicit wait {wait['lookups']}x"
+        elif not found and wait['lookups'] > 1:
+            wait['reason'] = f"polled {wait['lookups']}x without a match"
+        else:
+            return
+        self.waits.append(wait)
+
+    @property
+    def wall_time(self):
+        return (self.last - self.first) if self.first is not None else 0.0
+
+    def children(self):
+        children = collections.defaultdict(list)
+        for path in self.seconds:
+            children[path[:-1]].append(path)
+        return children
+
+    def self_time(self, path, children):
+        return self.seconds[path] - sum(self.seconds[child] for child in children.get(path, ()))
+
+    def report(self, depth=None, min_percent=0.5, width=30):
+        total = self.wall_time or 1.0
+        children = self.children()
+        lines = [
+            f"{self.commands} commands over {self.wall_time:.1f}s, {self.calls[('cycle',)]} cycles",
+            "",
+            f"{'seconds':>10} {'%':>6} {'calls':>6}  stage / [command]",
+        ]
+
+        def walk(path, level):
+            for child in sorted(children.get(path, ()), key=lambda p: -self.seconds[p]):
+                share = self.seconds[child] / total * 100
+                if share < min_percent:
+                    continue
+                bar = '#' * max(1, round(share / 100 * width))
+                lines.append(f"{self.seconds[child]:>10.1f} {share:>5.1f}% {self.calls[child]:>6}  "
+                             f"{'  ' * level}{child[-1]}  {bar}")
+                if children.get(child) and (depth is None or level + 1 < depth):
+                    own = self.self_time(child, children)
+                    if own / total * 100 >= min_percent:
+                        lines.append(f"{own:>10.1f} {own / total * 100:>5.1f}% {'':>6}  {'  ' * (level + 1)}(self)")
+                    walk(child, level + 1)
+
+        walk((), 0)
+        outside = self.wall_time - sum(self.seconds[path] for path in children.get((), ()))
+        lines.append(f"{outside:>10.1f} {outside / total * 100:>5.1f}% {'':>6}  (outside any stage)")
+
+        flagged = sorted(self.waits, key=lambda wait: -wait['seconds'])
+        lines.append("")
+        lines.append(f"Waits that ran to their timeout: {len(flagged)}, "
+                     f"{sum(wait['seconds'] for wait in flagged):.1f}s in total")
+        for wait in flagged[:20]:
+            lines.append(f"  {time.strftime('%H:%M:%S', time.localtime(wait['t']))} {wait['seconds']:>7.1f}s  "
+                         f"{' > '.join(wait['path']) or '-'}  {wait['locator']}  ({wait['reason']})")
+        return "\n".join(lines)
+
+    def folded(self):
+        """Self time per stack in milliseconds, in the folded format of flamegraph.pl and speedscope"""
+        children = self.children()
+        lines = []
+        for path in sorted(self.seconds):
+            milliseconds = round(self.self_time(path, children) * 1000)
+            if milliseconds > 0:
+                lines.append(f"{';'.join(path)} {milliseconds}")
+        return "\n".join(lines)
+
+
+class TraceReplay:
+    """Serves a recorded session back to the bot, with no device attached.
+
+    Each command is answered with the next recorded one that has the same
+    name and parameters, looking up to REPLAY_LOOKAHEAD records ahead, else
+    with the next one of the same name (a caption or a timestamp may differ
+    between runs). Recorded commands the bot no longer sends are skipped;
+    a command with no recorded answer fails like a device error would.
+    """
+
+    def __init__(self, records, latency_scale=0.0):
+        self.records = {'command': [], 'adb': []}
+        for record in records:
+            if record.get('type') == 'command':
+                self.records['command'].append(record)
+            elif record.get('type') in ('shell', 'pull', 'push'):
+                self.records['adb'].append(record)
+        self.cursors = {'command': 0, 'adb': 0}
+        self.latency_scale = latency_scale
+        self.stats = collections.Counter()
+        self.misses_in_row = 0
+
+    @property
+    def exhausted(self):
+        return (self.cursors['command'] >= len(self.records['command'])
+                or self.misses_in_row >= REPLAY_LOOKAHEAD)
+
+    def take(self, queue, name, key):
+        """Next recorded answer for a call, or None"""
+        records, start = self.records[queue], self.cursors[queue]
+        window = records[start:start + REPLAY_LOOKAHEAD]
+        for exact in (True, False):
+            for offset, record in enumerate(window):
+                if record.get('command', record['type']) != name:
+                    continue
+                if exact and key != record.get('params', record.get('args')):
+                    continue
+                self.cursors[queue] = start + offset + 1
+                self.stats[f"{queue}_skipped"] += offset
+                self.stats[f"{queue}_matched" if exact else f"{queue}_matched_by_name"] += 1
+                self.misses_in_row = 0
+                if self.latency_scale:
+                    time.sleep(record.get('seconds', 0) * self.latency_scale)
+                return record
+        self.stats[f"{queue}_unanswered"] += 1
+        self.misses_in_row += 1
+        return None
+
+    def connection(self):
+        from appium.webdriver.appium_connection import AppiumConnection
+        from appium.webdriver.client_config import AppiumClientConfig
+        from selenium.common.exceptions import WebDriverException
+
+        replay = self
+
+        class ReplayConnection(AppiumConnection):
+            def execute(self, command, params):
+                if command == 'newSession':
+                    return {'value': {'sessionId': 'replay', 'capabilities': {'platformName': 'Android'}}}
+                if command == 'quit':
+                    return {'value': None}
+                params = {key: value for key, value in (params or {}).items() if key != 'sessionId'} or None
+                record = replay.take('command', command, params)
+                if record is None:
+                    raise WebDriverException(f"No recorded response for {command} {params or ''}")
+                if 'error' in record:
+                    raise WebDriverException(record['error'])
+                return unpack(record, 'response')
+
+        return ReplayConnection(client_config=AppiumClientConfig(remote_server_addr="http://replay.invalid"))
+
+    def driver(self):
+        from appium import webdriver
+        from appium.options.android import UiAutomator2Options
+
+        return webdriver.Remote(command_executor=self.connection(), options=UiAutomator2Options())
+
+    def shell(self, command, timeout=15):
+        record = self.take('adb', 'shell', [command])
+        if record is None:
+            return ""
+        if 'error' in record:
+            raise AdbShellError(record['error'])
+        return unpack(record, 'result') or ""
+
+    def pull(self, remote_path, local_path):
+        record = self.take('adb', 'pull', None)
+        if record is None or 'error' in record:
+            raise AdbShellError((record or {}).get('error', f"No recorded pull of {remote_path}"))
+        # Same digest in, same bytes out, so the cache sees recorded duplicates as duplicates
+        seed = record['sha256'].encode('ascii')
+        with open(local_path, 'wb') as file:
+            file.write((seed * (record['size'] // len(seed) + 1))[:record['size']])
+
+    def push(self, local_path, remote_path):
+        record = self.take('adb', 'push', None)
+        if record is not None and 'error' in record:
+            raise AdbShellError(record['error'])
+
+
+def replay_trace(paths, store=None, cycles=None, latency_scale=1.0, verbose=False):
+    """Run the bot's cycles against a recorded trace. Returns (replay, profile of the run, errors)."""
+    from bot import BotConfig, InstagramReelsBot
+    from captions import CaptionLibrary
+    from reel_store import PROCESSED_DB
+
+    records = list(read_trace(paths))
+    session = {}
+    start = None
+    for index, record in enumerate(records):
+        if record.get('type') == 'session':
+            session = record
+        if record.get('type') == 'stage' and record['stage'] == 'cycle' and record['event'] == 'start':
+            start = index
+            break
+    if start is None:
+        raise ValueError("The trace has no complete cycle to replay")
+    if cycles is None:
+        cycles = sum(1 for record in records[start:] if record.get('type') == 'stage'
+                     and record['stage'] == 'cycle' and record['event'] == 'start')
+
+    replay = TraceReplay(records[start:], latency_scale)
+    root = os.path.dirname(os.path.abspath(__file__))
+    output = sys.stdout if verbose else io.StringIO()
+    previous_dir = os.getcwd()
+    errors = 0
+
+    with tempfile.TemporaryDirectory() as tmp, contextlib.redirect_stdout(output):
+        if store:
+            # The walk stops at known reels, so replay against the store as it was
+            with sqlite3.connect(store) as source, sqlite3.connect(os.path.join(tmp, PROCESSED_DB)) as copy:
+                source.backup(copy)
+        os.chdir(tmp)  # Keep the replay's store, caches and logs away from the real ones
+        recorder = TraceRecorder("replay", snapshots=False)
+        METRICS.stage_listeners.append(recorder.stage)
+        try:
+            bot = InstagramReelsBot(BotConfig(
+                device_id="replay",
+                username=session.get('username'),
+                senders=session.get('senders'),
+                thread_id=session.get('thread_id'),
+                publish_per_hour=session.get('publish_per_hour'),
+                metrics_port=0,
+                trace=False,
+            ))
+            bot.captions = CaptionLibrary(os.path.join(root, "captions"))
+            bot.fingerprints = None  # Replayed videos are placeholders
+            bot.shell = bot.navigator.shell = recorder.wrap('shell', replay.shell)
+            bot.pull = recorder.wrap('pull', replay.pull)
+            bot.push = recorder.wrap('push', replay.push)
+            bot.driver = bot.navigator.driver = recorder.attach(replay.driver())
+
+            for _ in range(cycles):
+                if replay.exhausted:
+                    break
+                try:
+                    bot.check_connection_health()
+                    bot.run_cycle()
+                except Exception as e:
+                    errors += 1
+                    print(f"[ERROR] Replayed cycle failed: {e}")
+            bot.processed.close()
+            bot.jobs.close()
+            bot.video_cache.close()
+            if bot.bubbles:
+                bot.bubbles.close()
+            recorder.close()
+            profile = Profile(read_trace([recorder.path]))
+        finally:
+            METRICS.stage_listeners.remove(recorder.stage)
+            recorder.close()
+            os.chdir(previous_dir)
+    return replay, profile, errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Profile or replay a recorded bot session")
+    commands = parser.add_subparsers(dest="action", required=True)
+
+    profile_parser = commands.add_parser("profile", help="Break down where the wall time of a trace went")
+    replay_parser = commands.add_parser("replay", help="Re-run the bot against a trace, without a device")
+    for subparser in (profile_parser, replay_parser):
+        subparser.add_argument("trace", nargs='+', help="Trace file(s); rotated backups are read too")
+        subparser.add_argument("--depth", type=int, help="Show stages nested at most this deep")
+        subparser.add_argument("--min-percent", type=float, default=0.5, help="Hide entries below this share")
+        subparser.add_argument("--folded", action="store_true",
+                               help="Print folded stacks (flamegraph.pl, speedscope) instead of the table")
+    replay_parser.add_argument("--store", help="Copy of the processed reels DB as it was when recording started")
+    replay_parser.add_argument("--cycles", type=int, help="Replay at most this many cycles")
+    replay_parser.add_argument("--latency-scale", type=float, default=1.0,
+                               help="Multiply recorded command latencies (0 = answer instantly)")
+    replay_parser.add_argument("--verbose", action="store_true", help="Show the bot's own output")
+    args = parser.parse_args()
+
+    if args.action == "profile":
+        profile = Profile(read_trace(args.trace))
+    else:
+        started = time.perf_counter()
+        replay, profile, errors = replay_trace(args.trace, args.store, args.cycles, args.latency_scale, args.verbose)
+        stats = replay.stats
+        print(f"Replayed {profile.calls[('cycle',)]} cycles in {time.perf_counter() - started:.1f}s, {errors} failed")
+        for queue in ('command', 'adb'):
+            print(f"  {queue}: {len(replay.records[queue])} recorded, {stats[f'{queue}_matched']} matched, "
+                  f"{stats[f'{queue}_matched_by_name']} matched by name only, {stats[f'{queue}_skipped']} skipped, "
+                  f"{stats[f'{queue}_unanswered']} unanswered")
+        print()
+    print(profile.folded() if args.folded else profile.report(args.depth, args.min_percent))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+Instagram Reels Bot - Multi-device supervisor
+Runs one bot worker process per device, each with its own Appium server,
+sharing one processed-reels store so no reel is reposted twice.
+
+Usage:
+    python supervisor.py emulator-5554=username1 emulator-5556=username2,username3
+"""
+
+import multiprocessing
+import queue
+import sys
+import time
+
+from metrics import METRICS_PORT
+from reel_store import PROCESSED_DB
+
+
+BASE_APPIUM_PORT = 4723  # Worker N gets Appium on BASE_APPIUM_PORT + N
+BASE_SYSTEM_PORT = 8200  # Worker N gets UiAutomator2 systemPort BASE_SYSTEM_PORT + N
+BASE_METRICS_PORT = METRICS_PORT  # Worker N serves Prometheus metrics on BASE_METRICS_PORT + N
+STATUS_INTERVAL = 60  # Seconds between aggregate status printouts
+RESTART_DELAY = 30  # Seconds to wait before restarting a worker that exited
+
+
+def run_worker(settings, status_queue):
+    """Process entry point: one bot bound to one device"""
+    from bot import BotConfig, InstagramReelsBot
+
+    bot = InstagramReelsBot(BotConfig(**settings), status_queue)
+    bot.run()
+
+
+class Supervisor:
+    def __init__(self, devices, store_path=PROCESSED_DB):
+        """devices is a list of (device_id, usernames) pairs, usernames in priority order"""
+        self.settings = {}
+        for index, (device_id, usernames) in enumerate(devices):
+            self.settings[device_id] = {
+                'device_id': device_id,
+                'username': usernames[0],
+                'senders': usernames,
+                'appium_port': BASE_APPIUM_PORT + index,
+                'system_port': BASE_SYSTEM_PORT + index,
+                'metrics_port': BASE_METRICS_PORT + index,
+                'store_path': store_path,
+            }
+        self.status_queue = multiprocessing.Queue()
+        self.workers = {}
+        self.status = {}
+        self.exited_at = {}
+
+    def start_worker(self, device_id):
+        settings = self.settings[device_id]
+        print(f"[INFO] Starting worker for {device_id} "
+              f"(Appium port {settings['appium_port']}, systemPort {settings['system_port']}, "
+              f"metrics port {settings['metrics_port']})")
+        process = multiprocessing.Process(
+            target=run_worker,
+            args=(settings, self.status_queue),
+            name=f"reels-bot-{device_id}",
+        )
+        process.start()
+        self.workers[device_id] = process
+        self.exited_at.pop(device_id, None)
+
+    def start(self):
+        for device_id in self.settings:
+            self.start_worker(device_id)
+
+    def drain_status(self):
+        """Collect the latest report from every worker"""
+        while True:
+            try:
+                report = self.status_queue.get_nowait()
+            except queue.Empty:
+                return
+            self.status[report['device']] = report
+
+    def status_table(self):
+        """Aggregate status view across all devices"""
+        now = time.time()
+        lines = [f"{'device':<20} {'pid':>7} {'state':<12} {'age':>6} {'reposted':>8} {'skipped':>7} {'errors':>6}"]
+        totals = {'reposted': 0, 'skipped': 0, 'errors': 0}
+        for device_id, process in self.workers.items():
+            report = self.status.get(device_id, {})
+            state = report.get('state', 'starting') if process.is_alive() else 'exited'
+            age = f"{now - report['time']:.0f}s" if 'time' in report else "-"
+            for key in totals:
+                totals[key] += report.get(key, 0)
+            lines.append(f"{device_id:<20} {process.pid or '-':>7} {state:<12} {age:>6} "
+                         f"{report.get('reposted', 0):>8} {report.get('skipped', 0):>7} {report.get('errors', 0):>6}")
+        lines.append(f"{'total':<20} {'':>7} {'':<12} {'':>6} "
+                     f"{totals['reposted']:>8} {totals['skipped']:>7} {totals['errors']:>6}")
+        return "\n".join(lines)
+
+    def restart_exited(self):
+        now = time.time()
+        for device_id, process in list(self.workers.items()):
+            if process.is_alive():
+                continue
+            if device_id not in self.exited_at:
+                print(f"[WARNING] Worker for {device_id} exited with code {process.exitcode}, "
+                      f"restarting in {RESTART_DELAY} seconds...")
+                self.exited_at[device_id] = now
+            elif now - self.exited_at[device_id] >= RESTART_DELAY:
+                self.start_worker(device_id)
+
+    def stop(self):
+        print("[INFO] Stopping workers...")
+        for process in self.workers.values():
+            process.join(timeout=30)
+            if process.is_alive():
+                process.terminate()
+                process.join(timeout=10)
+
+    def run(self):
+        self.start()
+        last_status = 0
+        try:
+            while True:
+                time.sleep(1)
+                self.drain_status()
+                self.restart_exited()
+                if time.time() - last_status >= STATUS_INTERVAL:
+                    print("\n" + self.status_table() + "\n")
+                    last_status = time.time()
+        except KeyboardInterrupt:
+            print("\n\n[INFO] Stopping supervisor...")
+        finally:
+            self.stop()
+            self.drain_status()
+            print(self.status_table())
+
+
+def parse_devices(args):
+    devices = []
+    for arg in args:
+        device_id, _, usernames = arg.partition('=')
+        usernames = [username.strip().lstrip('@') for username in usernames.split(',') if username.strip()]
+        if not device_id or not usernames:
+            raise ValueError(f"Expected DEVICE_ID=USERNAME[,USERNAME...], got {arg!r}")
+        devices.append((device_id, usernames))
+    return devices
+
+
+def main():
+    try:
+        devices = parse_devices(sys.argv[1:])
+    except ValueError as e:
+        print(f"[ERROR] {e}")
+        devices = []
+    if not devices:
+        print(__doc__)
+        return 1
+
+    Supervisor(devices).run()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
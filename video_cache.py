@@ -0,0 +1,141 @@
+import hashlib
+import os
+import sqlite3
+import time
+
+
+VIDEO_CACHE_DIR = "video_cache"
+MAX_CACHE_BYTES = 2 * 1024 ** 3  # Evict least recently used videos beyond this size
+CHUNK_SIZE = 1024 * 1024  # Bytes read at a time while hashing
+
+
+def hash_file(path, chunk_size=CHUNK_SIZE):
+    """SHA-256 of a file, read in chunks so large videos are never loaded whole"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as file:
+        for chunk in iter(lambda: file.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class VideoCache:
+    """Host-side, content-addressed store of downloaded reel videos.
+
+    Videos are stored under their SHA-256, so the same clip reshared under a
+    different reel ID is recognised by its content. The index keeps the hash
+    of every video ever seen, even after the file itself has been evicted,
+    so duplicate detection does not depend on the cache size.
+
+    Videos of reels that have not been posted yet are pinned and never
+    evicted. Everything else is evicted least recently used first once the
+    cache grows beyond max_bytes.
+    """
+
+    def __init__(self, directory=VIDEO_CACHE_DIR, max_bytes=MAX_CACHE_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+        self.conn = sqlite3.connect(os.path.join(directory, "index.db"), timeout=30,
+                                    isolation_level=None, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS videos ("
+            " sha256 TEXT PRIMARY KEY,"
+            " reel_id TEXT NOT NULL,"
+            " size INTEGER NOT NULL,"
+            " cached INTEGER NOT NULL,"
+            " pinned INTEGER NOT NULL,"
+            " added_at REAL NOT NULL,"
+            " last_used_at REAL NOT NULL,"
+            " posted_at REAL)"
+        )
+
+    def path(self, digest):
+        return os.path.join(self.directory, digest[:2], digest + ".mp4")
+
+    def is_cached(self, digest):
+        return os.path.exists(self.path(digest))
+
+    def owner(self, digest):
+        """Reel ID the content was first stored for, or None if it is new"""
+        row = self.conn.execute("SELECT reel_id FROM videos WHERE sha256 = ?", (digest,)).fetchone()
+        return row[0] if row else None
+
+    def posted_as(self, digest):
+        """Reel ID the content was already posted as, or None"""
+        row = self.conn.execute(
+            "SELECT reel_id FROM videos WHERE sha256 = ? AND posted_at IS NOT NULL", (digest,)
+        ).fetchone()
+        return row[0] if row else None
+
+    def add(self, source_path, reel_id):
+        """Move a downloaded file into the cache.
+
+        Returns (digest, duplicate_of): duplicate_of is the reel ID the same
+        content was stored for earlier, or None when the video is new. The
+        source file is consumed either way.
+        """
+        digest = hash_file(source_path)
+        now = time.time()
+        with self.conn:
+            self.conn.execute("BEGIN IMMEDIATE")
+            row = self.conn.execute("SELECT reel_id FROM videos WHERE sha256 = ?", (digest,)).fetchone()
+            if row and row[0] != reel_id:
+                os.remove(source_path)
+                return digest, row[0]
+
+            target = self.path(digest)
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            os.replace(source_path, target)
+            self.conn.execute(
+                "INSERT OR REPLACE INTO videos (sha256, reel_id, size, cached, pinned, added_at, last_used_at)"
+                " VALUES (?, ?, ?, 1, 1, ?, ?)",
+                (digest, reel_id, os.path.getsize(target), now, now)
+            )
+        self.evict()
+        return digest, None
+
+    def touch(self, digest):
+        self.conn.execute("UPDATE videos SET last_used_at = ? WHERE sha256 = ?", (time.time(), digest))
+
+    def mark_posted(self, digest):
+        self.conn.execute(
+            "UPDATE videos SET pinned = 0, posted_at = ?, last_used_at = ? WHERE sha256 = ?",
+            (time.time(), time.time(), digest)
+        )
+        self.evict()
+
+    def unpin(self, digest):
+        """Allow a video that will not be posted to be evicted"""
+        self.conn.execute("UPDATE videos SET pinned = 0 WHERE sha256 = ?", (digest,))
+        self.evict()
+
+    def size(self):
+        row = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM videos WHERE cached = 1").fetchone()
+        return row[0]
+
+    def evict(self):
+        """Delete unpinned videos, least recently used first, until the cache fits"""
+        total = self.size()
+        if total <= self.max_bytes:
+            return 0
+        rows = self.conn.execute(
+            "SELECT sha256, size FROM videos WHERE cached = 1 AND pinned = 0 ORDER BY last_used_at"
+        ).fetchall()
+        evicted = 0
+        for digest, size in rows:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(self.path(digest))
+            except FileNotFoundError:
+                pass
+            self.conn.execute("UPDATE videos SET cached = 0 WHERE sha256 = ?", (digest,))
+            total -= size
+            evicted += 1
+        if evicted:
+            print(f"[INFO] Evicted {evicted} video(s) from the cache ({total / 1024 ** 2:.0f} MB left)")
+        return evicted
+
+    def close(self):
+        self.conn.close()